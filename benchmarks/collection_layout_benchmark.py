@@ -0,0 +1,182 @@
+"""
+Бенчмарк раскладки векторного хранилища: отдельная коллекция Chroma на каждый
+документ против одной общей коллекции с фильтром по `document_id`.
+
+Для каждой раскладки измеряется время индексации корпуса и задержка
+плотного поиска по 1, 10 и всем документам. В раздельной раскладке
+коллекции опрашиваются параллельно и результаты сортируются по расстоянию,
+как это делает `ChatService.query_documents`; в общей — выполняется один
+запрос с фильтром `$in`. Также проверяется, что обе раскладки возвращают
+одинаковые top-k фрагменты (при равных расстояниях порядок может
+различаться).
+
+Запуск:
+    python -m benchmarks.collection_layout_benchmark --documents 50 --chunks 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from typing import Dict, List, Sequence, Tuple
+
+import chromadb
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+
+from benchmarks.fakes import HashingEmbeddings
+from benchmarks.retrieval_benchmark import WORDS, percentile
+
+Hit = Tuple[Document, float]
+
+
+def build_documents(
+    documents: int, chunks: int, seed: int
+) -> Dict[str, Tuple[List[str], List[dict]]]:
+    rng = random.Random(seed)
+    corpus: Dict[str, Tuple[List[str], List[dict]]] = {}
+    for document_index in range(documents):
+        document_id = f"doc_{document_index:04d}"
+        texts = [
+            " ".join(rng.choices(WORDS, k=60)) + f" пункт {rng.randrange(10**6)}"
+            for _ in range(chunks)
+        ]
+        metadatas = [
+            {"document_id": document_id, "start": index} for index in range(chunks)
+        ]
+        corpus[document_id] = (texts, metadatas)
+    return corpus
+
+
+def hit_key(hit: Hit) -> Tuple[str, int]:
+    return hit[0].metadata["document_id"], hit[0].metadata["start"]
+
+
+class PerDocumentLayout:
+    name = "per-doc"
+
+    def __init__(self, client, embeddings, corpus) -> None:
+        self.stores: Dict[str, Chroma] = {}
+        for document_id, (texts, metadatas) in corpus.items():
+            self.stores[document_id] = Chroma.from_texts(
+                texts,
+                embeddings,
+                metadatas=metadatas,
+                client=client,
+                collection_name=f"{document_id}_{uuid.uuid4().hex[:6]}",
+            )
+
+    async def search(
+        self, vector: List[float], document_ids: Sequence[str], k: int
+    ) -> List[Hit]:
+        results = await asyncio.gather(
+            *(
+                asyncio.to_thread(
+                    self.stores[
+                        document_id
+                    ].similarity_search_by_vector_with_relevance_scores,
+                    vector,
+                    k,
+                )
+                for document_id in document_ids
+            )
+        )
+        return sorted(
+            (hit for hits in results for hit in hits), key=lambda hit: hit[1]
+        )[:k]
+
+
+class SharedLayout:
+    name = "shared"
+
+    def __init__(self, client, embeddings, corpus) -> None:
+        texts = [
+            text for document_texts, _ in corpus.values() for text in document_texts
+        ]
+        metadatas = [
+            metadata
+            for _, document_metadatas in corpus.values()
+            for metadata in document_metadatas
+        ]
+        self.store = Chroma.from_texts(
+            texts,
+            embeddings,
+            metadatas=metadatas,
+            client=client,
+            collection_name=f"shared_{uuid.uuid4().hex[:6]}",
+        )
+
+    async def search(
+        self, vector: List[float], document_ids: Sequence[str], k: int
+    ) -> List[Hit]:
+        where = (
+            {"document_id": document_ids[0]}
+            if len(document_ids) == 1
+            else {"document_id": {"$in": list(document_ids)}}
+        )
+        return await asyncio.to_thread(
+            self.store.similarity_search_by_vector_with_relevance_scores,
+            vector,
+            k,
+            filter=where,
+        )
+
+
+async def run(args: argparse.Namespace) -> None:
+    corpus = build_documents(args.documents, args.chunks, args.seed)
+    embeddings = HashingEmbeddings()
+    client = chromadb.EphemeralClient()
+    document_ids = list(corpus)
+    rng = random.Random(args.seed)
+    query_vectors = embeddings.embed_documents(
+        [" ".join(rng.choices(WORDS, k=8)) for _ in range(args.queries)]
+    )
+
+    layouts = []
+    for layout_class in (PerDocumentLayout, SharedLayout):
+        started = time.perf_counter()
+        layout = layout_class(client, embeddings, corpus)
+        print(
+            f"{layout.name:<8} индексация {args.documents}×{args.chunks} "
+            f"фрагментов: {time.perf_counter() - started:.2f} с"
+        )
+        layouts.append(layout)
+
+    for scope in sorted({1, min(10, args.documents), args.documents}):
+        selected = rng.sample(document_ids, scope)
+        results: Dict[str, List[List[Hit]]] = {}
+        for layout in layouts:
+            latencies: List[float] = []
+            results[layout.name] = []
+            for vector in query_vectors:
+                started = time.perf_counter()
+                hits = await layout.search(vector, selected, args.top_k)
+                latencies.append(time.perf_counter() - started)
+                results[layout.name].append(hits)
+            print(
+                f"{layout.name:<8} документов={scope:<4} "
+                f"p50={percentile(latencies, 0.5) * 1000:7.2f} мс  "
+                f"p95={percentile(latencies, 0.95) * 1000:7.2f} мс"
+            )
+        overlap = sum(
+            len({hit_key(hit) for hit in per_doc} & {hit_key(hit) for hit in shared})
+            for per_doc, shared in zip(results["per-doc"], results["shared"])
+        ) / (args.top_k * len(query_vectors))
+        print(f"пересечение top-{args.top_k}: {overlap:.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--chunks", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
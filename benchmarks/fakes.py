@@ -0,0 +1,181 @@
+"""
+Локальные замены внешних API для бенчмарков: эмбеддинги, LLM и модерация.
+
+Ответы детерминированы, а задержки настраиваются, чтобы нагрузочный тест
+воспроизводил поведение сервиса под нагрузкой без сети и без расходов на
+OpenAI.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import time
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from src.services.lexical_index import tokenize
+
+ANSWER_WORDS = (
+    "Согласно документу, стороны согласовали порядок поставки, сроки оплаты "
+    "и ответственность за нарушение обязательств."
+).split()
+
+
+class HashingEmbeddings(Embeddings):
+    """Эмбеддинги «мешка слов» на хэшировании — без сети и без обучения."""
+
+    def __init__(self, size: int = 256):
+        self.size = size
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.size
+        for token in tokenize(text):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.size] += 1.0
+        norm = sum(value * value for value in vector) ** 0.5 or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class FakeEmbeddings(HashingEmbeddings):
+    """
+    Эмбеддинги на хэшировании с задержкой сетевого вызова: `latency` секунд
+    на запрос плюс `latency_per_text` на каждый текст пачки.
+    """
+
+    def __init__(
+        self, latency: float = 0.05, latency_per_text: float = 0.0, size: int = 256
+    ):
+        super().__init__(size)
+        self.latency = latency
+        self.latency_per_text = latency_per_text
+
+    def _delay(self, count: int) -> float:
+        return self.latency + self.latency_per_text * count
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self._delay(len(texts)))
+        return super().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self._delay(1))
+        return self._embed(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self._delay(len(texts)))
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        await asyncio.sleep(self._delay(1))
+        return self._embed(text)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Чат-модель с фиксированным ответом. `latency` — время до первого токена,
+    `token_latency` — пауза между токенами, в том числе без потоковой выдачи.
+    """
+
+    latency: float = 0.5
+    token_latency: float = 0.01
+    answer_words: List[str] = ANSWER_WORDS
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _tokens(self) -> List[str]:
+        return [
+            word if index == 0 else f" {word}"
+            for index, word in enumerate(self.answer_words)
+        ]
+
+    def _total_latency(self) -> float:
+        return self.latency + self.token_latency * len(self.answer_words)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self._total_latency())
+        return self._result()
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self._total_latency())
+        return self._result()
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for token in self._tokens():
+            time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for token in self._tokens():
+            await asyncio.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager is not None:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    def _result(self) -> ChatResult:
+        answer = "".join(self._tokens())
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=answer))]
+        )
+
+
+class FakeModerationClient:
+    """
+    Клиент модерации с интерфейсом `openai.AsyncOpenAI().moderations`.
+    Помечает тексты, содержащие одно из `flagged_words`.
+    """
+
+    def __init__(self, latency: float = 0.1, flagged_words: tuple = ()):
+        self.latency = latency
+        self.flagged_words = tuple(word.lower() for word in flagged_words)
+        self.calls = 0
+        self.moderations = SimpleNamespace(create=self._create)
+
+    async def _create(self, input: str, **kwargs: Any) -> SimpleNamespace:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        flagged = any(word in input.lower() for word in self.flagged_words)
+        return SimpleNamespace(results=[SimpleNamespace(flagged=flagged)])
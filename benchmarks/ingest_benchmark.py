@@ -0,0 +1,212 @@
+"""
+Микробенчмарки обработки документа без сети: извлечение текста из больших
+синтетических PDF и деление текста на фрагменты так же, как при индексации.
+
+Извлечение измеряется двумя способами: в одном потоке функцией воркера и
+через `DocumentService` с пулом процессов, который используется для больших
+PDF. Деление сравнивает `split_parent_child` (смещения за один проход) с прежними
+двумя проходами `RecursiveCharacterTextSplitter`: время, пик выделенной памяти
+и совпадение количества фрагментов.
+
+Запуск:
+    python -m benchmarks.ingest_benchmark --pages 200 1000 --text-chars 100000 1000000
+"""
+
+from __future__ import annotations
+
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "offline")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import random  # noqa: E402
+import tempfile  # noqa: E402
+import time  # noqa: E402
+import tracemalloc  # noqa: E402
+from pathlib import Path  # noqa: E402
+from typing import Callable, List, Tuple  # noqa: E402
+
+import fitz  # noqa: E402
+from langchain.text_splitter import RecursiveCharacterTextSplitter  # noqa: E402
+from langchain_core.documents import Document  # noqa: E402
+
+from benchmarks.retrieval_benchmark import WORDS, percentile  # noqa: E402
+from src.core.config import settings  # noqa: E402
+from src.services import pdf_extraction  # noqa: E402
+from src.services.chunking import split_parent_child  # noqa: E402
+from src.services.document_service import DocumentService  # noqa: E402
+from src.services.indexing_service import build_splitters, child_metadatas  # noqa: E402
+
+# Шрифт PDF по умолчанию не содержит кириллицы, поэтому текст страниц латинский.
+LATIN_WORDS = (
+    "contract party delivery payment term obligation liability annex "
+    "condition goods service act invoice claim penalty procedure"
+).split()
+
+
+def build_text(chars: int, rng: random.Random) -> str:
+    paragraphs: List[str] = []
+    size = 0
+    while size < chars:
+        sentences = [
+            " ".join(rng.choices(WORDS, k=rng.randint(8, 20))).capitalize() + "."
+            for _ in range(rng.randint(2, 6))
+        ]
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)[:chars]
+
+
+def build_pdf(path: Path, pages: int, rng: random.Random) -> None:
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        lines = [f"Page {number + 1}"] + [
+            " ".join(rng.choices(LATIN_WORDS, k=12)) for _ in range(45)
+        ]
+        page.insert_text((50, 50), "\n".join(lines), fontsize=9)
+    doc.save(str(path))
+    doc.close()
+
+
+def split_with_langchain(text: str) -> Tuple[List[str], List[Document]]:
+    """Прежнее деление при индексации: два прохода RecursiveCharacterTextSplitter."""
+    parent_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=settings.PARENT_CHUNK_SIZE,
+        chunk_overlap=settings.PARENT_CHUNK_OVERLAP,
+        add_start_index=True,
+    )
+    child_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=settings.CHILD_CHUNK_SIZE,
+        chunk_overlap=settings.CHILD_CHUNK_OVERLAP,
+        add_start_index=True,
+    )
+    parent_docs = parent_splitter.create_documents([text])
+    child_docs: List[Document] = []
+    for parent_id, parent_doc in enumerate(parent_docs):
+        parent_start = parent_doc.metadata["start_index"]
+        for child_doc in child_splitter.create_documents([parent_doc.page_content]):
+            start = parent_start + child_doc.metadata["start_index"]
+            child_doc.metadata = {
+                "parent_id": parent_id,
+                "parent_start": parent_start,
+                "start": start,
+                "end": start + len(child_doc.page_content),
+            }
+            child_docs.append(child_doc)
+    return [parent_doc.page_content for parent_doc in parent_docs], child_docs
+
+
+PARENT_SPLITTER, CHILD_SPLITTER = build_splitters(settings)
+
+
+def split_with_spans(text: str) -> Tuple[List[str], List[str]]:
+    spans = split_parent_child(text, PARENT_SPLITTER, CHILD_SPLITTER)
+    child_metadatas(spans)
+    return spans.parent_texts(text), spans.child_texts(text)
+
+
+def measure(
+    split: Callable[[str], Tuple[list, list]], text: str, repeats: int
+) -> Tuple[float, float, int, int]:
+    """Медиана времени, пик выделенной памяти и количество фрагментов."""
+    timings: List[float] = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        parents, children = split(text)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    split(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return percentile(timings, 0.5), peak, len(parents), len(children)
+
+
+def bench_splitting(sizes: List[int], repeats: int, rng: random.Random) -> None:
+    print(
+        "Деление на фрагменты (родительские "
+        f"{settings.PARENT_CHUNK_SIZE}/{settings.PARENT_CHUNK_OVERLAP}, дочерние "
+        f"{settings.CHILD_CHUNK_SIZE}/{settings.CHILD_CHUNK_OVERLAP}):"
+    )
+    for chars in sizes:
+        text = build_text(chars, rng)
+        baseline = measure(split_with_langchain, text, repeats)
+        spans = measure(split_with_spans, text, repeats)
+        if spans[2:] != baseline[2:]:
+            raise RuntimeError(f"Количество фрагментов различается: {spans} {baseline}")
+        for name, (median, peak, parents, children) in (
+            ("langchain", baseline),
+            ("смещения", spans),
+        ):
+            print(
+                f"  {chars:>9} символов, {name:<9}: {median * 1000:8.1f} мс, "
+                f"{chars / median / 1e6:6.2f} млн символов/с, "
+                f"пик памяти {peak / 1e6:6.1f} МБ"
+            )
+        print(
+            f"  {'':>9} родительских {parents}, дочерних {children}, "
+            f"ускорение {baseline[0] / spans[0]:.1f}x"
+        )
+
+
+async def bench_extraction(
+    pages_list: List[int], repeats: int, workers: int, rng: random.Random
+) -> None:
+    print(f"Извлечение текста из PDF (воркеров: {workers}):")
+    with tempfile.TemporaryDirectory(prefix="docucortex_ingest_") as tmp:
+        root = Path(tmp)
+        service = DocumentService(
+            storage_path=root / "documents", extraction_workers=workers
+        )
+        try:
+            for pages in pages_list:
+                path = root / f"synthetic_{pages}.pdf"
+                build_pdf(path, pages, rng)
+
+                single: List[float] = []
+                pooled: List[float] = []
+                for _ in range(repeats):
+                    started = time.perf_counter()
+                    pdf_extraction.extract_page_range(str(path), 0, pages)
+                    single.append(time.perf_counter() - started)
+
+                    started = time.perf_counter()
+                    async for page in service._extract_text_from_pdf(path):
+                        async for _ in page:
+                            pass
+                    pooled.append(time.perf_counter() - started)
+
+                single_median = percentile(single, 0.5)
+                pooled_median = percentile(pooled, 0.5)
+                print(
+                    f"  {pages:>5} стр. ({path.stat().st_size / 1e6:5.1f} МБ): "
+                    f"один поток {single_median * 1000:8.1f} мс, "
+                    f"сервис {pooled_median * 1000:8.1f} мс, "
+                    f"{pages / pooled_median:7.0f} стр./с"
+                )
+        finally:
+            service.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 500])
+    parser.add_argument(
+        "--text-chars", type=int, nargs="+", default=[100_000, 1_000_000]
+    )
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    bench_splitting(args.text_chars, args.repeats, rng)
+    asyncio.run(bench_extraction(args.pages, args.repeats, args.workers, rng))
+
+
+if __name__ == "__main__":
+    main()
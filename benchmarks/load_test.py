@@ -0,0 +1,262 @@
+"""
+Нагрузочный тест API без сети: приложение FastAPI обслуживает запросы через
+ASGI-транспорт httpx, а LLM, эмбеддинги и модерация заменены локальными
+реализациями из `benchmarks.fakes` с настраиваемой задержкой.
+
+Сценарии выполняются по очереди на одних и тех же документах:
+
+- upload — загрузка уникальных TXT-документов;
+- first_query — первый вопрос к каждому документу сразу после загрузки,
+  включая ожидание фоновой индексации;
+- warm_chat — вопросы к уже проиндексированным документам без кэша ответов;
+- summary — краткое содержание каждого документа без кэша суммаризаций.
+
+Для каждого сценария выводятся p50/p95/p99 задержки и пропускная
+способность. Данные пишутся во временную папку и удаляются после запуска.
+
+Запуск:
+    python -m benchmarks.load_test --requests 200 --concurrency 16 --llm-latency 0.8
+"""
+
+from __future__ import annotations
+
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "offline")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import random  # noqa: E402
+import tempfile  # noqa: E402
+import time  # noqa: E402
+from dataclasses import dataclass, field  # noqa: E402
+from pathlib import Path  # noqa: E402
+from typing import Awaitable, Callable, List  # noqa: E402
+
+import chromadb  # noqa: E402
+import httpx  # noqa: E402
+
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings, FakeModerationClient  # noqa: E402
+from benchmarks.retrieval_benchmark import WORDS, percentile  # noqa: E402
+from src.api.v1 import chat, documents  # noqa: E402
+from src.core.config import Settings  # noqa: E402
+from src.main import app  # noqa: E402
+from src.services.container import ServiceContainer  # noqa: E402
+from src.services.document_service import DocumentService  # noqa: E402
+from src.services.embedding_cache import CachedEmbeddings  # noqa: E402
+
+
+class OfflineContainer(ServiceContainer):
+    """Контейнер сервисов, в котором клиенты OpenAI заменены локальными."""
+
+    def __init__(
+        self,
+        app_settings: Settings,
+        document_service: DocumentService,
+        llm_latency: float,
+        token_latency: float,
+        embedding_latency: float,
+        moderation_latency: float,
+    ):
+        super().__init__(app_settings, document_service)
+        self.llm_latency = llm_latency
+        self.token_latency = token_latency
+        self.embedding_latency = embedding_latency
+        self.moderation_latency = moderation_latency
+
+    def _create_clients(self) -> None:
+        self.http_client = httpx.Client()
+        self.http_async_client = httpx.AsyncClient()
+        self.llm = FakeChatModel(
+            latency=self.llm_latency, token_latency=self.token_latency
+        )
+        self.embeddings = FakeEmbeddings(latency=self.embedding_latency)
+        if self.settings.EMBEDDING_CACHE_ENABLED:
+            self.embeddings = CachedEmbeddings(
+                underlying=self.embeddings,
+                model_name="fake",
+                db_path=Path(self.settings.EMBEDDING_CACHE_PATH),
+                max_entries=self.settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            )
+        self.moderation_client = FakeModerationClient(latency=self.moderation_latency)
+        self.chroma_client = chromadb.PersistentClient(path=self.settings.CHROMA_PATH)
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def report(self) -> str:
+        if not self.latencies:
+            return f"{self.name:<12} нет успешных запросов, ошибок {self.errors}"
+        return (
+            f"{self.name:<12} n={len(self.latencies):<5} ошибок={self.errors:<3} "
+            f"rps={len(self.latencies) / self.elapsed:8.2f}  "
+            f"p50={percentile(self.latencies, 0.5) * 1000:8.1f} мс  "
+            f"p95={percentile(self.latencies, 0.95) * 1000:8.1f} мс  "
+            f"p99={percentile(self.latencies, 0.99) * 1000:8.1f} мс"
+        )
+
+
+async def run_scenario(
+    name: str,
+    count: int,
+    concurrency: int,
+    request: Callable[[int], Awaitable[httpx.Response]],
+    expected_status: int = 200,
+) -> ScenarioResult:
+    """
+    Выполняет `count` запросов не больше чем по `concurrency` одновременно и
+    собирает задержки успешных ответов.
+    """
+    result = ScenarioResult(name)
+    indices = iter(range(count))
+
+    async def worker() -> None:
+        for index in indices:
+            started = time.perf_counter()
+            response = await request(index)
+            if response.status_code == expected_status:
+                result.latencies.append(time.perf_counter() - started)
+            else:
+                result.errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def build_document(index: int, chars: int, rng: random.Random) -> bytes:
+    parts = [f"Документ {index}. Договор ДК-{index:05d}."]
+    size = len(parts[0])
+    while size < chars:
+        sentence = " ".join(rng.choices(WORDS, k=12)).capitalize() + "."
+        parts.append(sentence)
+        size += len(sentence) + 1
+    return " ".join(parts).encode("utf-8")
+
+
+async def run(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory(prefix="docucortex_load_") as tmp:
+        root = Path(tmp)
+        app_settings = Settings(
+            CHROMA_PATH=str(root / "chroma"),
+            PARENT_STORE_PATH=str(root / "parents"),
+            EMBEDDING_CACHE_PATH=str(root / "chroma" / "embedding_cache.sqlite3"),
+            SUMMARY_CACHE_PATH=str(root / "summaries"),
+            INDEXING_WORKERS=args.indexing_workers,
+        )
+        container = OfflineContainer(
+            app_settings,
+            DocumentService(
+                storage_path=root / "documents",
+                upload_chunk_size=app_settings.UPLOAD_CHUNK_SIZE,
+                extraction_workers=app_settings.PDF_EXTRACTION_WORKERS,
+                pages_per_task=app_settings.PDF_PAGES_PER_TASK,
+                token_model=app_settings.LLM_MODEL,
+            ),
+            llm_latency=args.llm_latency,
+            token_latency=args.token_latency,
+            embedding_latency=args.embedding_latency,
+            moderation_latency=args.moderation_latency,
+        )
+        container.start()
+        app.dependency_overrides.update(
+            {
+                documents.get_document_service: lambda: container.document_service,
+                documents.get_indexing_service: lambda: container.indexing_service,
+                documents.get_analysis_service: lambda: container.analysis_service,
+                documents.get_batch_upload_service: (
+                    lambda: container.batch_upload_service
+                ),
+                chat.get_chat_service: lambda: container.chat_service,
+            }
+        )
+
+        transport = httpx.ASGITransport(app=app)
+        document_ids: List[str] = [""] * args.requests
+        try:
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://bench", timeout=None
+            ) as client:
+
+                async def upload(index: int) -> httpx.Response:
+                    content = build_document(index, args.document_chars, rng)
+                    response = await client.post(
+                        "/api/v1/documents",
+                        files={"file": (f"doc_{index}.txt", content, "text/plain")},
+                    )
+                    if response.status_code == 201:
+                        document_ids[index] = response.json()["documentId"]
+                    return response
+
+                def ask(
+                    bypass_cache: bool,
+                ) -> Callable[[int], Awaitable[httpx.Response]]:
+                    async def request(index: int) -> httpx.Response:
+                        return await client.post(
+                            "/api/v1/chat",
+                            json={
+                                "documentId": document_ids[index % args.requests],
+                                "question": f"Кто подписал договор ДК-{index:05d}?",
+                                "bypassCache": bypass_cache,
+                            },
+                        )
+
+                    return request
+
+                async def summary(index: int) -> httpx.Response:
+                    return await client.get(
+                        f"/api/v1/documents/{document_ids[index]}/summary"
+                    )
+
+                results = [
+                    await run_scenario(
+                        "upload", args.requests, args.concurrency, upload, 201
+                    ),
+                    await run_scenario(
+                        "first_query", args.requests, args.concurrency, ask(False)
+                    ),
+                    await run_scenario(
+                        "warm_chat", args.requests, args.concurrency, ask(True)
+                    ),
+                    await run_scenario(
+                        "summary", args.requests, args.concurrency, summary
+                    ),
+                ]
+        finally:
+            app.dependency_overrides.clear()
+            await container.aclose()
+
+    print(
+        f"Запросов на сценарий: {args.requests}, одновременно: {args.concurrency}, "
+        f"LLM {args.llm_latency * 1000:.0f} мс + {args.token_latency * 1000:.0f} мс/токен, "
+        f"эмбеддинги {args.embedding_latency * 1000:.0f} мс, "
+        f"модерация {args.moderation_latency * 1000:.0f} мс"
+    )
+    for result in results:
+        print(result.report())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--document-chars", type=int, default=20_000)
+    parser.add_argument("--indexing-workers", type=int, default=2)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--token-latency", type=float, default=0.005)
+    parser.add_argument("--embedding-latency", type=float, default=0.05)
+    parser.add_argument("--moderation-latency", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
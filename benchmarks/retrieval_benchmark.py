@@ -0,0 +1,147 @@
+"""
+Бенчмарк гибридного поиска: задержка и recall@k плотного поиска, BM25 и их
+объединения методом reciprocal rank fusion.
+
+Корпус синтетический: фрагменты из общих слов, часть которых содержит
+уникальные номера договоров и фамилии. Запросы спрашивают о конкретном
+номере, правильный ответ — фрагмент с этим номером.
+
+По умолчанию используются локальные эмбеддинги на хэшировании слов, чтобы
+бенчмарк работал без сети; с флагом `--openai` — модель из настроек.
+
+Запуск:
+    python -m benchmarks.retrieval_benchmark --chunks 2000 --queries 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import chromadb
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from benchmarks.fakes import HashingEmbeddings
+from src.services.lexical_index import BM25Index, fetch_chunks
+from src.services.retrieval import reciprocal_rank_fusion
+
+WORDS = (
+    "договор сторона поставка оплата срок обязательство ответственность "
+    "приложение условие товар услуга акт счет претензия неустойка порядок "
+    "исполнение расторжение гарантия качество объем цена график"
+).split()
+SURNAMES = ["Иванов", "Петров", "Сидорова", "Кузнецов", "Смирнова", "Попов"]
+
+
+def build_corpus(
+    chunks: int, queries: int, seed: int
+) -> Tuple[List[str], List[Tuple[str, int]]]:
+    rng = random.Random(seed)
+    texts = [" ".join(rng.choices(WORDS, k=60)) for _ in range(chunks)]
+    targets = rng.sample(range(chunks), queries)
+    labelled: List[Tuple[str, int]] = []
+    for target in targets:
+        number = f"ДК-{rng.randrange(10_000, 99_999)}"
+        surname = rng.choice(SURNAMES)
+        texts[target] += f" Договор {number} подписан: {surname}."
+        labelled.append((f"Кто подписал договор {number}?", target))
+    return texts, labelled
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def report(name: str, latencies: List[float], hits: int, total: int) -> None:
+    print(
+        f"{name:<8} p50={percentile(latencies, 0.5) * 1000:7.2f} мс  "
+        f"p95={percentile(latencies, 0.95) * 1000:7.2f} мс  "
+        f"recall={hits / total:.3f}"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    texts, queries = build_corpus(args.chunks, args.queries, args.seed)
+    metadatas = [{"start": index} for index in range(len(texts))]
+
+    if args.openai:
+        from src.core.config import settings
+        from langchain_openai import OpenAIEmbeddings
+
+        embeddings: Embeddings = OpenAIEmbeddings(
+            model=settings.EMBEDDING_MODEL,
+            openai_api_key=settings.OPENAI_API_KEY.get_secret_value(),
+        )
+    else:
+        embeddings = HashingEmbeddings()
+
+    ids = [f"chunk_{i}" for i in range(len(texts))]
+    started = time.perf_counter()
+    store = Chroma.from_texts(
+        texts,
+        embeddings,
+        metadatas=metadatas,
+        ids=ids,
+        client=chromadb.EphemeralClient(),
+        collection_name=f"bench_{uuid.uuid4().hex[:8]}",
+    )
+    print(f"Chroma: {len(texts)} фрагментов за {time.perf_counter() - started:.2f} с")
+
+    started = time.perf_counter()
+    lexical = BM25Index.build(ids, texts)
+    print(f"BM25:   {len(texts)} фрагментов за {time.perf_counter() - started:.2f} с")
+
+    query_vectors = await embeddings.aembed_documents([query for query, _ in queries])
+
+    def dense(query_index: int) -> List[Document]:
+        return store.similarity_search_by_vector(
+            query_vectors[query_index], k=args.candidates
+        )
+
+    def bm25(query_index: int) -> List[Document]:
+        query = queries[query_index][0]
+        hits = fetch_chunks(store, lexical.search(query, args.candidates))
+        return [document for document, _ in hits]
+
+    def hybrid(query_index: int) -> List[Document]:
+        return reciprocal_rank_fusion([dense(query_index), bm25(query_index)])
+
+    retrievers: Dict[str, Callable[[int], List[Document]]] = {
+        "dense": dense,
+        "bm25": bm25,
+        "hybrid": hybrid,
+    }
+    print(f"Запросов: {len(queries)}, top_k={args.top_k}")
+    for name, retrieve in retrievers.items():
+        latencies: List[float] = []
+        hits = 0
+        for query_index, (_, target) in enumerate(queries):
+            started = time.perf_counter()
+            results = retrieve(query_index)[: args.top_k]
+            latencies.append(time.perf_counter() - started)
+            hits += any(document.metadata["start"] == target for document in results)
+        report(name, latencies, hits, len(queries))
+    print(f"Средняя длина фрагмента: {statistics.mean(map(len, texts)):.0f} символов")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--openai", action="store_true")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from src.models.documents import GarbageCollectionReport, ReindexProgress
+from src.services.container import container
+from src.services.lifecycle_service import DocumentLifecycleService
+from src.services.reindex_service import ReindexScheduler
+
+router = APIRouter(tags=["Admin"])
+
+
+def get_reindex_scheduler() -> ReindexScheduler:
+    return container.reindex_scheduler
+
+
+def get_lifecycle_service() -> DocumentLifecycleService:
+    return container.lifecycle_service
+
+
+@router.get(
+    "/admin/reindex",
+    response_model=ReindexProgress,
+    status_code=status.HTTP_200_OK,
+)
+async def get_reindex_progress(
+    scheduler: ReindexScheduler = Depends(get_reindex_scheduler),
+) -> ReindexProgress:
+    """
+    Возвращает ход переиндексации документов, индекс которых построен со
+    старыми настройками деления на фрагменты или модели эмбеддингов.
+    """
+    return scheduler.progress()
+
+
+@router.post(
+    "/admin/gc",
+    response_model=GarbageCollectionReport,
+    status_code=status.HTTP_200_OK,
+)
+async def run_garbage_collection(
+    compact: Optional[bool] = Query(
+        None, description="Сжать базу Chroma; по умолчанию — по расписанию"
+    ),
+    service: DocumentLifecycleService = Depends(get_lifecycle_service),
+) -> GarbageCollectionReport:
+    """
+    Запускает проход сборщика мусора: удаляет документы с истекшим сроком
+    хранения и данные без документа, при необходимости сжимает базу Chroma.
+    """
+    return await service.collect_garbage(compact)
+
+
+@router.get(
+    "/admin/gc",
+    response_model=GarbageCollectionReport,
+    status_code=status.HTTP_200_OK,
+)
+async def get_garbage_collection_report(
+    service: DocumentLifecycleService = Depends(get_lifecycle_service),
+) -> GarbageCollectionReport:
+    """
+    Возвращает итоги последнего прохода сборщика мусора.
+    """
+    if service.last_report is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Сборка мусора еще не выполнялась.",
+        )
+    return service.last_report
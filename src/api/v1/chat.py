@@ -1,14 +1,28 @@
+import json
+from typing import Any, AsyncIterator, Dict
+
 from fastapi import APIRouter, Depends, status
-from src.models.chat import ChatRequest, ChatResponse
+from fastapi.responses import StreamingResponse
+from loguru import logger
+
+from src.models.chat import (
+    ChatRequest,
+    ChatResponse,
+    CorpusChatRequest,
+    CorpusChatResponse,
+)
 from src.services.chat_service import ChatService
-from src.core.config import settings
-from src.services.document_service import document_service
+from src.services.container import container
 
 router = APIRouter(tags=["Chat"])
 
 
 def get_chat_service() -> ChatService:
-    return ChatService(settings=settings, document_service=document_service)
+    return container.chat_service
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 
 @router.post(
@@ -24,5 +38,70 @@ async def chat_with_document(
     Принимает ID документа и вопрос и возвращает структурированный ответ.
     """
     return await chat_service.query_document(
-        document_id=request.document_id, question=request.question
+        document_id=request.document_id,
+        question=request.question,
+        bypass_cache=request.bypass_cache,
+    )
+
+
+@router.post(
+    "/chat/corpus",
+    response_model=CorpusChatResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def chat_with_documents(
+    request: CorpusChatRequest,
+    chat_service: ChatService = Depends(get_chat_service),
+):
+    """
+    Принимает список ID документов или тег и вопрос. Поиск выполняется по всем
+    документам сразу, ответ формируется один раз по лучшим фрагментам.
+    """
+    return await chat_service.query_documents(
+        question=request.question,
+        document_ids=request.document_ids,
+        tag=request.tag,
+    )
+
+
+@router.post(
+    "/chat/stream",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/event-stream": {}}}},
+)
+async def stream_chat_with_document(
+    request: ChatRequest,
+    chat_service: ChatService = Depends(get_chat_service),
+) -> StreamingResponse:
+    """
+    Потоковый вариант чата через Server-Sent Events.
+
+    Сначала отправляется событие `sources` с найденными фрагментами, затем
+    события `token` с частями ответа и финальное событие `done` с полным
+    ответом. Токены отправляются до проверки ответа модерацией; если ответ
+    отклонен, перед `done` приходит событие `flagged`, и клиент должен
+    заменить показанный текст на `answer` из него. Ошибки проверки вопроса
+    и поиска документа возвращаются обычным HTTP-ответом до начала потока.
+    """
+    events = chat_service.stream_query(
+        document_id=request.document_id,
+        question=request.question,
+        bypass_cache=request.bypass_cache,
+    )
+    first_event = await anext(events)
+
+    async def event_stream() -> AsyncIterator[str]:
+        yield format_sse(*first_event)
+        try:
+            async for event in events:
+                yield format_sse(*event)
+        except Exception as e:
+            logger.error(f"Ошибка потоковой генерации ответа: {e}")
+            yield format_sse("error", {"detail": "Ошибка генерации ответа."})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
@@ -1,14 +1,34 @@
-from fastapi import APIRouter, Depends, File, UploadFile, status
+from typing import List, Optional
 
-from src.models.documents import SummaryResponse, UploadResponse
-from src.services.analysis_service import DocumentAnalysisService, analysis_service
-from src.services.document_service import DocumentService, document_service
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Response, UploadFile, status
+
+from src.models.documents import (
+    BatchUploadResponse,
+    DocumentStatusResponse,
+    SummaryResponse,
+    UploadResponse,
+)
+from src.services.analysis_service import DocumentAnalysisService
+from src.services.batch_service import BatchUploadService
+from src.services.container import container
+from src.services.document_service import DocumentService
+from src.services.indexing_service import IndexingService
+from src.services.lifecycle_service import DocumentLifecycleService
 
 def get_document_service() -> DocumentService:
-    return document_service
+    return container.document_service
+
+def get_indexing_service() -> IndexingService:
+    return container.indexing_service
 
 def get_analysis_service() -> DocumentAnalysisService:
-    return analysis_service
+    return container.analysis_service
+
+def get_batch_upload_service() -> BatchUploadService:
+    return container.batch_upload_service
+
+def get_lifecycle_service() -> DocumentLifecycleService:
+    return container.lifecycle_service
 
 router = APIRouter(tags=["Documents"])
 
@@ -19,13 +39,83 @@ router = APIRouter(tags=["Documents"])
 )
 async def upload_document(
     file: UploadFile = File(...),
+    tags: Optional[str] = Form(None, description="Теги документа через запятую"),
+    ttl_seconds: Optional[float] = Form(
+        None, gt=0, description="Срок хранения документа в секундах"
+    ),
     service: DocumentService = Depends(get_document_service),
 ) -> UploadResponse:
     """
     Загружает документ, извлекает из него текст и сохраняет для последующего анализа.
-    Поддерживаемые форматы: PDF, TXT.
+    Поддерживаемые форматы: PDF, TXT. Необязательные теги позволяют задавать
+    вопросы сразу ко всем документам с тегом. По истечении `ttl_seconds`
+    документ удаляется вместе с индексом.
+    """
+    return await service.process_document(
+        file, DocumentService.parse_tags(tags), ttl_seconds
+    )
+
+@router.post(
+    "/documents/batch",
+    response_model=BatchUploadResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def upload_documents_batch(
+    files: List[UploadFile] = File(...),
+    tags: Optional[str] = Form(None, description="Теги всех документов пакета через запятую"),
+    ttl_seconds: Optional[float] = Form(
+        None, gt=0, description="Срок хранения всех документов пакета в секундах"
+    ),
+    service: BatchUploadService = Depends(get_batch_upload_service),
+) -> BatchUploadResponse:
+    """
+    Загружает пакет документов: несколько файлов PDF/TXT и/или zip-архивов.
+    Файлы сохраняются на диск, после чего обрабатываются в фоне; состояние
+    пакета доступно по `batchId`.
+    """
+    return await service.submit(files, DocumentService.parse_tags(tags), ttl_seconds)
+
+@router.get(
+    "/documents/batches/{batch_id}",
+    response_model=BatchUploadResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def get_batch_status(
+    batch_id: str,
+    service: BatchUploadService = Depends(get_batch_upload_service),
+) -> BatchUploadResponse:
+    """
+    Возвращает состояние пакетной загрузки и результаты по каждому файлу.
+    """
+    batch = await service.get_batch(batch_id)
+    if batch is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Пакет не найден."
+        )
+    return batch
+
+@router.get(
+    "/documents/{document_id}/status",
+    response_model=DocumentStatusResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def get_document_status(
+    document_id: str,
+    service: IndexingService = Depends(get_indexing_service),
+) -> DocumentStatusResponse:
+    """
+    Возвращает состояние индексации документа: pending, indexing, ready или failed.
     """
-    return await service.process_document(file)
+    indexing_status = await service.get_status(document_id)
+    if indexing_status is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Документ не найден."
+        )
+    return DocumentStatusResponse(
+        document_id=document_id,
+        status=indexing_status,
+        error=service.get_error(document_id),
+    )
 
 @router.get(
     "/documents/{document_id}/summary",
@@ -40,4 +130,22 @@ async def get_document_summary(
     Получает краткое содержание (summary) для указанного документа.
     """
     summary_text = await service.summarize_document(document_id)
-    return SummaryResponse(document_id=document_id, summary=summary_text)
\ No newline at end of file
+    return SummaryResponse(document_id=document_id, summary=summary_text)
+
+@router.delete(
+    "/documents/{document_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+)
+async def delete_document(
+    document_id: str,
+    service: DocumentLifecycleService = Depends(get_lifecycle_service),
+) -> Response:
+    """
+    Удаляет документ вместе с индексом, родительскими фрагментами,
+    BM25-индексом, summary и кэшированными ответами.
+    """
+    if not await service.delete_document(document_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Документ не найден."
+        )
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
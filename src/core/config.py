@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Optional
+
 from pydantic import SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -17,5 +19,98 @@ class Settings(BaseSettings):
     LOG_LEVEL: str = "INFO"
     OPENAI_API_KEY: SecretStr
 
+    # Модели
+    LLM_MODEL: str = "gpt-4o"
+    EMBEDDING_MODEL: str = "text-embedding-ada-002"
+
+    # Загрузка документов
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    PDF_EXTRACTION_WORKERS: int = 4
+    PDF_PAGES_PER_TASK: int = 50
+
+    # Пакетная загрузка
+    BATCH_UPLOAD_CONCURRENCY: int = 4
+    BATCH_MAX_FILES: int = 1000
+    BATCH_MAX_ARCHIVE_BYTES: int = 1024 * 1024 * 1024
+    BATCH_HISTORY_SIZE: int = 100
+
+    # Срок хранения документов и сборка мусора
+    DOCUMENT_TTL_SECONDS: Optional[float] = None
+    GC_ENABLED: bool = True
+    GC_INTERVAL_SECONDS: float = 3600.0
+    GC_COMPACT_EVERY: int = 24
+
+    # Деление на фрагменты
+    PARENT_CHUNK_SIZE: int = 2000
+    PARENT_CHUNK_OVERLAP: int = 200
+    CHILD_CHUNK_SIZE: int = 400
+    CHILD_CHUNK_OVERLAP: int = 100
+
+    # Переиндексация после смены настроек деления или модели эмбеддингов
+    REINDEX_ENABLED: bool = True
+    REINDEX_CONCURRENCY: int = 1
+    REINDEX_SWAP_GRACE_SECONDS: float = 30.0
+
+    # Векторное хранилище
+    CHROMA_PATH: str = "chroma_data"
+    CHROMA_HANDLE_CACHE_SIZE: int = 256
+    PARENT_STORE_PATH: str = "documents_storage/parents"
+    PARENT_STORE_CACHE_SIZE: int = 256
+    LEXICAL_INDEX_CACHE_SIZE: int = 64
+
+    # Гибридный поиск
+    RETRIEVAL_TOP_K: int = 5
+    RETRIEVAL_CANDIDATES: int = 20
+    RRF_K: int = 60
+    RERANKER_MODEL: Optional[str] = None
+    CONTEXT_MAX_TOKENS: int = 3000
+
+    # Вопросы к нескольким документам
+    CORPUS_MAX_DOCUMENTS: int = 100
+    CORPUS_SEARCH_CONCURRENCY: int = 8
+
+    # Пулы потоков для блокирующих вызовов Chroma и извлечения текста
+    RETRIEVAL_EXECUTOR_WORKERS: int = 8
+    INDEXING_EXECUTOR_WORKERS: int = 4
+    EXTRACTION_EXECUTOR_WORKERS: int = 2
+
+    # Фоновая индексация
+    INDEXING_WORKERS: int = 2
+    INDEXING_STATUS_HISTORY_SIZE: int = 10_000
+    EMBEDDING_BATCH_MAX_TOKENS: int = 8000
+    EMBEDDING_BATCH_MAX_SIZE: int = 256
+    EMBEDDING_CONCURRENCY: int = 4
+    EMBEDDING_TOKENS_PER_MINUTE: int = 1_000_000
+    EMBEDDING_MAX_RETRIES: int = 5
+
+    # Кэш эмбеддингов
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_PATH: str = "chroma_data/embedding_cache.sqlite3"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 500_000
+
+    # Суммаризация
+    SUMMARY_SINGLE_PASS_MAX_TOKENS: int = 12000
+    SUMMARY_CHUNK_TOKENS: int = 4000
+    SUMMARY_CHUNK_OVERLAP_TOKENS: int = 200
+    SUMMARY_CONCURRENCY: int = 4
+    SUMMARY_CACHE_PATH: str = "documents_storage/summaries"
+
+    # Модерация
+    MODERATION_CACHE_SIZE: int = 10_000
+    MODERATION_CACHE_TTL: float = 3600.0
+
+    # Кэш ответов на похожие вопросы
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95
+    ANSWER_CACHE_MAX_ENTRIES_PER_DOCUMENT: int = 100
+    ANSWER_CACHE_MAX_DOCUMENTS: int = 1000
+    ANSWER_CACHE_TTL: float = 86400.0
+
+    # Пул HTTP-соединений к OpenAI
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP_TIMEOUT: float = 60.0
+
 
 settings = Settings()
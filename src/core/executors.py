@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from src.core.config import settings
+from src.core.metrics import EXECUTOR_ACTIVE, EXECUTOR_QUEUE_DEPTH, EXECUTOR_WAIT
+
+T = TypeVar("T")
+
+
+class ExecutorLane:
+    """
+    Ограниченный пул потоков для одного вида блокирующих вызовов.
+
+    У поиска по запросам пользователя, фоновой индексации и извлечения
+    текста свои пулы, поэтому большая загрузка не занимает потоки, которых
+    ждут запросы чата. Глубина очереди, число занятых потоков и время
+    ожидания потока публикуются в метриках с меткой `lane`.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        if max_workers <= 0:
+            raise ValueError("Число потоков пула должно быть положительным.")
+        self.name = name
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Выполняет функцию в пуле и дожидается результата. Как и
+        `asyncio.to_thread`, переносит contextvars в поток. При отмене
+        ожидания задача, еще не взятая потоком, снимается с очереди.
+        """
+        submitted = time.perf_counter()
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, func, *args, **kwargs)
+
+        def run_in_thread() -> T:
+            EXECUTOR_QUEUE_DEPTH.dec(lane=self.name)
+            EXECUTOR_WAIT.observe(time.perf_counter() - submitted, lane=self.name)
+            EXECUTOR_ACTIVE.inc(lane=self.name)
+            try:
+                return call()
+            finally:
+                EXECUTOR_ACTIVE.dec(lane=self.name)
+
+        EXECUTOR_QUEUE_DEPTH.inc(lane=self.name)
+        future = self._get_executor().submit(run_in_thread)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if future.cancel():
+                EXECUTOR_QUEUE_DEPTH.dec(lane=self.name)
+            raise
+
+    def shutdown(self) -> None:
+        """
+        Останавливает пул, не дожидаясь выполняемых задач. При следующем
+        вызове `run` пул создается заново.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix=f"{self.name}-lane"
+            )
+        return self._executor
+
+
+retrieval_executor = ExecutorLane("retrieval", settings.RETRIEVAL_EXECUTOR_WORKERS)
+indexing_executor = ExecutorLane("indexing", settings.INDEXING_EXECUTOR_WORKERS)
+extraction_executor = ExecutorLane("extraction", settings.EXTRACTION_EXECUTOR_WORKERS)
+
+
+def shutdown_executors() -> None:
+    for lane in (retrieval_executor, indexing_executor, extraction_executor):
+        lane.shutdown()
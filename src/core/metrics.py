@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+class Metric:
+    """
+    Базовая метрика с набором меток. Значения хранятся по кортежу значений
+    меток в порядке `labelnames`.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Метрика {self.name} ожидает метки {self.labelnames}, "
+                f"получены {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> List[Sample]:
+        raise NotImplementedError
+
+
+class _ValueMetric(Metric):
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def _add(self, amount: float, labels: Dict[str, object]) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: object) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Sample]:
+        with self._lock:
+            return [
+                (self.name, self._labels(key), value)
+                for key, value in sorted(self._values.items())
+            ]
+
+
+class Counter(_ValueMetric):
+    """Монотонно растущий счетчик."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        if amount < 0:
+            raise ValueError("Счетчик не может уменьшаться.")
+        self._add(amount, labels)
+
+
+class Gauge(_ValueMetric):
+    """Значение, которое может как расти, так и уменьшаться."""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        self._add(amount, labels)
+
+    def dec(self, amount: float = 1.0, **labels: object) -> None:
+        self._add(-amount, labels)
+
+
+class Histogram(Metric):
+    """Распределение значений по корзинам с суммой и количеством наблюдений."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[bisect_left(self.buckets, value)] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    @contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        """Измеряет длительность блока в секундах, в том числе при ошибке."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: object) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def sum(self, **labels: object) -> float:
+        return self._sums.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[Sample]:
+        samples: List[Sample] = []
+        with self._lock:
+            for key, counts in sorted(self._counts.items()):
+                labels = self._labels(key)
+                cumulative = 0
+                for bound, count in zip((*self.buckets, math.inf), counts):
+                    cumulative += count
+                    samples.append(
+                        (
+                            f"{self.name}_bucket",
+                            {**labels, "le": _format_value(bound)},
+                            cumulative,
+                        )
+                    )
+                samples.append((f"{self.name}_sum", labels, self._sums[key]))
+                samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик процесса с выводом в текстовом формате Prometheus.
+
+    Помимо постоянных метрик поддерживаются коллекторы — функции, которые
+    строят метрики в момент чтения (например, из статистики кэшей).
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Metric]]] = []
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[Metric]]) -> None:
+        self._collectors.append(collector)
+
+    def unregister_collector(self, collector: Callable[[], Iterable[Metric]]) -> None:
+        self._collectors.remove(collector)
+
+    def render(self) -> str:
+        """
+        Возвращает все метрики в текстовом формате Prometheus 0.0.4.
+        """
+        metrics = list(self._metrics.values())
+        for collector in self._collectors:
+            metrics.extend(collector())
+
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Метрика {metric.name} уже зарегистрирована.")
+        self._metrics[metric.name] = metric
+        return metric
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value))
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return (
+        "{"
+        + ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels.items())
+        + "}"
+    )
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = metrics.histogram(
+    "http_request_duration_seconds",
+    "Длительность обработки HTTP-запросов по маршрутам.",
+    ("method", "route", "status"),
+)
+STAGE_DURATION = metrics.histogram(
+    "rag_stage_duration_seconds",
+    "Длительность стадий обработки документов и запросов.",
+    ("stage",),
+)
+LLM_TOKENS = metrics.counter(
+    "llm_tokens_total",
+    "Токены промптов и ответов LLM.",
+    ("operation", "kind"),
+)
+DOCUMENTS_STORED = metrics.counter(
+    "documents_stored_total",
+    "Сохраненные документы по типу файла.",
+    ("content_type",),
+)
+INDEXED_CHUNKS = metrics.counter(
+    "indexed_chunks_total",
+    "Фрагменты, записанные в векторную базу.",
+)
+EMBEDDING_TOKENS = metrics.counter(
+    "embedding_tokens_total",
+    "Токены текстов, отправленных на вычисление эмбеддингов при индексации.",
+)
+DOCUMENTS_DELETED = metrics.counter(
+    "documents_deleted_total",
+    "Удаленные документы по причине удаления.",
+    ("reason",),
+)
+STORAGE_RECLAIMED_BYTES = metrics.counter(
+    "storage_reclaimed_bytes_total",
+    "Место на диске, освобожденное сборщиком мусора.",
+)
+EXECUTOR_QUEUE_DEPTH = metrics.gauge(
+    "executor_queue_depth",
+    "Задачи, ожидающие свободного потока в пуле блокирующих вызовов.",
+    ("lane",),
+)
+EXECUTOR_ACTIVE = metrics.gauge(
+    "executor_active_threads",
+    "Потоки пула блокирующих вызовов, занятые задачами.",
+    ("lane",),
+)
+EXECUTOR_WAIT = metrics.histogram(
+    "executor_wait_seconds",
+    "Время ожидания свободного потока в пуле блокирующих вызовов.",
+    ("lane",),
+)
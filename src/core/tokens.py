@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import math
+from functools import lru_cache
+from typing import Optional
+
+import tiktoken
+from loguru import logger
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model_name: str) -> Optional[tiktoken.Encoding]:
+    """
+    Возвращает токенизатор tiktoken для модели. Если словарь токенизатора
+    недоступен (например, нет доступа к сети), возвращает None.
+    """
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        return get_encoding("gpt-4")
+    except Exception as e:
+        logger.warning(
+            f"Токенизатор для модели {model_name} недоступен, "
+            f"используется приблизительный подсчет: {e}"
+        )
+        return None
+
+
+def count_tokens(text: str, model_name: str) -> int:
+    """
+    Считает количество токенов в тексте для указанной модели.
+    """
+    encoding = get_encoding(model_name)
+    if encoding is None:
+        return math.ceil(len(text.encode("utf-8")) / 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model_name: str) -> str:
+    """
+    Обрезает текст до `max_tokens` токенов указанной модели.
+    """
+    if max_tokens <= 0:
+        return ""
+    encoding = get_encoding(model_name)
+    if encoding is None:
+        encoded = text.encode("utf-8")[: max_tokens * 4]
+        return encoded.decode("utf-8", errors="ignore")
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
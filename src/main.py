@@ -1,19 +1,27 @@
+import time
 from contextlib import asynccontextmanager
+from typing import Any
+
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
-from src.api.v1 import chat, documents
+from src.api.v1 import admin, chat, documents
 from src.core.config import settings
 from src.core.logging import logger
+from src.core.metrics import HTTP_REQUEST_DURATION, metrics
+from src.services.container import container
 
 
 # Менеджер Lifespan
 @asynccontextmanager
 async def lifespan(_: FastAPI):
+    container.start()
+    await container.warm_up()
     logger.info("Приложение запущено")
     yield
+    await container.aclose()
     logger.info("Приложение остановлено")
 
 
@@ -25,6 +33,32 @@ app = FastAPI(
     version="0.1.0",
 )
 
+metrics.register_collector(container.collect_metrics)
+
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """
+    Записывает длительность запроса по шаблону маршрута, чтобы запросы к
+    разным документам попадали в одну серию. Для потоковых ответов
+    учитывается время до начала потока.
+    """
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status_code,
+        )
+
+
 # Статические файлы и шаблоны
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
@@ -32,6 +66,7 @@ templates = Jinja2Templates(directory="templates")
 # API роутер
 app.include_router(documents.router, prefix="/api/v1")
 app.include_router(chat.router, prefix="/api/v1")
+app.include_router(admin.router, prefix="/api/v1")
 
 
 # Роутер для Frontend и служб
@@ -46,3 +81,29 @@ async def health_check() -> dict[str, str]:
     Проверка состояния сервиса.
     """
     return {"status": "ok"}
+
+
+@app.get("/health/pools", tags=["Health Check"])
+async def pool_stats() -> dict[str, Any]:
+    """
+    Статистика использования пулов HTTP-соединений к внешним API.
+    """
+    return container.pool_stats()
+
+
+@app.get("/health/caches", tags=["Health Check"])
+async def cache_stats() -> dict[str, Any]:
+    """
+    Статистика попаданий в кэши сервиса.
+    """
+    return container.cache_stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics() -> PlainTextResponse:
+    """
+    Метрики сервиса в текстовом формате Prometheus.
+    """
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from typing import List
+from typing import List, Optional
 
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, model_validator
 
 
 class ChatRequest(BaseModel):
@@ -16,12 +16,20 @@ class ChatRequest(BaseModel):
         description="ID документа, к которому задается вопрос",
     )
     question: str = Field(..., description="Вопрос пользователя к документу")
+    bypass_cache: bool = Field(
+        False,
+        alias="bypassCache",
+        description="Не использовать кэш ответов на похожие вопросы",
+    )
 
 
 class Source(BaseModel):
     """Модель для одного фрагмента-источника, использованного для ответа."""
 
     content: str = Field(..., description="Текст фрагмента-источника.")
+    page: Optional[int] = Field(
+        None, description="Номер страницы документа, на которой найден фрагмент."
+    )
 
 
 class ChatResponse(BaseModel):
@@ -41,3 +49,65 @@ class ChatResponse(BaseModel):
         alias="documentId",
         description="ID документа, к которому был задан вопрос.",
     )
+    prompt_tokens: int = Field(
+        0,
+        alias="promptTokens",
+        description="Размер промпта в токенах; 0, если LLM не вызывалась.",
+    )
+
+
+class CorpusChatRequest(BaseModel):
+    """Модель запроса к нескольким документам: списку ID или всем документам с тегом."""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    document_ids: Optional[List[str]] = Field(
+        None,
+        alias="documentIds",
+        min_length=1,
+        description="ID документов, к которым задается вопрос",
+    )
+    tag: Optional[str] = Field(
+        None, description="Тег документов, к которым задается вопрос"
+    )
+    question: str = Field(..., description="Вопрос пользователя к документам")
+
+    @model_validator(mode="after")
+    def check_scope(self) -> CorpusChatRequest:
+        if (self.document_ids is None) == (self.tag is None):
+            raise ValueError("Укажите либо documentIds, либо tag.")
+        return self
+
+
+class CorpusSource(Source):
+    """Фрагмент-источник с указанием документа, из которого он взят."""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    document_id: str = Field(
+        ..., alias="documentId", description="ID документа, из которого взят фрагмент."
+    )
+
+
+class CorpusChatResponse(BaseModel):
+    """Ответ на вопрос к нескольким документам."""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    answer: str = Field(
+        ..., description="Синтезированный ответ на вопрос пользователя."
+    )
+    sources: List[CorpusSource] = Field(
+        ...,
+        description="Фрагменты-источники из всех документов, отобранные по общей релевантности.",
+    )
+    document_ids: List[str] = Field(
+        ...,
+        alias="documentIds",
+        description="ID документов, по которым выполнялся поиск.",
+    )
+    prompt_tokens: int = Field(
+        0,
+        alias="promptTokens",
+        description="Размер промпта в токенах; 0, если LLM не вызывалась.",
+    )
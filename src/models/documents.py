@@ -1,8 +1,39 @@
 from __future__ import annotations
 
+from bisect import bisect_right
+from datetime import datetime
+from enum import Enum
+from typing import Dict, List, Optional
+
 from pydantic import BaseModel, Field, ConfigDict
 
 
+class IndexingStatus(str, Enum):
+    """Состояние индексации документа в векторной базе."""
+
+    PENDING = "pending"
+    INDEXING = "indexing"
+    READY = "ready"
+    FAILED = "failed"
+
+
+class BatchStatus(str, Enum):
+    """Состояние файла в пакетной загрузке и пакета в целом."""
+
+    PENDING = "pending"
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class ReindexStatus(str, Enum):
+    """Состояние фоновой переиндексации."""
+
+    IDLE = "idle"
+    RUNNING = "running"
+    DONE = "done"
+
+
 class UploadResponse(BaseModel):
     """Модель ответа с метаданными загруженного документа."""
 
@@ -25,6 +56,25 @@ class UploadResponse(BaseModel):
         description="MIME-тип загруженного файла",
         examples=["application/pdf"],
     )
+    status: IndexingStatus = Field(
+        IndexingStatus.PENDING,
+        description="Состояние индексации документа",
+        examples=["pending"],
+    )
+    deduplicated: bool = Field(
+        False,
+        description="Файл совпадает с ранее загруженным, возвращен существующий документ",
+    )
+    expires_at: Optional[datetime] = Field(
+        None,
+        alias="expiresAt",
+        description="Время, после которого документ будет удален; null — бессрочно",
+    )
+    tags: List[str] = Field(
+        default_factory=list,
+        description="Теги, по которым документ можно выбрать для вопросов к нескольким документам",
+        examples=[["contracts", "2024"]],
+    )
 
 
 class SummaryResponse(BaseModel):
@@ -40,3 +90,173 @@ class SummaryResponse(BaseModel):
         description="Сгенерированное краткое содержание документа",
         examples=["В документе рассматриваются основные принципы..."],
     )
+
+
+class DocumentStatusResponse(BaseModel):
+    """Модель ответа с состоянием индексации документа."""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    document_id: str = Field(
+        ...,
+        alias="documentId",
+        description="Уникальный идентификатор документа",
+        examples=["doc_a1b2c3d4"],
+    )
+    status: IndexingStatus = Field(
+        ...,
+        description="Состояние индексации: pending, indexing, ready или failed",
+        examples=["ready"],
+    )
+    error: Optional[str] = Field(
+        None,
+        description="Описание ошибки, если индексация завершилась неудачно",
+    )
+
+
+class BatchItem(BaseModel):
+    """Результат обработки одного файла из пакета."""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    filename: str = Field(
+        ...,
+        description="Имя файла или путь внутри zip-архива",
+        examples=["contracts/2024/supply.pdf"],
+    )
+    status: BatchStatus = Field(
+        BatchStatus.PENDING,
+        description="Состояние обработки файла: pending, processing, done или failed",
+    )
+    document_id: Optional[str] = Field(
+        None,
+        alias="documentId",
+        description="ID документа после успешной обработки",
+    )
+    deduplicated: bool = Field(
+        False, description="Файл совпадает с ранее загруженным документом"
+    )
+    indexing_status: Optional[IndexingStatus] = Field(
+        None,
+        alias="indexingStatus",
+        description="Состояние индексации документа",
+    )
+    error: Optional[str] = Field(None, description="Причина ошибки обработки")
+
+
+class BatchUploadResponse(BaseModel):
+    """Модель ответа с состоянием пакетной загрузки."""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    batch_id: str = Field(
+        ...,
+        alias="batchId",
+        description="ID пакета для опроса состояния",
+        examples=["batch_a1b2c3d4"],
+    )
+    status: BatchStatus = Field(
+        ..., description="processing, пока обрабатывается хотя бы один файл, иначе done"
+    )
+    total: int = Field(..., description="Количество файлов в пакете")
+    completed: int = Field(0, description="Количество успешно обработанных файлов")
+    failed: int = Field(0, description="Количество файлов с ошибкой")
+    items: List[BatchItem] = Field(
+        default_factory=list, description="Результаты по каждому файлу"
+    )
+
+
+class ReindexProgress(BaseModel):
+    """Модель ответа с ходом переиндексации устаревших индексов."""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    status: ReindexStatus = Field(
+        ReindexStatus.IDLE,
+        description="Состояние переиндексации",
+        examples=["running"],
+    )
+    index_version: str = Field(
+        ...,
+        alias="indexVersion",
+        description="Версия текущих настроек деления и модели эмбеддингов",
+        examples=["3f9c2a71b0de"],
+    )
+    total: int = Field(0, description="Количество устаревших индексов")
+    completed: int = Field(0, description="Количество перестроенных индексов")
+    failed: int = Field(0, description="Количество индексов с ошибкой перестроения")
+    in_progress: List[str] = Field(
+        default_factory=list,
+        alias="inProgress",
+        description="Документы, индекс которых перестраивается сейчас",
+    )
+    errors: Dict[str, str] = Field(
+        default_factory=dict,
+        description="Причины ошибок по ID документа",
+    )
+    started_at: Optional[datetime] = Field(
+        None, alias="startedAt", description="Время запуска переиндексации"
+    )
+    finished_at: Optional[datetime] = Field(
+        None, alias="finishedAt", description="Время завершения переиндексации"
+    )
+
+
+class GarbageCollectionReport(BaseModel):
+    """Модель ответа с итогами прохода сборщика мусора."""
+
+    model_config = ConfigDict(populate_by_name=True)
+
+    started_at: datetime = Field(..., alias="startedAt", description="Время запуска")
+    finished_at: Optional[datetime] = Field(
+        None, alias="finishedAt", description="Время завершения"
+    )
+    expired_documents: List[str] = Field(
+        default_factory=list,
+        alias="expiredDocuments",
+        description="Документы, удаленные по истечении срока хранения",
+    )
+    orphan_indexes: int = Field(
+        0,
+        alias="orphanIndexes",
+        description="Удаленные индексы документов, текст которых уже удален",
+    )
+    orphan_files: int = Field(
+        0,
+        alias="orphanFiles",
+        description="Удаленные файлы родительских фрагментов и BM25 без документа",
+    )
+    orphan_segments: int = Field(
+        0,
+        alias="orphanSegments",
+        description="Удаленные папки HNSW-сегментов Chroma без коллекции",
+    )
+    compacted: bool = Field(
+        False, description="Выполнялось ли сжатие базы Chroma в этом проходе"
+    )
+    reclaimed_bytes: int = Field(
+        0, alias="reclaimedBytes", description="Освобождено места на диске, байт"
+    )
+
+
+class DocumentMetadata(BaseModel):
+    """
+    Метаданные сохраненного документа и индекс смещений его текста.
+
+    `page_starts` — смещения (в символах) начала каждой страницы.
+    `expires_at` — время, после которого документ удаляется сборщиком мусора.
+    """
+
+    document_id: str
+    content_hash: str
+    content_type: str
+    page_count: int
+    char_count: int
+    byte_count: int
+    token_count: int
+    page_starts: List[int]
+    expires_at: Optional[datetime] = None
+
+    def page_at(self, char_offset: int) -> int:
+        """Возвращает номер страницы (с единицы), содержащей символ."""
+        return max(1, bisect_right(self.page_starts, char_offset))
@@ -1,15 +1,22 @@
 from __future__ import annotations
-from typing import Optional
+
+import asyncio
+import hashlib
+from typing import Dict, List, Optional
 from pathlib import Path
 
 from fastapi import HTTPException, status
 from langchain.prompts import PromptTemplate
 from langchain.schema.output_parser import StrOutputParser
+from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import ChatOpenAI
 from loguru import logger
 
 from src.core.config import Settings
+from src.core.metrics import LLM_TOKENS, STAGE_DURATION
+from src.core.tokens import count_tokens
 from src.services.document_service import DocumentService
+from src.services.summary_cache import SummaryCache
 
 
 class DocumentAnalysisService:
@@ -18,43 +25,153 @@ class DocumentAnalysisService:
             app_settings: Settings,
             document_service: DocumentService,
             llm: Optional[ChatOpenAI] = None,
+            summary_cache: Optional[SummaryCache] = None,
     ):
         self.settings = app_settings
         self.document_service = document_service
         self.llm = llm or ChatOpenAI(
-            model_name="gpt-4o",
+            model_name=self.settings.LLM_MODEL,
             temperature=0,
             openai_api_key=self.settings.OPENAI_API_KEY.get_secret_value(),
         )
         self.prompt_template = self._load_prompt_template()
+        self.reduce_prompt_template = self._load_prompt_template(
+            "summary_reduce_prompt.jinja2"
+        )
+        self.summary_cache = summary_cache or SummaryCache(
+            Path(self.settings.SUMMARY_CACHE_PATH)
+        )
+        self._cache_fingerprint = hashlib.sha256(
+            "\0".join(
+                [
+                    self.prompt_template.template,
+                    self.reduce_prompt_template.template,
+                    self.settings.LLM_MODEL,
+                ]
+            ).encode("utf-8")
+        ).hexdigest()[:16]
+        self._in_flight: Dict[str, asyncio.Future] = {}
 
     @staticmethod
-    def _load_prompt_template() -> PromptTemplate:
-        template_path = (
-                Path(__file__).parent.parent / "prompts" / "summary_prompt.jinja2"
-        )
+    def _load_prompt_template(name: str = "summary_prompt.jinja2") -> PromptTemplate:
+        template_path = Path(__file__).parent.parent / "prompts" / name
         template_str = template_path.read_text(encoding="utf-8")
         return PromptTemplate.from_template(template_str)
 
     async def summarize_document(self, document_id: str) -> str:
+        """
+        Возвращает краткое содержание документа. Готовые summary берутся из
+        кэша; одновременные запросы одного документа ждут одну генерацию.
+        """
         logger.info(f"Запрос на краткое содержание для документа '{document_id}'")
 
+        summary = await self.summary_cache.get(document_id, self._cache_fingerprint)
+        if summary is not None:
+            logger.info(f"Краткое содержание для '{document_id}' взято из кэша.")
+            return summary
+
+        task = self._in_flight.get(document_id)
+        if task is None:
+            task = asyncio.ensure_future(self._generate_summary(document_id))
+            self._in_flight[document_id] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(document_id, None))
+        return await asyncio.shield(task)
+
+    async def _generate_summary(self, document_id: str) -> str:
         document_text = await self.document_service.get_document_content(document_id)
         if document_text is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Документ не найден."
             )
 
-        summarization_chain = self.prompt_template | self.llm | StrOutputParser()
-        summary = await summarization_chain.ainvoke({"document_text": document_text})
+        metadata = await self.document_service.get_document_metadata(document_id)
+        if metadata is not None:
+            document_tokens = metadata.token_count
+        else:
+            document_tokens = await asyncio.to_thread(self._count_tokens, document_text)
+        with STAGE_DURATION.time(stage="summary"):
+            if document_tokens <= self.settings.SUMMARY_SINGLE_PASS_MAX_TOKENS:
+                summary = await self._summarize_text(document_text)
+            else:
+                summary = await self._summarize_hierarchically(document_text)
+        LLM_TOKENS.inc(document_tokens, operation="summary", kind="prompt")
+        LLM_TOKENS.inc(
+            self._count_tokens(summary), operation="summary", kind="completion"
+        )
 
+        await self.summary_cache.set(document_id, self._cache_fingerprint, summary)
         logger.success(f"Краткое содержание для '{document_id}' успешно создано.")
         return summary
 
+    async def _summarize_text(self, text: str) -> str:
+        summarization_chain = self.prompt_template | self.llm | StrOutputParser()
+        return await summarization_chain.ainvoke({"document_text": text})
+
+    async def _summarize_hierarchically(self, document_text: str) -> str:
+        """
+        Map-reduce суммаризация большого документа: части текста суммируются
+        параллельно, затем частичные summary объединяются по уровням дерева,
+        пока не останется одно.
+        """
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=self.settings.SUMMARY_CHUNK_TOKENS,
+            chunk_overlap=self.settings.SUMMARY_CHUNK_OVERLAP_TOKENS,
+            length_function=self._count_tokens,
+        )
+        chunks = await asyncio.to_thread(splitter.split_text, document_text)
+        logger.info(f"Иерархическая суммаризация: {len(chunks)} частей")
+
+        semaphore = asyncio.Semaphore(self.settings.SUMMARY_CONCURRENCY)
+
+        async def bounded(coroutine):
+            async with semaphore:
+                return await coroutine
+
+        summaries = list(
+            await asyncio.gather(
+                *(bounded(self._summarize_text(chunk)) for chunk in chunks)
+            )
+        )
+
+        reduce_chain = self.reduce_prompt_template | self.llm | StrOutputParser()
+        while len(summaries) > 1:
+            groups = self._group_for_reduce(summaries)
+            summaries = list(
+                await asyncio.gather(
+                    *(
+                        bounded(
+                            reduce_chain.ainvoke(
+                                {"summaries": "\n\n---\n\n".join(group)}
+                            )
+                        )
+                        for group in groups
+                    )
+                )
+            )
+        return summaries[0]
+
+    def _group_for_reduce(self, summaries: List[str]) -> List[List[str]]:
+        """
+        Делит summary на группы, помещающиеся в один запрос. В каждой группе
+        не меньше двух элементов, чтобы каждый уровень дерева сокращал их число.
+        """
+        max_tokens = self.settings.SUMMARY_SINGLE_PASS_MAX_TOKENS
+        groups: List[List[str]] = []
+        current: List[str] = []
+        current_tokens = 0
+        for summary in summaries:
+            tokens = self._count_tokens(summary)
+            if len(current) >= 2 and current_tokens + tokens > max_tokens:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(summary)
+            current_tokens += tokens
 
-from src.core.config import settings
-from src.services.document_service import document_service as doc_service_instance
+        if len(current) == 1 and groups:
+            groups[-1].extend(current)
+        elif current:
+            groups.append(current)
+        return groups
 
-analysis_service = DocumentAnalysisService(
-    app_settings=settings, document_service=doc_service_instance
-)
+    def _count_tokens(self, text: str) -> int:
+        return count_tokens(text, self.settings.LLM_MODEL)
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from src.core.cache import LRUCache
+from src.models.chat import ChatResponse
+
+
+@dataclass
+class _CachedAnswer:
+    question: str
+    vector: np.ndarray
+    response: ChatResponse
+    expires_at: float
+
+
+class SemanticAnswerCache:
+    """
+    Кэш ответов на вопросы к документам с поиском по смыслу.
+
+    Для каждого документа хранится ограниченный список ранее заданных вопросов
+    с их эмбеддингами. Новый вопрос считается повтором, если косинусное
+    сходство его эмбеддинга с одним из сохраненных не ниже порога. Документы
+    вытесняются по давности использования, ответы внутри документа — по
+    давности использования и по истечении времени жизни.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.95,
+        max_entries_per_document: int = 100,
+        max_documents: int = 1000,
+        ttl: float = 86400.0,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.max_entries_per_document = max_entries_per_document
+        self.ttl = ttl
+        self._timer = timer
+        self._documents: LRUCache[str, List[_CachedAnswer]] = LRUCache(max_documents)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, document_id: str, vector: Sequence[float]) -> Optional[ChatResponse]:
+        """
+        Возвращает сохраненный ответ на наиболее похожий вопрос к документу
+        или None, если похожих вопросов нет.
+        """
+        entries = self._live_entries(document_id)
+        if not entries:
+            self.misses += 1
+            return None
+
+        query = self._normalize(vector)
+        similarities = np.stack([entry.vector for entry in entries]) @ query
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        entries.append(entries.pop(best))
+        return entries[-1].response
+
+    def add(
+        self,
+        document_id: str,
+        question: str,
+        vector: Sequence[float],
+        response: ChatResponse,
+    ) -> None:
+        entries = self._live_entries(document_id)
+        entries.append(
+            _CachedAnswer(
+                question=question,
+                vector=self._normalize(vector),
+                response=response,
+                expires_at=self._timer() + self.ttl,
+            )
+        )
+        del entries[: -self.max_entries_per_document]
+        self._documents.set(document_id, entries)
+
+    def discard(self, document_id: str) -> None:
+        self._documents.pop(document_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "documents": len(self._documents),
+        }
+
+    def _live_entries(self, document_id: str) -> List[_CachedAnswer]:
+        entries = self._documents.get(document_id)
+        if entries is None:
+            return []
+        now = self._timer()
+        entries[:] = [entry for entry in entries if entry.expires_at > now]
+        return entries
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Set
+
+from fastapi import HTTPException, UploadFile, status
+from loguru import logger
+
+from src.core.cache import LRUCache
+from src.models.documents import BatchItem, BatchStatus, BatchUploadResponse
+from src.services.document_service import (
+    CONTENT_TYPES_BY_EXTENSION,
+    DocumentService,
+    SpooledUpload,
+)
+
+ZIP_CONTENT_TYPES = ("application/zip", "application/x-zip-compressed")
+
+
+@dataclass
+class _Batch:
+    batch_id: str
+    items: List[BatchItem]
+
+
+class BatchUploadService:
+    """
+    Пакетная загрузка документов.
+
+    Все части запроса сначала сохраняются на диск, zip-архивы распаковываются
+    по файлам. Затем файлы обрабатываются в фоне, не больше `concurrency`
+    одновременно, а состояние пакета опрашивается по его ID. Пакеты хранятся
+    в памяти процесса, самые старые вытесняются.
+    """
+
+    def __init__(
+        self,
+        document_service: DocumentService,
+        concurrency: int = 4,
+        max_files: int = 1000,
+        max_archive_bytes: int = 1024 * 1024 * 1024,
+        history_size: int = 100,
+    ):
+        self.document_service = document_service
+        self.concurrency = concurrency
+        self.max_files = max_files
+        self.max_archive_bytes = max_archive_bytes
+        self._batches: LRUCache[str, _Batch] = LRUCache(history_size)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(
+        self,
+        files: Sequence[UploadFile],
+        tags: Sequence[str] = (),
+        ttl_seconds: Optional[float] = None,
+    ) -> BatchUploadResponse:
+        """
+        Сохраняет файлы пакета на диск и запускает их обработку в фоне.
+        Возвращает состояние пакета сразу после сохранения.
+        """
+        uploads: List[SpooledUpload] = []
+        try:
+            for file in files:
+                uploads.extend(await self._spool(file))
+                if len(uploads) > self.max_files:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Слишком много файлов в пакете: максимум {self.max_files}.",
+                    )
+        except BaseException:
+            await self._remove(uploads)
+            raise
+
+        batch = _Batch(
+            batch_id=f"batch_{uuid.uuid4().hex}",
+            items=[BatchItem(filename=upload.filename) for upload in uploads],
+        )
+        self._batches.set(batch.batch_id, batch)
+        logger.info(f"Пакет {batch.batch_id}: принято файлов {len(uploads)}")
+
+        task = asyncio.create_task(self._process(batch, uploads, tags, ttl_seconds))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return self._build_response(batch)
+
+    async def get_batch(self, batch_id: str) -> Optional[BatchUploadResponse]:
+        """
+        Возвращает состояние пакета вместе с состоянием индексации
+        обработанных документов или None, если пакет неизвестен.
+        """
+        batch = self._batches.get(batch_id)
+        if batch is None:
+            return None
+
+        response = self._build_response(batch)
+        indexing_service = self.document_service.indexing_service
+        if indexing_service is not None:
+            for item in response.items:
+                if item.document_id is not None:
+                    item.indexing_status = await indexing_service.get_status(
+                        item.document_id
+                    )
+        return response
+
+    async def aclose(self) -> None:
+        """
+        Отменяет обработку незавершенных пакетов.
+        """
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _spool(self, file: UploadFile) -> List[SpooledUpload]:
+        filename = file.filename or ""
+        if file.content_type in ZIP_CONTENT_TYPES or filename.lower().endswith(".zip"):
+            archive_path, _ = await self.document_service.spool_upload(file)
+            try:
+                return await self.document_service.unpack_archive(
+                    archive_path, self.max_files, self.max_archive_bytes
+                )
+            finally:
+                await asyncio.to_thread(archive_path.unlink, missing_ok=True)
+
+        upload = SpooledUpload(filename=filename, content_type=file.content_type)
+        if upload.content_type in CONTENT_TYPES_BY_EXTENSION.values():
+            upload.path, upload.content_hash = await self.document_service.spool_upload(
+                file
+            )
+        return [upload]
+
+    async def _process(
+        self,
+        batch: _Batch,
+        uploads: List[SpooledUpload],
+        tags: Sequence[str],
+        ttl_seconds: Optional[float] = None,
+    ) -> None:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def process_item(item: BatchItem, upload: SpooledUpload) -> None:
+            async with semaphore:
+                item.status = BatchStatus.PROCESSING
+                try:
+                    response = await self.document_service.store_upload(
+                        upload, tags, ttl_seconds
+                    )
+                except HTTPException as e:
+                    item.status = BatchStatus.FAILED
+                    item.error = str(e.detail)
+                except Exception as e:
+                    logger.error(
+                        f"Ошибка обработки файла {upload.filename} "
+                        f"из пакета {batch.batch_id}: {e}"
+                    )
+                    item.status = BatchStatus.FAILED
+                    item.error = "Ошибка обработки файла."
+                else:
+                    item.status = BatchStatus.DONE
+                    item.document_id = response.document_id
+                    item.deduplicated = response.deduplicated
+                finally:
+                    await self._remove([upload])
+
+        try:
+            await asyncio.gather(
+                *(
+                    process_item(item, upload)
+                    for item, upload in zip(batch.items, uploads)
+                )
+            )
+        finally:
+            await self._remove(uploads)
+
+        response = self._build_response(batch)
+        logger.info(
+            f"Пакет {batch.batch_id} обработан: успешно {response.completed}, "
+            f"с ошибкой {response.failed}"
+        )
+
+    @staticmethod
+    async def _remove(uploads: Sequence[SpooledUpload]) -> None:
+        for upload in uploads:
+            if upload.path is not None:
+                await asyncio.to_thread(upload.path.unlink, missing_ok=True)
+
+    @staticmethod
+    def _build_response(batch: _Batch) -> BatchUploadResponse:
+        completed = sum(item.status == BatchStatus.DONE for item in batch.items)
+        failed = sum(item.status == BatchStatus.FAILED for item in batch.items)
+        return BatchUploadResponse(
+            batch_id=batch.batch_id,
+            status=(
+                BatchStatus.DONE
+                if completed + failed == len(batch.items)
+                else BatchStatus.PROCESSING
+            ),
+            total=len(batch.items),
+            completed=completed,
+            failed=failed,
+            items=[item.model_copy() for item in batch.items],
+        )
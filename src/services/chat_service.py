@@ -1,23 +1,69 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
+import time
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
 
 import chromadb
 import openai
 from fastapi import HTTPException, status
 from langchain.prompts import PromptTemplate
 from langchain.schema.output_parser import StrOutputParser
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import Chroma
 from langchain_core.documents import Document
+from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from loguru import logger
 
+from src.core.cache import TTLCache
 from src.core.config import Settings
-from src.models.chat import ChatResponse, Source
+from src.core.executors import retrieval_executor
+from src.core.metrics import LLM_TOKENS, STAGE_DURATION
+from src.models.chat import ChatResponse, CorpusChatResponse, CorpusSource, Source
+from src.core.tokens import count_tokens
+from src.services.answer_cache import SemanticAnswerCache
+from src.services.collection_registry import IndexGeneration
+from src.services.context_assembler import ContextAssembler
 from src.services.document_service import DocumentService
+from src.services.indexing_service import IndexingService
+from src.services.retrieval import (
+    CrossEncoderReranker,
+    build_reranker,
+    reciprocal_rank_fusion,
+)
+
+NO_ANSWER_MESSAGE = (
+    "Я не могу найти ответ на этот вопрос в данном документе. "
+    "Пожалуйста, попробуйте переформулировать ваш запрос."
+)
+FILTERED_ANSWER_MESSAGE = (
+    "Сгенерированный ответ был отфильтрован как потенциально небезопасный."
+)
+
+T = TypeVar("T")
+
+
+@dataclass
+class RetrievalResult:
+    """Результат поиска по документу или найденный в кэше готовый ответ."""
+
+    source_documents: List[Document] = field(default_factory=list)
+    parent_contents: List[str] = field(default_factory=list)
+    question_vector: Optional[List[float]] = None
+    cached_response: Optional[ChatResponse] = None
 
 
 class ChatService:
@@ -28,22 +74,57 @@ class ChatService:
         llm: Optional[ChatOpenAI] = None,
         embeddings: Optional[OpenAIEmbeddings] = None,
         chroma_client: Optional[chromadb.Client] = None,
+        moderation_client: Optional[openai.AsyncOpenAI] = None,
+        indexing_service: Optional[IndexingService] = None,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        reranker: Optional[CrossEncoderReranker] = None,
     ):
         self.settings = settings
         self.document_service = document_service
         self.llm = llm or ChatOpenAI(
-            model_name="gpt-4o",
+            model_name=self.settings.LLM_MODEL,
             temperature=0,
             openai_api_key=self.settings.OPENAI_API_KEY.get_secret_value(),
             max_retries=3,
         )
         self.embeddings = embeddings or OpenAIEmbeddings(
-            openai_api_key=self.settings.OPENAI_API_KEY.get_secret_value()
+            model=self.settings.EMBEDDING_MODEL,
+            openai_api_key=self.settings.OPENAI_API_KEY.get_secret_value(),
         )
         self.chroma_client = chroma_client or chromadb.PersistentClient(
-            path="chroma_data"
+            path=self.settings.CHROMA_PATH
+        )
+        self.moderation_client = moderation_client or openai.AsyncOpenAI(
+            api_key=self.settings.OPENAI_API_KEY.get_secret_value(), max_retries=3
         )
+        self.indexing_service = indexing_service or IndexingService(
+            settings=self.settings,
+            document_service=self.document_service,
+            embeddings=self.embeddings,
+            chroma_client=self.chroma_client,
+        )
+        self.parent_store = self.indexing_service.parent_store
+        self.lexical_store = self.indexing_service.lexical_store
+        self.reranker = reranker or build_reranker(self.settings.RERANKER_MODEL)
         self.prompt_template = self._load_prompt_template()
+        self.context_assembler = ContextAssembler(
+            model_name=self.settings.LLM_MODEL,
+            max_tokens=self.settings.CONTEXT_MAX_TOKENS,
+        )
+        self.moderation_cache: TTLCache[str, bool] = TTLCache(
+            maxsize=self.settings.MODERATION_CACHE_SIZE,
+            ttl=self.settings.MODERATION_CACHE_TTL,
+        )
+        self.moderation_cache_hits = 0
+        self.moderation_cache_misses = 0
+        if answer_cache is None and self.settings.ANSWER_CACHE_ENABLED:
+            answer_cache = SemanticAnswerCache(
+                similarity_threshold=self.settings.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+                max_entries_per_document=self.settings.ANSWER_CACHE_MAX_ENTRIES_PER_DOCUMENT,
+                max_documents=self.settings.ANSWER_CACHE_MAX_DOCUMENTS,
+                ttl=self.settings.ANSWER_CACHE_TTL,
+            )
+        self.answer_cache = answer_cache
 
     @staticmethod
     def _load_prompt_template() -> PromptTemplate:
@@ -51,111 +132,560 @@ class ChatService:
         template_str = template_path.read_text(encoding="utf-8")
         return PromptTemplate.from_template(template_str)
 
-    async def query_document(self, document_id: str, question: str) -> ChatResponse:
+    async def query_document(
+        self, document_id: str, question: str, bypass_cache: bool = False
+    ) -> ChatResponse:
         logger.info(f"Запрос к документу '{document_id}' с вопросом: '{question}'")
 
-        if await self._is_content_harmful(question):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, detail="Недопустимый запрос."
+        retrieval = await self._check_and_retrieve(
+            document_id, question, use_cache=not bypass_cache
+        )
+        if retrieval.cached_response is not None:
+            return retrieval.cached_response
+
+        prompt_tokens = 0
+        if not retrieval.source_documents:
+            answer = NO_ANSWER_MESSAGE
+        else:
+            prompt_input, prompt_tokens = self._build_prompt_input(
+                document_id, question, retrieval
             )
+            answer = await self._generate_answer(prompt_input)
 
-        vector_store = await self._get_or_create_vector_store(document_id)
-        retriever = vector_store.as_retriever(search_kwargs={"k": 5})
+        response = ChatResponse(
+            answer=await self._moderate_answer(answer),
+            sources=self._build_sources(retrieval),
+            document_id=document_id,
+            prompt_tokens=prompt_tokens,
+        )
+        self._remember_answer(document_id, question, retrieval, response)
+
+        logger.info(
+            f"Ответ для '{document_id}' сгенерирован: {len(response.answer)} символов, "
+            f"{len(response.sources)} источников"
+        )
+        return response
+
+    async def stream_query(
+        self, document_id: str, question: str, bypass_cache: bool = False
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Потоковый вариант `query_document`. Генерирует события в порядке:
+        `sources` — найденные фрагменты, `token` — части ответа по мере
+        генерации, `done` — итоговый ответ после проверки модерацией.
+
+        Токены отправляются до проверки ответа модерацией. Если ответ
+        отклонен, перед `done` отправляется событие `flagged` с текстом
+        замены: клиент должен удалить уже показанные токены.
+        """
+        logger.info(
+            f"Потоковый запрос к документу '{document_id}' с вопросом: '{question}'"
+        )
+
+        retrieval = await self._check_and_retrieve(
+            document_id, question, use_cache=not bypass_cache
+        )
+        cached_response = retrieval.cached_response
+        if cached_response is not None:
+            yield (
+                "sources",
+                {
+                    "sources": [
+                        source.model_dump() for source in cached_response.sources
+                    ]
+                },
+            )
+            yield "token", {"text": cached_response.answer}
+            yield "done", cached_response.model_dump(by_alias=True)
+            return
 
-        source_documents = await retriever.ainvoke(question)
-        context = self._format_docs_from_metadata(source_documents)
+        sources = self._build_sources(retrieval)
+        yield "sources", {"sources": [source.model_dump() for source in sources]}
 
-        if not source_documents:
-            answer = "Я не могу найти ответ на этот вопрос в данном документе. Пожалуйста, попробуйте переформулировать ваш запрос."
+        prompt_tokens = 0
+        if not retrieval.source_documents:
+            answer = NO_ANSWER_MESSAGE
+            yield "token", {"text": answer}
         else:
-            rag_chain = (
-                {"context": lambda x: x["context"], "question": lambda x: x["question"]}
-                | self.prompt_template
-                | self.llm
-                | StrOutputParser()
+            prompt_input, prompt_tokens = self._build_prompt_input(
+                document_id, question, retrieval
             )
-            answer = await rag_chain.ainvoke({"context": context, "question": question})
+            answer_parts: List[str] = []
+            started = time.perf_counter()
+            async for token in self._build_rag_chain().astream(prompt_input):
+                if not answer_parts:
+                    STAGE_DURATION.observe(
+                        time.perf_counter() - started, stage="llm_first_token"
+                    )
+                answer_parts.append(token)
+                yield "token", {"text": token}
+            STAGE_DURATION.observe(time.perf_counter() - started, stage="llm_total")
+            answer = "".join(answer_parts)
+            self._count_completion_tokens(answer)
 
-        if await self._is_content_harmful(answer):
-            answer = (
-                "Сгенерированный ответ был отфильтрован как потенциально небезопасный."
+        moderated_answer = await self._moderate_answer(answer)
+        if moderated_answer != answer:
+            yield "flagged", {"answer": moderated_answer}
+        response = ChatResponse(
+            answer=moderated_answer,
+            sources=sources,
+            document_id=document_id,
+            prompt_tokens=prompt_tokens,
+        )
+        self._remember_answer(document_id, question, retrieval, response)
+        yield "done", response.model_dump(by_alias=True)
+
+    async def query_documents(
+        self,
+        question: str,
+        document_ids: Optional[Sequence[str]] = None,
+        tag: Optional[str] = None,
+    ) -> CorpusChatResponse:
+        """
+        Отвечает на вопрос по нескольким документам: списку ID или всем
+        документам с тегом. Коллекции документов опрашиваются параллельно,
+        найденные фрагменты ранжируются вместе, LLM вызывается один раз.
+        """
+        document_ids = await self._resolve_corpus(document_ids, tag)
+        logger.info(f"Запрос к {len(document_ids)} документам с вопросом: '{question}'")
+
+        retrieval = await self._check_while(
+            question, self._search_corpus(document_ids, question)
+        )
+
+        prompt_tokens = 0
+        if not retrieval.source_documents:
+            answer = NO_ANSWER_MESSAGE
+        else:
+            prompt_input, prompt_tokens = self._build_prompt_input(
+                f"{len(document_ids)} документов", question, retrieval
             )
+            answer = await self._generate_answer(prompt_input)
 
-        sources = [
-            Source(content=doc.metadata.get("parent_content", doc.page_content))
-            for doc in source_documents
-        ]
-        response = ChatResponse(answer=answer, sources=sources, document_id=document_id)
+        return CorpusChatResponse(
+            answer=await self._moderate_answer(answer),
+            sources=[
+                CorpusSource(
+                    content=content,
+                    page=doc.metadata.get("page"),
+                    document_id=doc.metadata["document_id"],
+                )
+                for doc, content in zip(
+                    retrieval.source_documents, retrieval.parent_contents
+                )
+            ],
+            document_ids=document_ids,
+            prompt_tokens=prompt_tokens,
+        )
 
-        logger.info(f"Сгенерированный ответ: {response.answer}")
-        return response
+    async def _check_and_retrieve(
+        self, document_id: str, question: str, use_cache: bool = True
+    ) -> RetrievalResult:
+        return await self._check_while(
+            question, self._search(document_id, question, use_cache)
+        )
+
+    async def _check_while(self, question: str, search: Awaitable[T]) -> T:
+        """
+        Проверяет вопрос модерацией параллельно с поиском.
+        Если вопрос отклонен, поиск отменяется.
+        """
+        retrieval = asyncio.ensure_future(search)
+        try:
+            await self._check_question(question)
+        except BaseException:
+            retrieval.cancel()
+            await asyncio.gather(retrieval, return_exceptions=True)
+            raise
+        return await retrieval
 
-    async def _get_or_create_vector_store(self, document_id: str) -> Chroma:
-        document_text = await self.document_service.get_document_content(document_id)
-        if document_text is None:
+    async def _check_question(self, question: str) -> None:
+        if await self._is_content_harmful(question):
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Документ не найден."
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Недопустимый запрос."
             )
 
-        collection_name = f"doc_{document_id.replace('-', '_')}"
+    async def _search(
+        self, document_id: str, question: str, use_cache: bool
+    ) -> RetrievalResult:
+        """
+        Ищет ответ на похожий вопрос в кэше, а при промахе — релевантные
+        фрагменты документа. Эмбеддинг вопроса вычисляется один раз и
+        передается в плотный поиск.
+        """
+        question_vector = None
+        if use_cache and self.answer_cache is not None:
+            question_vector = await self.embeddings.aembed_query(question)
+            cached_response = self.answer_cache.get(document_id, question_vector)
+            if cached_response is not None:
+                logger.info(f"Ответ на вопрос к '{document_id}' взят из кэша.")
+                return RetrievalResult(
+                    question_vector=question_vector,
+                    cached_response=cached_response.model_copy(
+                        update={"prompt_tokens": 0}
+                    ),
+                )
 
-        existing_collections = await asyncio.to_thread(
-            self.chroma_client.list_collections
+        source_documents, parent_contents = await self._retrieve(
+            document_id, question, question_vector
+        )
+        return RetrievalResult(
+            source_documents=source_documents,
+            parent_contents=parent_contents,
+            question_vector=question_vector,
         )
-        if collection_name not in [c.name for c in existing_collections]:
-            logger.warning(
-                f"База для документа {document_id} не найдена. Запуск индексации..."
+
+    @staticmethod
+    def _build_sources(retrieval: RetrievalResult) -> List[Source]:
+        return [
+            Source(content=content, page=doc.metadata.get("page"))
+            for doc, content in zip(
+                retrieval.source_documents, retrieval.parent_contents
             )
-            parent_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=2000, chunk_overlap=200
+        ]
+
+    def _remember_answer(
+        self,
+        document_id: str,
+        question: str,
+        retrieval: RetrievalResult,
+        response: ChatResponse,
+    ) -> None:
+        if (
+            self.answer_cache is None
+            or retrieval.question_vector is None
+            or not retrieval.source_documents
+            or response.answer == FILTERED_ANSWER_MESSAGE
+        ):
+            return
+        self.answer_cache.add(
+            document_id, question, retrieval.question_vector, response
+        )
+
+    async def _retrieve(
+        self,
+        document_id: str,
+        question: str,
+        question_vector: Optional[List[float]] = None,
+    ) -> Tuple[List[Document], List[str]]:
+        with STAGE_DURATION.time(stage="retrieval"):
+            return await self._hybrid_search(document_id, question, question_vector)
+
+    async def _hybrid_search(
+        self,
+        document_id: str,
+        question: str,
+        question_vector: Optional[List[float]] = None,
+    ) -> Tuple[List[Document], List[str]]:
+        """
+        Гибридный поиск: плотный поиск в Chroma и BM25 выполняются параллельно,
+        результаты объединяются методом reciprocal rank fusion и при наличии
+        модели переранжируются cross-encoder'ом. Если эмбеддинг вопроса уже
+        вычислен, плотный поиск идет по нему, а не эмбеддит вопрос заново.
+        """
+        candidates = self.settings.RETRIEVAL_CANDIDATES
+        generation, vector_store = await self._open_index(document_id)
+        if question_vector is None:
+            retriever = vector_store.as_retriever(search_kwargs={"k": candidates})
+            dense_search = retriever.ainvoke(question)
+        else:
+            dense_search = vector_store.asimilarity_search_by_vector(
+                question_vector, k=candidates
             )
-            child_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=400, chunk_overlap=100
+
+        dense_documents, lexical_documents = await asyncio.gather(
+            dense_search,
+            self.lexical_store.search(
+                generation.storage_key, question, candidates, vector_store
+            ),
+        )
+        source_documents = reciprocal_rank_fusion(
+            [dense_documents, lexical_documents], k=self.settings.RRF_K
+        )
+        if self.reranker is not None:
+            source_documents = await retrieval_executor.run(
+                self.reranker.rerank, question, source_documents
             )
+        source_documents = source_documents[: self.settings.RETRIEVAL_TOP_K]
+        parent_contents = await self._resolve_parent_contents(
+            generation.storage_key, source_documents
+        )
+        return source_documents, parent_contents
 
-            parent_docs = parent_splitter.create_documents([document_text])
-            child_docs_with_metadata = []
-            for parent_doc in parent_docs:
-                child_splits = child_splitter.split_text(parent_doc.page_content)
-                for split in child_splits:
-                    child_doc = Document(
-                        page_content=split,
-                        metadata={"parent_content": parent_doc.page_content},
-                    )
-                    child_docs_with_metadata.append(child_doc)
+    async def _resolve_corpus(
+        self, document_ids: Optional[Sequence[str]], tag: Optional[str]
+    ) -> List[str]:
+        if tag is not None:
+            resolved = await self.document_service.find_by_tag(tag)
+            if not resolved:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Документы с таким тегом не найдены.",
+                )
+        else:
+            resolved = list(dict.fromkeys(document_ids or ()))
+        if not resolved:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Не указаны документы для поиска.",
+            )
+        if len(resolved) > self.settings.CORPUS_MAX_DOCUMENTS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=(
+                    "Слишком много документов в запросе: максимум "
+                    f"{self.settings.CORPUS_MAX_DOCUMENTS}."
+                ),
+            )
+        return resolved
+
+    async def _search_corpus(
+        self, document_ids: Sequence[str], question: str
+    ) -> RetrievalResult:
+        with STAGE_DURATION.time(stage="retrieval"):
+            return await self._search_documents(document_ids, question)
+
+    async def _search_documents(
+        self, document_ids: Sequence[str], question: str
+    ) -> RetrievalResult:
+        """
+        Гибридный поиск по нескольким документам. Эмбеддинг вопроса
+        вычисляется один раз; коллекции опрашиваются параллельно с
+        ограничением числа одновременных запросов. Расстояния плотного поиска
+        сравнимы между коллекциями, поэтому кандидаты всех документов
+        сортируются вместе. Оценки BM25 не сравнимы: у индекса каждого
+        документа свои IDF и средняя длина фрагмента. Поэтому списки BM25
+        объединяются по рангу внутри документа (reciprocal rank fusion),
+        после чего общие списки двух поисков объединяются так же.
+        """
+        candidates = self.settings.RETRIEVAL_CANDIDATES
+        question_vector = await self.embeddings.aembed_query(question)
+        semaphore = asyncio.Semaphore(self.settings.CORPUS_SEARCH_CONCURRENCY)
 
-            await Chroma.afrom_documents(
-                documents=child_docs_with_metadata,
-                embedding=self.embeddings,
-                collection_name=collection_name,
-                client=self.chroma_client,
+        async def search_document(
+            document_id: str,
+        ) -> Tuple[List[Tuple[Document, float]], List[Tuple[Document, float]]]:
+            async with semaphore:
+                return await self._search_candidates(
+                    document_id, question, question_vector
+                )
+
+        results = await asyncio.gather(
+            *(search_document(document_id) for document_id in document_ids)
+        )
+        dense = sorted(
+            (pair for dense_pairs, _ in results for pair in dense_pairs),
+            key=lambda pair: pair[1],
+        )
+        lexical = reciprocal_rank_fusion(
+            [
+                [document for document, _ in lexical_pairs]
+                for _, lexical_pairs in results
+            ],
+            k=self.settings.RRF_K,
+        )
+        source_documents = reciprocal_rank_fusion(
+            [
+                [document for document, _ in dense[:candidates]],
+                lexical[:candidates],
+            ],
+            k=self.settings.RRF_K,
+        )
+        if self.reranker is not None:
+            source_documents = await retrieval_executor.run(
+                self.reranker.rerank, question, source_documents
             )
-            logger.success(f"Новая база для документа {document_id} успешно создана.")
-        else:
-            logger.info(
-                f"Найдена и загружена существующая база для документа {document_id}"
+        source_documents = source_documents[: self.settings.RETRIEVAL_TOP_K]
+        return RetrievalResult(
+            source_documents=source_documents,
+            parent_contents=await self._resolve_corpus_parent_contents(
+                source_documents
+            ),
+            question_vector=question_vector,
+        )
+
+    async def _search_candidates(
+        self, document_id: str, question: str, question_vector: List[float]
+    ) -> Tuple[List[Tuple[Document, float]], List[Tuple[Document, float]]]:
+        """
+        Возвращает кандидатов плотного поиска с расстояниями и кандидатов BM25
+        с оценками. В метаданные фрагментов добавляются `document_id` и ключ
+        поколения индекса, из которого потом читаются родительские фрагменты.
+        """
+        candidates = self.settings.RETRIEVAL_CANDIDATES
+        generation, vector_store = await self._open_index(document_id)
+        dense, lexical = await asyncio.gather(
+            retrieval_executor.run(
+                vector_store.similarity_search_by_vector_with_relevance_scores,
+                question_vector,
+                candidates,
+            ),
+            self.lexical_store.search_with_scores(
+                generation.storage_key, question, candidates, vector_store
+            ),
+        )
+
+        def with_document_id(
+            pairs: List[Tuple[Document, float]],
+        ) -> List[Tuple[Document, float]]:
+            return [
+                (
+                    Document(
+                        page_content=document.page_content,
+                        metadata={
+                            **document.metadata,
+                            "document_id": document_id,
+                            "index_key": generation.storage_key,
+                        },
+                    ),
+                    score,
+                )
+                for document, score in pairs
+            ]
+
+        return with_document_id(dense), with_document_id(lexical)
+
+    async def _resolve_corpus_parent_contents(self, docs: List[Document]) -> List[str]:
+        groups: Dict[str, List[int]] = {}
+        for position, doc in enumerate(docs):
+            groups.setdefault(doc.metadata["index_key"], []).append(position)
+
+        resolved = await asyncio.gather(
+            *(
+                self._resolve_parent_contents(
+                    index_key, [docs[position] for position in positions]
+                )
+                for index_key, positions in groups.items()
             )
+        )
+        contents = [""] * len(docs)
+        for positions, texts in zip(groups.values(), resolved):
+            for position, text in zip(positions, texts):
+                contents[position] = text
+        return contents
 
-        return Chroma(
-            collection_name=collection_name,
-            embedding_function=self.embeddings,
-            client=self.chroma_client,
+    def _build_prompt_input(
+        self, document_id: str, question: str, retrieval: RetrievalResult
+    ) -> Tuple[Dict[str, str], int]:
+        """
+        Собирает контекст в пределах бюджета токенов и считает размер
+        итогового промпта.
+        """
+        with STAGE_DURATION.time(stage="prompt_build"):
+            context = self.context_assembler.assemble(
+                retrieval.source_documents, retrieval.parent_contents
+            )
+            prompt_input = {"context": context.text, "question": question}
+            prompt_tokens = count_tokens(
+                self.prompt_template.format(**prompt_input), self.settings.LLM_MODEL
+            )
+        LLM_TOKENS.inc(prompt_tokens, operation="chat", kind="prompt")
+        logger.info(
+            f"Промпт для '{document_id}': {prompt_tokens} токенов, контекст "
+            f"{context.tokens} токенов из {len(context.passages)} фрагментов "
+            f"(отброшено {context.dropped})"
         )
+        return prompt_input, prompt_tokens
+
+    async def _generate_answer(self, prompt_input: Dict[str, str]) -> str:
+        with STAGE_DURATION.time(stage="llm_total"):
+            answer = await self._build_rag_chain().ainvoke(prompt_input)
+        self._count_completion_tokens(answer)
+        return answer
+
+    def _count_completion_tokens(self, answer: str) -> None:
+        LLM_TOKENS.inc(
+            count_tokens(answer, self.settings.LLM_MODEL),
+            operation="chat",
+            kind="completion",
+        )
+
+    def _build_rag_chain(self) -> Runnable:
+        return (
+            {"context": lambda x: x["context"], "question": lambda x: x["question"]}
+            | self.prompt_template
+            | self.llm
+            | StrOutputParser()
+        )
+
+    async def _moderate_answer(self, answer: str) -> str:
+        if await self._is_content_harmful(answer):
+            return FILTERED_ANSWER_MESSAGE
+        return answer
+
+    async def _open_index(self, document_id: str) -> Tuple[IndexGeneration, Chroma]:
+        """
+        Возвращает действующее поколение индекса документа и его векторное
+        хранилище. Поколение определяется один раз на запрос, чтобы плотный
+        поиск, BM25 и родительские фрагменты читались из одного индекса, даже
+        если во время запроса он был перестроен. Для уже проиндексированных
+        документов проверка выполняется по реестру в памяти без обращения к
+        файлам; наличие документа на диске проверяется только перед индексацией.
+        """
+        if not await self.indexing_service.is_ready(document_id):
+            if not await self.document_service.document_exists(document_id):
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND, detail="Документ не найден."
+                )
+            await self.indexing_service.wait_until_indexed(document_id)
+        registry = self.indexing_service.collection_registry
+        generation = await registry.get_generation(document_id)
+        if generation is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Документ не найден."
+            )
+        return generation, await registry.get_store(generation)
 
     async def _is_content_harmful(self, text: str) -> bool:
+        """
+        Проверяет текст через Moderation API. Вердикты кэшируются по хэшу
+        текста; ошибки API не кэшируются.
+        """
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        flagged = self.moderation_cache.get(key)
+        if flagged is not None:
+            self.moderation_cache_hits += 1
+            return flagged
+
+        self.moderation_cache_misses += 1
         try:
-            client = openai.AsyncOpenAI(
-                api_key=self.settings.OPENAI_API_KEY.get_secret_value(), max_retries=3
-            )
-            response = await client.moderations.create(input=text)
-            return response.results[0].flagged
+            with STAGE_DURATION.time(stage="moderation"):
+                response = await self.moderation_client.moderations.create(input=text)
+            flagged = response.results[0].flagged
         except Exception as e:
             logger.error(f"Ошибка при вызове Moderation API после всех попыток: {e}")
             return True
 
-    @staticmethod
-    def _format_docs_from_metadata(docs: List[Document]) -> str:
-        unique_parent_contents = set(
-            doc.metadata.get("parent_content", doc.page_content) for doc in docs
+        self.moderation_cache.set(key, flagged)
+        return flagged
+
+    def moderation_stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.moderation_cache_hits,
+            "misses": self.moderation_cache_misses,
+            "entries": len(self.moderation_cache),
+        }
+
+    async def _resolve_parent_contents(
+        self, index_key: str, docs: List[Document]
+    ) -> List[str]:
+        """
+        Возвращает текст родительского фрагмента для каждого найденного дочернего.
+        Родители загружаются из хранилища одним запросом; для коллекций старого
+        формата используется `parent_content` из метаданных.
+        """
+        parent_ids = {
+            doc.metadata["parent_id"] for doc in docs if "parent_id" in doc.metadata
+        }
+        parents = (
+            await self.parent_store.get_many(index_key, parent_ids)
+            if parent_ids
+            else {}
         )
-        return "\n\n---\n\n".join(unique_parent_contents)
+        return [
+            parents.get(
+                doc.metadata.get("parent_id"),
+                doc.metadata.get("parent_content", doc.page_content),
+            )
+            for doc in docs
+        ]
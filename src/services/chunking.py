@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import re
+from array import array
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence
+
+SEPARATORS = ("\n\n", "\n", " ", "")
+
+
+def _offsets() -> array:
+    return array("q")
+
+
+@dataclass
+class ChunkSpans:
+    """
+    Границы родительских и дочерних фрагментов документа в виде смещений
+    в исходном тексте. Фрагмент с номером `i` — это `text[starts[i]:ends[i]]`;
+    `child_parents[i]` — номер родительского фрагмента дочернего.
+    """
+
+    parent_starts: array = field(default_factory=_offsets)
+    parent_ends: array = field(default_factory=_offsets)
+    child_starts: array = field(default_factory=_offsets)
+    child_ends: array = field(default_factory=_offsets)
+    child_parents: array = field(default_factory=_offsets)
+
+    def parent_texts(self, text: str) -> List[str]:
+        return [text[s:e] for s, e in zip(self.parent_starts, self.parent_ends)]
+
+    def child_texts(self, text: str) -> List[str]:
+        return [text[s:e] for s, e in zip(self.child_starts, self.child_ends)]
+
+
+class SpanSplitter:
+    """
+    Рекурсивное деление текста по разделителям, результат которого совпадает
+    с `RecursiveCharacterTextSplitter` из langchain с параметрами по
+    умолчанию (разделитель остается в начале следующей части, пробелы по краям
+    фрагментов отбрасываются, длина считается в символах).
+
+    Вместо строк возвращаются смещения фрагментов в исходном тексте: части
+    между разделителями задаются списком точек разреза, а окно объединяемых
+    частей — двумя индексами в нем, поэтому строки не копируются. Смещения
+    точные; langchain ищет начало фрагмента через `str.find`, и в тексте из
+    повторяющихся строк может указать на более раннее вхождение.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int,
+        chunk_overlap: int,
+        separators: Sequence[str] = SEPARATORS,
+    ):
+        if chunk_overlap > chunk_size:
+            raise ValueError(
+                f"Перекрытие фрагментов ({chunk_overlap}) больше их размера "
+                f"({chunk_size})."
+            )
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = tuple(separators)
+        self._patterns = [
+            re.compile(re.escape(separator)) if separator else None
+            for separator in self.separators
+        ]
+
+    def split(
+        self,
+        text: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        starts: Optional[array] = None,
+        ends: Optional[array] = None,
+    ) -> tuple[array, array]:
+        """
+        Делит `text[start:end]` и дописывает смещения фрагментов (относительно
+        всего `text`) в `starts` и `ends`, создавая их при необходимости.
+        """
+        starts = _offsets() if starts is None else starts
+        ends = _offsets() if ends is None else ends
+        self._split(text, start, len(text) if end is None else end, 0, starts, ends)
+        return starts, ends
+
+    def _split(
+        self, text: str, lo: int, hi: int, level: int, starts: array, ends: array
+    ) -> None:
+        separator_level = len(self.separators) - 1
+        next_level: Optional[int] = None
+        for index in range(level, len(self.separators)):
+            separator = self.separators[index]
+            if not separator:
+                separator_level = index
+                break
+            if text.find(separator, lo, hi) != -1:
+                separator_level = index
+                if index + 1 < len(self.separators):
+                    next_level = index + 1
+                break
+
+        pattern = self._patterns[separator_level]
+        if pattern is None:
+            cuts = list(range(lo, hi + 1))
+        else:
+            cuts = [lo]
+            cuts.extend(
+                match.start()
+                for match in pattern.finditer(text, lo, hi)
+                if match.start() > lo
+            )
+            cuts.append(hi)
+
+        good_start = 0
+        for index in range(len(cuts) - 1):
+            piece_start, piece_end = cuts[index], cuts[index + 1]
+            if piece_end - piece_start < self.chunk_size:
+                continue
+            if good_start < index:
+                self._merge(text, cuts, good_start, index, starts, ends)
+            if next_level is None:
+                starts.append(piece_start)
+                ends.append(piece_end)
+            else:
+                self._split(text, piece_start, piece_end, next_level, starts, ends)
+            good_start = index + 1
+        if good_start < len(cuts) - 1:
+            self._merge(text, cuts, good_start, len(cuts) - 1, starts, ends)
+
+    def _merge(
+        self,
+        text: str,
+        cuts: List[int],
+        first: int,
+        last: int,
+        starts: array,
+        ends: array,
+    ) -> None:
+        """
+        Объединяет соседние части с номерами от `first` до `last` (не
+        включая) во фрагменты не длиннее `chunk_size` с перекрытием не больше
+        `chunk_overlap`. Окно текущего фрагмента — части с `window` по `index`.
+        """
+        window = first
+        for index in range(first, last):
+            length = cuts[index + 1] - cuts[index]
+            total = cuts[index] - cuts[window]
+            if total + length > self.chunk_size and window < index:
+                self._emit(text, cuts[window], cuts[index], starts, ends)
+                while total > self.chunk_overlap or (
+                    total + length > self.chunk_size and total > 0
+                ):
+                    total -= cuts[window + 1] - cuts[window]
+                    window += 1
+        self._emit(text, cuts[window], cuts[last], starts, ends)
+
+    @staticmethod
+    def _emit(text: str, start: int, end: int, starts: array, ends: array) -> None:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            starts.append(start)
+            ends.append(end)
+
+
+def split_parent_child(
+    text: str, parent_splitter: SpanSplitter, child_splitter: SpanSplitter
+) -> ChunkSpans:
+    """
+    Делит текст на родительские фрагменты и каждый родительский — на
+    дочерние за один проход по документу. Дочерние фрагменты считаются
+    внутри границ родителя, как при делении его текста отдельно.
+    """
+    spans = ChunkSpans()
+    parent_splitter.split(text, starts=spans.parent_starts, ends=spans.parent_ends)
+    for parent_id, (start, end) in enumerate(
+        zip(spans.parent_starts, spans.parent_ends)
+    ):
+        before = len(spans.child_starts)
+        child_splitter.split(
+            text, start, end, starts=spans.child_starts, ends=spans.child_ends
+        )
+        spans.child_parents.extend([parent_id] * (len(spans.child_starts) - before))
+    return spans
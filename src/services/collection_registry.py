@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import chromadb
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+
+from src.core.cache import LRUCache
+from src.core.executors import indexing_executor, retrieval_executor
+
+COLLECTION_PREFIX = "doc_"
+VERSION_SEPARATOR = "__"
+
+
+@dataclass(frozen=True)
+class IndexGeneration:
+    """
+    Поколение индекса документа: коллекция Chroma, родительские фрагменты и
+    BM25-индекс, построенные с одними настройками. `version` — отпечаток
+    настроек деления и модели эмбеддингов; у коллекций, созданных до
+    версионирования, он равен None.
+    """
+
+    document_id: str
+    version: Optional[str] = None
+
+    @property
+    def collection_name(self) -> str:
+        name = COLLECTION_PREFIX + self.document_id.replace("-", "_")
+        if self.version is None:
+            return name
+        return f"{name}{VERSION_SEPARATOR}{self.version}"
+
+    @property
+    def storage_key(self) -> str:
+        """Ключ файлов родительских фрагментов и BM25-индекса поколения."""
+        if self.version is None:
+            return self.document_id
+        return f"{self.document_id}.{self.version}"
+
+
+class RetrievalChroma(Chroma):
+    """
+    Обертка `Chroma`, асинхронный поиск которой выполняется в пуле потоков
+    поиска, а не в пуле по умолчанию, общем с индексацией.
+    """
+
+    async def asimilarity_search(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Document]:
+        return await retrieval_executor.run(self.similarity_search, query, k, **kwargs)
+
+    async def asimilarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Document]:
+        return await retrieval_executor.run(
+            self.similarity_search_by_vector, embedding, k, **kwargs
+        )
+
+
+class CollectionRegistry:
+    """
+    Реестр проиндексированных документов.
+
+    Список коллекций Chroma читается один раз при старте, после чего для
+    каждого документа в памяти хранится действующее поколение индекса.
+    Переключение на новое поколение — замена записи в словаре, поэтому
+    запросы видят либо старый индекс целиком, либо новый. Открытые обертки
+    `Chroma` хранятся в LRU-кэше и переиспользуются между запросами.
+    """
+
+    def __init__(
+        self,
+        chroma_client: chromadb.ClientAPI,
+        embeddings: Embeddings,
+        max_open_handles: int = 256,
+        index_version: Optional[str] = None,
+    ):
+        self.chroma_client = chroma_client
+        self.embeddings = embeddings
+        self.index_version = index_version
+        self.leftovers: List[IndexGeneration] = []
+        self._generations: Dict[str, IndexGeneration] = {}
+        self._handles: LRUCache[str, Chroma] = LRUCache(max_open_handles)
+        self._warmed = False
+        self._warm_lock: Optional[asyncio.Lock] = None
+
+    async def warm(self) -> None:
+        """
+        Загружает список существующих коллекций из Chroma. Коллекции,
+        сборка которых была прервана, не считаются проиндексированными. Если
+        у документа осталось несколько готовых поколений, действующим
+        выбирается поколение с текущей версией, остальные попадают в
+        `leftovers` для удаления. Реестр прогревается при старте или при
+        первом запросе, поэтому список читается в пуле поиска.
+        """
+        collections = await retrieval_executor.run(self.chroma_client.list_collections)
+        generations: Dict[str, IndexGeneration] = {}
+        leftovers: List[IndexGeneration] = []
+        for collection in collections:
+            generation = self._parse_generation(collection.name, collection.metadata)
+            if generation is None:
+                continue
+            current = generations.get(generation.document_id)
+            if current is None:
+                generations[generation.document_id] = generation
+            elif generation.version == self.index_version:
+                generations[generation.document_id] = generation
+                leftovers.append(current)
+            else:
+                leftovers.append(generation)
+
+        self._generations = generations
+        self.leftovers = leftovers
+        self._warmed = True
+        logger.info(f"Реестр коллекций загружен: {len(self._generations)} шт.")
+
+    async def is_indexed(self, document_id: str) -> bool:
+        await self._ensure_warmed()
+        return document_id in self._generations
+
+    async def get_generation(self, document_id: str) -> Optional[IndexGeneration]:
+        await self._ensure_warmed()
+        return self._generations.get(document_id)
+
+    async def documents(self) -> List[str]:
+        await self._ensure_warmed()
+        return list(self._generations)
+
+    async def building_generations(self) -> List[IndexGeneration]:
+        """
+        Возвращает поколения, сборка которых не завершена: идущие сейчас или
+        прерванные сбоем. Такие коллекции не попадают в реестр, поэтому
+        список каждый раз читается из Chroma в пуле индексации: его
+        запрашивает только фоновая сборка мусора.
+        """
+        collections = await indexing_executor.run(self.chroma_client.list_collections)
+        return [
+            self._generation_from_name(collection.name, collection.metadata)
+            for collection in collections
+            if collection.name.startswith(COLLECTION_PREFIX)
+            and (collection.metadata or {}).get("status") == "building"
+        ]
+
+    async def stale_documents(self) -> List[str]:
+        """
+        Возвращает документы, индекс которых построен с другими настройками,
+        чем текущие.
+        """
+        await self._ensure_warmed()
+        return sorted(
+            document_id
+            for document_id, generation in self._generations.items()
+            if generation.version != self.index_version
+        )
+
+    def activate(self, generation: IndexGeneration) -> Optional[IndexGeneration]:
+        """
+        Делает поколение действующим для документа и возвращает предыдущее,
+        если оно было другим.
+        """
+        previous = self._generations.get(generation.document_id)
+        self._generations[generation.document_id] = generation
+        if previous is None or previous == generation:
+            return None
+        self._handles.pop(previous.collection_name)
+        return previous
+
+    def discard(self, document_id: str) -> None:
+        generation = self._generations.pop(document_id, None)
+        if generation is not None:
+            self._handles.pop(generation.collection_name)
+
+    async def get_store(self, generation: IndexGeneration) -> Chroma:
+        """
+        Возвращает открытую обертку `Chroma` для коллекции поколения.
+        """
+        collection_name = generation.collection_name
+        store = self._handles.get(collection_name)
+        if store is None:
+            store = await retrieval_executor.run(
+                RetrievalChroma,
+                collection_name=collection_name,
+                embedding_function=self.embeddings,
+                client=self.chroma_client,
+            )
+            self._handles.set(collection_name, store)
+        return store
+
+    def __len__(self) -> int:
+        return len(self._generations)
+
+    @staticmethod
+    def _parse_generation(
+        name: str, metadata: Optional[dict]
+    ) -> Optional[IndexGeneration]:
+        metadata = metadata or {}
+        if metadata.get("status") == "building" or not name.startswith(
+            COLLECTION_PREFIX
+        ):
+            return None
+        return CollectionRegistry._generation_from_name(name, metadata)
+
+    @staticmethod
+    def _generation_from_name(name: str, metadata: Optional[dict]) -> IndexGeneration:
+        metadata = metadata or {}
+        base, _, version = name.partition(VERSION_SEPARATOR)
+        document_id = metadata.get("document_id") or base[len(COLLECTION_PREFIX) :]
+        return IndexGeneration(document_id, version or None)
+
+    async def _ensure_warmed(self) -> None:
+        if self._warmed:
+            return
+        if self._warm_lock is None:
+            self._warm_lock = asyncio.Lock()
+        async with self._warm_lock:
+            if not self._warmed:
+                await self.warm()
@@ -0,0 +1,345 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import chromadb
+import httpx
+import openai
+from langchain_core.embeddings import Embeddings
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from loguru import logger
+
+from src.core.config import Settings, settings
+from src.core.executors import shutdown_executors
+from src.core.metrics import Counter, Gauge, Metric
+from src.services.analysis_service import DocumentAnalysisService
+from src.services.batch_service import BatchUploadService
+from src.services.chat_service import ChatService
+from src.services.collection_registry import CollectionRegistry
+from src.services.document_service import DocumentService, document_service
+from src.services.embedding_cache import CachedEmbeddings
+from src.services.indexing_service import IndexingService, index_version
+from src.services.lexical_index import LexicalIndexStore
+from src.services.lifecycle_service import DocumentLifecycleService
+from src.services.parent_store import ParentStore
+from src.services.reindex_service import ReindexScheduler
+
+
+class ServiceContainer:
+    """
+    Контейнер сервисов уровня процесса.
+
+    Клиенты LLM, эмбеддингов, модерации и Chroma создаются один раз и
+    используют общие пулы HTTP-соединений. Запуск и остановка управляются
+    lifespan-менеджером приложения; при обращении к сервису до запуска
+    контейнер инициализируется лениво.
+    """
+
+    def __init__(self, app_settings: Settings, document_service: DocumentService):
+        self.settings = app_settings
+        self._document_service = document_service
+        self._started = False
+
+        self.http_client: Optional[httpx.Client] = None
+        self.http_async_client: Optional[httpx.AsyncClient] = None
+        self.llm: Optional[ChatOpenAI] = None
+        self.embeddings: Optional[Embeddings] = None
+        self.moderation_client: Optional[openai.AsyncOpenAI] = None
+        self.chroma_client: Optional[chromadb.ClientAPI] = None
+        self.collection_registry: Optional[CollectionRegistry] = None
+        self.parent_store: Optional[ParentStore] = None
+        self.lexical_store: Optional[LexicalIndexStore] = None
+        self._indexing_service: Optional[IndexingService] = None
+        self._chat_service: Optional[ChatService] = None
+        self._analysis_service: Optional[DocumentAnalysisService] = None
+        self._batch_upload_service: Optional[BatchUploadService] = None
+        self._reindex_scheduler: Optional[ReindexScheduler] = None
+        self._lifecycle_service: Optional[DocumentLifecycleService] = None
+
+    @property
+    def is_started(self) -> bool:
+        return self._started
+
+    @property
+    def document_service(self) -> DocumentService:
+        """
+        Сервис документов не зависит от клиентов контейнера, поэтому
+        возвращается без запуска контейнера. Постановку загрузок в очередь
+        индексации подключает `start`.
+        """
+        return self._document_service
+
+    @property
+    def indexing_service(self) -> IndexingService:
+        self.start()
+        return self._indexing_service
+
+    @property
+    def chat_service(self) -> ChatService:
+        self.start()
+        return self._chat_service
+
+    @property
+    def analysis_service(self) -> DocumentAnalysisService:
+        self.start()
+        return self._analysis_service
+
+    @property
+    def batch_upload_service(self) -> BatchUploadService:
+        self.start()
+        return self._batch_upload_service
+
+    @property
+    def reindex_scheduler(self) -> ReindexScheduler:
+        self.start()
+        return self._reindex_scheduler
+
+    @property
+    def lifecycle_service(self) -> DocumentLifecycleService:
+        self.start()
+        return self._lifecycle_service
+
+    def start(self) -> None:
+        """
+        Создает клиенты и сервисы. Повторный вызов ничего не делает.
+        """
+        if self._started:
+            return
+
+        self._create_clients()
+
+        self.collection_registry = CollectionRegistry(
+            chroma_client=self.chroma_client,
+            embeddings=self.embeddings,
+            max_open_handles=self.settings.CHROMA_HANDLE_CACHE_SIZE,
+            index_version=index_version(self.settings),
+        )
+        self.parent_store = ParentStore(
+            Path(self.settings.PARENT_STORE_PATH),
+            cache_size=self.settings.PARENT_STORE_CACHE_SIZE,
+        )
+        self.lexical_store = LexicalIndexStore(
+            Path(self.settings.CHROMA_PATH) / "lexical",
+            cache_size=self.settings.LEXICAL_INDEX_CACHE_SIZE,
+        )
+        self._indexing_service = IndexingService(
+            settings=self.settings,
+            document_service=self._document_service,
+            embeddings=self.embeddings,
+            chroma_client=self.chroma_client,
+            collection_registry=self.collection_registry,
+            parent_store=self.parent_store,
+            lexical_store=self.lexical_store,
+        )
+        self._document_service.indexing_service = self._indexing_service
+
+        self._chat_service = ChatService(
+            settings=self.settings,
+            document_service=self._document_service,
+            llm=self.llm,
+            embeddings=self.embeddings,
+            chroma_client=self.chroma_client,
+            moderation_client=self.moderation_client,
+            indexing_service=self._indexing_service,
+        )
+        self._analysis_service = DocumentAnalysisService(
+            app_settings=self.settings,
+            document_service=self._document_service,
+            llm=self.llm,
+        )
+        self._batch_upload_service = BatchUploadService(
+            document_service=self._document_service,
+            concurrency=self.settings.BATCH_UPLOAD_CONCURRENCY,
+            max_files=self.settings.BATCH_MAX_FILES,
+            max_archive_bytes=self.settings.BATCH_MAX_ARCHIVE_BYTES,
+            history_size=self.settings.BATCH_HISTORY_SIZE,
+        )
+        self._reindex_scheduler = ReindexScheduler(
+            indexing_service=self._indexing_service,
+            concurrency=self.settings.REINDEX_CONCURRENCY,
+            swap_grace=self.settings.REINDEX_SWAP_GRACE_SECONDS,
+        )
+        self._lifecycle_service = DocumentLifecycleService(
+            document_service=self._document_service,
+            indexing_service=self._indexing_service,
+            summary_cache=self._analysis_service.summary_cache,
+            answer_cache=self._chat_service.answer_cache,
+            chroma_path=Path(self.settings.CHROMA_PATH),
+            storage_paths=[
+                self._document_service.storage_path,
+                Path(self.settings.CHROMA_PATH),
+                Path(self.settings.PARENT_STORE_PATH),
+                Path(self.settings.SUMMARY_CACHE_PATH),
+            ],
+            interval=self.settings.GC_INTERVAL_SECONDS,
+            compact_every=self.settings.GC_COMPACT_EVERY,
+        )
+
+        self._started = True
+        logger.info("Контейнер сервисов инициализирован")
+
+    def _create_clients(self) -> None:
+        """
+        Создает клиенты внешних API и Chroma. Бенчмарки переопределяют этот
+        метод, чтобы подставить локальные реализации.
+        """
+        limits = httpx.Limits(
+            max_connections=self.settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=self.settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=self.settings.HTTP_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(self.settings.HTTP_TIMEOUT)
+        self.http_client = httpx.Client(limits=limits, timeout=timeout)
+        self.http_async_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+
+        api_key = self.settings.OPENAI_API_KEY.get_secret_value()
+        self.llm = ChatOpenAI(
+            model_name=self.settings.LLM_MODEL,
+            temperature=0,
+            openai_api_key=api_key,
+            max_retries=3,
+            http_client=self.http_client,
+            http_async_client=self.http_async_client,
+        )
+        self.embeddings = OpenAIEmbeddings(
+            model=self.settings.EMBEDDING_MODEL,
+            openai_api_key=api_key,
+            http_client=self.http_client,
+            http_async_client=self.http_async_client,
+        )
+        if self.settings.EMBEDDING_CACHE_ENABLED:
+            self.embeddings = CachedEmbeddings(
+                underlying=self.embeddings,
+                model_name=self.settings.EMBEDDING_MODEL,
+                db_path=Path(self.settings.EMBEDDING_CACHE_PATH),
+                max_entries=self.settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            )
+        self.moderation_client = openai.AsyncOpenAI(
+            api_key=api_key, max_retries=3, http_client=self.http_async_client
+        )
+        self.chroma_client = chromadb.PersistentClient(path=self.settings.CHROMA_PATH)
+
+    async def warm_up(self) -> None:
+        """
+        Прогревает кэши, которые дорого заполнять на пути запроса, и
+        запускает переиндексацию устаревших индексов и сборку мусора.
+        """
+        self.start()
+        await self.collection_registry.warm()
+        if self.settings.REINDEX_ENABLED:
+            self._reindex_scheduler.start()
+        if self.settings.GC_ENABLED:
+            self._lifecycle_service.start()
+
+    async def aclose(self) -> None:
+        """
+        Останавливает пакетную загрузку, сборку мусора, переиндексацию и
+        фоновую индексацию, закрывает пулы HTTP-соединений и потоков и
+        сбрасывает созданные сервисы. Chroma сохраняет данные в SQLite
+        сразу при записи и отдельного закрытия не требует.
+        """
+        if not self._started:
+            return
+
+        await self._batch_upload_service.aclose()
+        await self._lifecycle_service.aclose()
+        await self._reindex_scheduler.aclose()
+        await self._indexing_service.aclose()
+        self._document_service.indexing_service = None
+        self._document_service.close()
+        shutdown_executors()
+
+        await self.http_async_client.aclose()
+        self.http_client.close()
+        if isinstance(self.embeddings, CachedEmbeddings):
+            self.embeddings.close()
+
+        self.http_client = None
+        self.http_async_client = None
+        self.llm = None
+        self.embeddings = None
+        self.moderation_client = None
+        self.chroma_client = None
+        self.collection_registry = None
+        self.parent_store = None
+        self.lexical_store = None
+        self._indexing_service = None
+        self._chat_service = None
+        self._analysis_service = None
+        self._batch_upload_service = None
+        self._reindex_scheduler = None
+        self._lifecycle_service = None
+        self._started = False
+        logger.info("Контейнер сервисов остановлен")
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Возвращает статистику использования пулов HTTP-соединений.
+        """
+        stats: Dict[str, Any] = {
+            "started": self._started,
+            "limits": {
+                "max_connections": self.settings.HTTP_MAX_CONNECTIONS,
+                "max_keepalive_connections": self.settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                "keepalive_expiry": self.settings.HTTP_KEEPALIVE_EXPIRY,
+            },
+        }
+        if self._started:
+            stats["sync"] = self._connection_stats(self.http_client)
+            stats["async"] = self._connection_stats(self.http_async_client)
+        return stats
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Возвращает статистику попаданий в кэши сервисов.
+        """
+        stats: Dict[str, Any] = {}
+        if isinstance(self.embeddings, CachedEmbeddings):
+            stats["embeddings"] = self.embeddings.stats()
+        if self._chat_service is not None:
+            stats["moderation"] = self._chat_service.moderation_stats()
+            if self._chat_service.answer_cache is not None:
+                stats["answers"] = self._chat_service.answer_cache.stats()
+        if self._analysis_service is not None:
+            stats["summaries"] = self._analysis_service.summary_cache.stats()
+        return stats
+
+    def collect_metrics(self) -> List[Metric]:
+        """
+        Строит метрики кэшей и размера индекса для `/metrics` из текущей
+        статистики сервисов.
+        """
+        cache_requests = Counter(
+            "cache_requests_total", "Обращения к кэшам сервиса.", ("cache", "result")
+        )
+        cache_entries = Gauge(
+            "cache_entries", "Количество записей в кэшах.", ("cache",)
+        )
+        for cache, stats in self.cache_stats().items():
+            cache_requests.inc(stats["hits"], cache=cache, result="hit")
+            cache_requests.inc(stats["misses"], cache=cache, result="miss")
+            entries = stats.get("entries", stats.get("documents"))
+            if entries is not None:
+                cache_entries.set(entries, cache=cache)
+
+        indexed_documents = Gauge(
+            "indexed_documents", "Документы с готовым векторным индексом."
+        )
+        if self._started:
+            indexed_documents.set(len(self.collection_registry))
+        return [cache_requests, cache_entries, indexed_documents]
+
+    @staticmethod
+    def _connection_stats(client: httpx.Client | httpx.AsyncClient) -> Dict[str, int]:
+        pool = getattr(client._transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            "connections": len(connections),
+            "active": len(connections) - idle,
+            "idle": idle,
+        }
+
+
+container = ServiceContainer(app_settings=settings, document_service=document_service)
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Hashable, List, Optional, Sequence
+
+from langchain_core.documents import Document
+
+from src.core.tokens import count_tokens, truncate_to_tokens
+
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+
+@dataclass
+class Passage:
+    """Родительский фрагмент, попадающий в контекст, и его место в выдаче."""
+
+    text: str
+    rank: int
+    start: Optional[int] = None
+    document_id: Optional[str] = None
+
+    @property
+    def end(self) -> Optional[int]:
+        return None if self.start is None else self.start + len(self.text)
+
+
+@dataclass
+class AssembledContext:
+    """Собранный контекст и статистика по нему."""
+
+    text: str
+    passages: List[Passage] = field(default_factory=list)
+    tokens: int = 0
+    dropped: int = 0
+
+
+class ContextAssembler:
+    """
+    Сборщик контекста для промпта.
+
+    Родительские фрагменты дедуплицируются, перекрывающиеся соседние
+    фрагменты склеиваются в один, после чего фрагменты выводятся в порядке
+    релевантности, пока не будет исчерпан бюджет токенов. Одинаковая выдача
+    поиска всегда дает одинаковый контекст. Фрагменты разных документов
+    (`document_id` в метаданных) не дедуплицируются и не склеиваются между собой.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        max_tokens: int,
+        separator: str = CONTEXT_SEPARATOR,
+    ):
+        self.model_name = model_name
+        self.max_tokens = max_tokens
+        self.separator = separator
+        self._separator_tokens = count_tokens(separator, model_name)
+
+    def assemble(
+        self, documents: Sequence[Document], parent_contents: Sequence[str]
+    ) -> AssembledContext:
+        passages = self._merge_overlapping(
+            self._unique_passages(documents, parent_contents)
+        )
+
+        selected: List[Passage] = []
+        used_tokens = 0
+        for passage in passages:
+            passage_tokens = count_tokens(passage.text, self.model_name)
+            cost = passage_tokens + (self._separator_tokens if selected else 0)
+            if used_tokens + cost <= self.max_tokens:
+                selected.append(passage)
+                used_tokens += cost
+            elif not selected:
+                truncated = truncate_to_tokens(
+                    passage.text, self.max_tokens, self.model_name
+                )
+                selected.append(
+                    Passage(
+                        text=truncated,
+                        rank=passage.rank,
+                        start=passage.start,
+                        document_id=passage.document_id,
+                    )
+                )
+                used_tokens = count_tokens(truncated, self.model_name)
+
+        return AssembledContext(
+            text=self.separator.join(passage.text for passage in selected),
+            passages=selected,
+            tokens=used_tokens,
+            dropped=len(passages) - len(selected),
+        )
+
+    @staticmethod
+    def _unique_passages(
+        documents: Sequence[Document], parent_contents: Sequence[str]
+    ) -> List[Passage]:
+        passages: List[Passage] = []
+        seen: set[Hashable] = set()
+        for rank, (document, content) in enumerate(zip(documents, parent_contents)):
+            document_id = document.metadata.get("document_id")
+            key = (document_id, document.metadata.get("parent_id", content))
+            if key in seen:
+                continue
+            seen.add(key)
+            passages.append(
+                Passage(
+                    text=content,
+                    rank=rank,
+                    start=document.metadata.get("parent_start"),
+                    document_id=document_id,
+                )
+            )
+        return passages
+
+    @staticmethod
+    def _merge_overlapping(passages: List[Passage]) -> List[Passage]:
+        """
+        Склеивает фрагменты с известными смещениями, если они перекрываются
+        в тексте документа. Склеенный фрагмент получает лучший ранг из
+        исходных. Возвращает фрагменты в порядке релевантности.
+        """
+        positioned = sorted(
+            (passage for passage in passages if passage.start is not None),
+            key=lambda passage: (passage.document_id or "", passage.start),
+        )
+        merged: List[Passage] = []
+        for passage in positioned:
+            previous = merged[-1] if merged else None
+            if (
+                previous is not None
+                and previous.document_id == passage.document_id
+                and passage.start <= previous.end
+            ):
+                overlap = previous.end - passage.start
+                merged[-1] = Passage(
+                    text=previous.text + passage.text[overlap:],
+                    rank=min(previous.rank, passage.rank),
+                    start=previous.start,
+                    document_id=previous.document_id,
+                )
+            else:
+                merged.append(passage)
+
+        unpositioned = [passage for passage in passages if passage.start is None]
+        return sorted(merged + unpositioned, key=lambda passage: passage.rank)
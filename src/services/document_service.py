@@ -1,99 +1,647 @@
 from __future__ import annotations
 
 import asyncio
+import codecs
+import hashlib
+import multiprocessing
+import os
+import re
 import uuid
-from pathlib import Path
-from typing import Optional
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path, PurePosixPath
+from typing import (
+    TYPE_CHECKING,
+    AsyncIterator,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 import aiofiles
-import fitz
 from fastapi import UploadFile, HTTPException, status
 from loguru import logger
 
-from src.models.documents import UploadResponse
+from src.core.cache import LRUCache
+from src.core.config import settings
+from src.core.executors import extraction_executor
+from src.core.metrics import DOCUMENTS_STORED, STAGE_DURATION
+from src.models.documents import DocumentMetadata, IndexingStatus, UploadResponse
+from src.services import pdf_extraction
+from src.services.text_index import TextIndexBuilder
+
+if TYPE_CHECKING:
+    from src.services.indexing_service import IndexingService
+
+TAG_PATTERN = re.compile(r"^[\w-]{1,64}$", re.UNICODE)
+CONTENT_TYPES_BY_EXTENSION = {".pdf": "application/pdf", ".txt": "text/plain"}
+
+
+@dataclass
+class SpooledUpload:
+    """Файл, сохраненный во временную папку до извлечения текста."""
+
+    filename: str
+    content_type: Optional[str]
+    path: Optional[Path] = None
+    content_hash: Optional[str] = None
 
 
 class DocumentService:
     """
     Сервис для обработки и управления документами.
+
+    Загруженный файл сначала сохраняется на диск частями, после чего текст
+    извлекается по пути к файлу и записывается в хранилище по мере
+    извлечения. Страницы больших PDF обрабатываются диапазонами в пуле
+    процессов.
+
+    Рядом с текстом `<id>.txt` хранится `<id>.meta.json` с количеством
+    страниц, символов и токенов, хэшем и индексом смещений, по которому
+    фрагменты текста читаются без загрузки всего файла.
+
+    Теги документов хранятся маркерами `by_tag/<тег>/<id>`, по ним выбираются
+    документы для вопросов к нескольким документам сразу.
+
+    Срок хранения документа записывается в его метаданные; документы с
+    истекшим сроком удаляет сборщик мусора.
     """
 
     _storage_path = Path("documents_storage")
 
-    def __init__(self):
-        self._storage_path.mkdir(exist_ok=True)
+    def __init__(
+        self,
+        storage_path: Optional[Path] = None,
+        upload_chunk_size: int = 1024 * 1024,
+        extraction_workers: int = 4,
+        pages_per_task: int = 50,
+        token_model: str = "gpt-4o",
+        metadata_cache_size: int = 256,
+        default_ttl_seconds: Optional[float] = None,
+    ):
+        if storage_path is not None:
+            self._storage_path = storage_path
+        self._hash_index_path = self._storage_path / "by_hash"
+        self._hash_index_path.mkdir(parents=True, exist_ok=True)
+        self._tag_index_path = self._storage_path / "by_tag"
+        self._incoming_path = self._storage_path / "incoming"
+        self.upload_chunk_size = upload_chunk_size
+        self.extraction_workers = extraction_workers
+        self.pages_per_task = pages_per_task
+        self.token_model = token_model
+        self.default_ttl_seconds = default_ttl_seconds
+        self.indexing_service: Optional[IndexingService] = None
+        self._pending_uploads: Dict[str, asyncio.Future] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._metadata_cache: LRUCache[str, DocumentMetadata] = LRUCache(
+            metadata_cache_size
+        )
+
+    @property
+    def storage_path(self) -> Path:
+        return self._storage_path
 
-    async def process_document(self, file: UploadFile) -> UploadResponse:
+    async def process_document(
+        self,
+        file: UploadFile,
+        tags: Sequence[str] = (),
+        ttl_seconds: Optional[float] = None,
+    ) -> UploadResponse:
         """
         Обрабатывает загруженный файл, извлекает текст и сохраняет его.
+        Повторная загрузка файла с тем же содержимым возвращает уже
+        существующий документ без извлечения и индексации; переданные теги
+        добавляются к существующему документу.
         """
         logger.info(f"Обработка файла: {file.filename}")
+        self._check_content_type(file.content_type)
 
-        content_type = file.content_type
-        if content_type == "application/pdf":
-            text = await self._extract_text_from_pdf(file)
-        elif content_type == "text/plain":
-            text = await self._extract_text_from_txt(file)
-        else:
+        upload_path, content_hash = await self.spool_upload(file)
+        try:
+            return await self.store_upload(
+                SpooledUpload(
+                    filename=file.filename,
+                    content_type=file.content_type,
+                    path=upload_path,
+                    content_hash=content_hash,
+                ),
+                tags,
+                ttl_seconds,
+            )
+        finally:
+            await asyncio.to_thread(upload_path.unlink, missing_ok=True)
+
+    async def store_upload(
+        self,
+        upload: SpooledUpload,
+        tags: Sequence[str] = (),
+        ttl_seconds: Optional[float] = None,
+    ) -> UploadResponse:
+        """
+        Извлекает и сохраняет текст файла, уже записанного на диск, с
+        дедупликацией по хэшу содержимого. Временный файл не удаляется.
+        `ttl_seconds` задает срок хранения документа; без него действует
+        срок по умолчанию.
+        """
+        self._check_content_type(upload.content_type)
+        content_hash = upload.content_hash
+        expires_at = self._expiry(ttl_seconds)
+
+        while (pending := self._pending_uploads.get(content_hash)) is not None:
+            await asyncio.shield(pending)
+
+        pending = asyncio.get_running_loop().create_future()
+        self._pending_uploads[content_hash] = pending
+        try:
+            existing_id = await self._find_by_hash(content_hash)
+            if existing_id is not None:
+                await self._save_tags(existing_id, tags)
+                return await self._duplicate_response(
+                    existing_id,
+                    upload.filename,
+                    upload.content_type,
+                    tags,
+                    await self._extend_expiry(existing_id, expires_at),
+                )
+            doc_id = await self._store_document(
+                upload.path, upload.content_type, content_hash, tags, expires_at
+            )
+        finally:
+            del self._pending_uploads[content_hash]
+            pending.set_result(None)
+
+        return UploadResponse(
+            document_id=doc_id,
+            filename=upload.filename,
+            content_type=upload.content_type,
+            expires_at=expires_at,
+            tags=list(tags),
+        )
+
+    async def unpack_archive(
+        self, archive_path: Path, max_files: int, max_bytes: int
+    ) -> List[SpooledUpload]:
+        """
+        Распаковывает zip-архив во временную папку по файлам, вычисляя хэш
+        каждого. Файлы с неподдерживаемым расширением возвращаются без пути.
+        Суммарный объем распакованных данных ограничен `max_bytes`.
+        """
+        return await asyncio.to_thread(
+            self._unpack_archive, archive_path, max_files, max_bytes
+        )
+
+    @staticmethod
+    def parse_tags(raw: Optional[str]) -> List[str]:
+        """
+        Разбирает список тегов через запятую: теги приводятся к нижнему
+        регистру, повторы удаляются. Допустимы буквы, цифры, `_` и `-`.
+        """
+        tags: List[str] = []
+        for part in (raw or "").split(","):
+            tag = part.strip().lower()
+            if not tag or tag in tags:
+                continue
+            if not TAG_PATTERN.match(tag):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Недопустимый тег: {tag}",
+                )
+            tags.append(tag)
+        return tags
+
+    async def find_by_tag(self, tag: str) -> List[str]:
+        """
+        Возвращает ID документов с тегом. Маркеры удаленных документов
+        удаляются при поиске.
+        """
+        tag_path = self._tag_index_path / tag.strip().lower()
+        if not TAG_PATTERN.match(tag_path.name):
+            return []
+        try:
+            markers = sorted(await asyncio.to_thread(os.listdir, tag_path))
+        except FileNotFoundError:
+            return []
+
+        doc_ids: List[str] = []
+        for doc_id in markers:
+            if await self.document_exists(doc_id):
+                doc_ids.append(doc_id)
+            else:
+                await asyncio.to_thread((tag_path / doc_id).unlink, missing_ok=True)
+        return doc_ids
+
+    async def get_document_content(self, doc_id: str) -> Optional[str]:
+        """
+        Получает текстовое содержимое документа по его ID.
+        """
+        return await self._read_text_from_file(doc_id)
+
+    async def get_document_metadata(self, doc_id: str) -> Optional[DocumentMetadata]:
+        """
+        Возвращает метаданные документа или None, если документ не найден
+        или сохранен в старом формате без метаданных.
+        """
+        metadata = self._metadata_cache.get(doc_id)
+        if metadata is None:
+            metadata = await asyncio.to_thread(self._read_metadata, doc_id)
+            if metadata is not None:
+                self._metadata_cache.set(doc_id, metadata)
+        return metadata
+
+    async def document_exists(self, doc_id: str) -> bool:
+        """
+        Проверяет наличие документа в хранилище без чтения его содержимого.
+        Документы с уже загруженными метаданными проверяются по кэшу в памяти.
+        """
+        if doc_id in self._metadata_cache:
+            return True
+        file_path = self._text_path(doc_id)
+        return await asyncio.to_thread(file_path.exists)
+
+    async def delete_document(self, doc_id: str) -> Optional[int]:
+        """
+        Удаляет текст документа, его метаданные и маркеры хэша и тегов.
+        Возвращает количество освобожденных байт или None, если документа
+        нет в хранилище.
+        """
+        metadata = await self.get_document_metadata(doc_id)
+        self._metadata_cache.pop(doc_id)
+        reclaimed = await asyncio.to_thread(self._delete_files, doc_id, metadata)
+        if reclaimed is not None:
+            logger.info(f"Документ {doc_id} удален из хранилища")
+        return reclaimed
+
+    async def expired_documents(self, now: datetime) -> List[str]:
+        """
+        Возвращает ID документов, срок хранения которых истек к `now`.
+        """
+        return await asyncio.to_thread(self._find_expired, now)
+
+    def close(self) -> None:
+        """
+        Останавливает пул процессов извлечения текста.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def spool_upload(self, file: UploadFile) -> Tuple[Path, str]:
+        """
+        Сохраняет загруженный файл во временную папку частями, одновременно
+        вычисляя его хэш. Возвращает путь к файлу и хэш содержимого.
+        """
+        await asyncio.to_thread(self._incoming_path.mkdir, parents=True, exist_ok=True)
+        upload_path = self._incoming_path / uuid.uuid4().hex
+        hasher = hashlib.sha256()
+        try:
+            async with aiofiles.open(upload_path, mode="wb") as f:
+                while chunk := await file.read(self.upload_chunk_size):
+                    hasher.update(chunk)
+                    await f.write(chunk)
+        except BaseException:
+            await asyncio.to_thread(upload_path.unlink, missing_ok=True)
+            raise
+        return upload_path, hasher.hexdigest()
+
+    @staticmethod
+    def _check_content_type(content_type: Optional[str]) -> None:
+        if content_type not in CONTENT_TYPES_BY_EXTENSION.values():
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Неподдерживаемый тип файла. Пожалуйста, используйте PDF или TXT.",
             )
 
-        if not text.strip():
+    def _unpack_archive(
+        self, archive_path: Path, max_files: int, max_bytes: int
+    ) -> List[SpooledUpload]:
+        self._incoming_path.mkdir(parents=True, exist_ok=True)
+        uploads: List[SpooledUpload] = []
+        unpacked_bytes = 0
+        try:
+            with zipfile.ZipFile(archive_path) as archive:
+                members = [
+                    info
+                    for info in archive.infolist()
+                    if not info.is_dir()
+                    and not info.filename.startswith("__MACOSX/")
+                    and not PurePosixPath(info.filename).name.startswith(".")
+                ]
+                if len(members) > max_files:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Слишком много файлов в архиве: максимум {max_files}.",
+                    )
+                for info in members:
+                    suffix = PurePosixPath(info.filename).suffix.lower()
+                    upload = SpooledUpload(
+                        filename=info.filename,
+                        content_type=CONTENT_TYPES_BY_EXTENSION.get(suffix),
+                    )
+                    uploads.append(upload)
+                    if upload.content_type is None:
+                        continue
+
+                    upload.path = self._incoming_path / uuid.uuid4().hex
+                    hasher = hashlib.sha256()
+                    with archive.open(info) as source, open(
+                        upload.path, "wb"
+                    ) as target:
+                        while chunk := source.read(self.upload_chunk_size):
+                            unpacked_bytes += len(chunk)
+                            if unpacked_bytes > max_bytes:
+                                raise HTTPException(
+                                    status_code=status.HTTP_400_BAD_REQUEST,
+                                    detail="Архив слишком большой после распаковки.",
+                                )
+                            hasher.update(chunk)
+                            target.write(chunk)
+                    upload.content_hash = hasher.hexdigest()
+        except (zipfile.BadZipFile, NotImplementedError, RuntimeError) as e:
+            self._remove_spooled(uploads)
+            logger.warning(f"Не удалось распаковать архив {archive_path.name}: {e}")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Загруженный документ пуст.",
+                detail="Поврежденный или неподдерживаемый zip-архив.",
             )
+        except BaseException:
+            self._remove_spooled(uploads)
+            raise
+        return uploads
+
+    @staticmethod
+    def _remove_spooled(uploads: Sequence[SpooledUpload]) -> None:
+        for upload in uploads:
+            if upload.path is not None:
+                upload.path.unlink(missing_ok=True)
+
+    async def _store_document(
+        self,
+        upload_path: Path,
+        content_type: str,
+        content_hash: str,
+        tags: Sequence[str] = (),
+        expires_at: Optional[datetime] = None,
+    ) -> str:
+        if content_type == "application/pdf":
+            pages = self._extract_text_from_pdf(upload_path)
+        else:
+            pages = self._single_page(self._extract_text_from_txt(upload_path))
 
         doc_id = f"doc_{uuid.uuid4().hex}"
-        await self._save_text_to_file(doc_id, text)
+        with STAGE_DURATION.time(stage="extraction"):
+            await self._save_text_to_file(
+                doc_id, pages, content_type, content_hash, expires_at
+            )
+        DOCUMENTS_STORED.inc(content_type=content_type)
+        await self._save_hash(content_hash, doc_id)
+        await self._save_tags(doc_id, tags)
+
+        if self.indexing_service is not None:
+            self.indexing_service.enqueue(doc_id)
+        return doc_id
+
+    async def _duplicate_response(
+        self,
+        doc_id: str,
+        filename: str,
+        content_type: str,
+        tags: Sequence[str] = (),
+        expires_at: Optional[datetime] = None,
+    ) -> UploadResponse:
+        logger.info(
+            f"Файл {filename} совпадает с ранее загруженным документом {doc_id}"
+        )
+
+        indexing_status = IndexingStatus.PENDING
+        if self.indexing_service is not None:
+            indexing_status = await self.indexing_service.get_status(doc_id)
+            if indexing_status != IndexingStatus.READY:
+                self.indexing_service.enqueue(doc_id)
+                indexing_status = await self.indexing_service.get_status(doc_id)
 
         return UploadResponse(
             document_id=doc_id,
-            filename=file.filename,
+            filename=filename,
             content_type=content_type,
+            status=indexing_status,
+            deduplicated=True,
+            expires_at=expires_at,
+            tags=list(tags),
         )
 
-    async def get_document_content(self, doc_id: str) -> Optional[str]:
+    def _expiry(self, ttl_seconds: Optional[float]) -> Optional[datetime]:
+        if ttl_seconds is None:
+            ttl_seconds = self.default_ttl_seconds
+        if ttl_seconds is None:
+            return None
+        return datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
+
+    async def _extend_expiry(
+        self, doc_id: str, expires_at: Optional[datetime]
+    ) -> Optional[datetime]:
         """
-        Получает текстовое содержимое документа по его ID.
+        Продлевает срок хранения документа при повторной загрузке. Документ
+        хранится, пока не истек срок последней загрузки; загрузка без срока
+        делает его бессрочным. Возвращает итоговый срок.
         """
-        return await self._read_text_from_file(doc_id)
+        metadata = await self.get_document_metadata(doc_id)
+        if metadata is None or metadata.expires_at is None:
+            return None
+        if expires_at is not None and expires_at <= metadata.expires_at:
+            return metadata.expires_at
+        metadata = metadata.model_copy(update={"expires_at": expires_at})
+        await asyncio.to_thread(self._write_metadata, metadata)
+        self._metadata_cache.set(doc_id, metadata)
+        return expires_at
+
+    async def _find_by_hash(self, content_hash: str) -> Optional[str]:
+        hash_path = self._hash_index_path / content_hash
+        try:
+            async with aiofiles.open(hash_path, mode="r", encoding="utf-8") as f:
+                doc_id = (await f.read()).strip()
+        except FileNotFoundError:
+            return None
 
-    async def _save_text_to_file(self, doc_id: str, text: str) -> None:
-        file_path = self._storage_path / f"{doc_id}.txt"
+        if not await self.document_exists(doc_id):
+            await asyncio.to_thread(hash_path.unlink, missing_ok=True)
+            return None
+        return doc_id
+
+    async def _save_hash(self, content_hash: str, doc_id: str) -> None:
+        hash_path = self._hash_index_path / content_hash
         try:
-            async with aiofiles.open(file_path, mode="w", encoding="utf-8") as f:
-                await f.write(text)
-            logger.success(f"Текст для документа {doc_id} сохранен в {file_path}")
+            async with aiofiles.open(hash_path, mode="w", encoding="utf-8") as f:
+                await f.write(doc_id)
+        except IOError as e:
+            logger.error(f"Ошибка сохранения хэша для {doc_id}: {e}")
+
+    async def _save_tags(self, doc_id: str, tags: Sequence[str]) -> None:
+        def write_markers() -> None:
+            for tag in tags:
+                tag_path = self._tag_index_path / tag
+                tag_path.mkdir(parents=True, exist_ok=True)
+                (tag_path / doc_id).touch()
+
+        try:
+            await asyncio.to_thread(write_markers)
+        except OSError as e:
+            logger.error(f"Ошибка сохранения тегов для {doc_id}: {e}")
+
+    async def _save_text_to_file(
+        self,
+        doc_id: str,
+        pages: AsyncIterator[AsyncIterator[str]],
+        content_type: str,
+        content_hash: str,
+        expires_at: Optional[datetime] = None,
+    ) -> DocumentMetadata:
+        """
+        Записывает текст документа по частям во временный файл, попутно
+        строя индекс смещений. Файл переименовывается после сохранения
+        метаданных, чтобы недописанный документ не был виден другим
+        запросам. Пустой документ отклоняется.
+        """
+        file_path = self._text_path(doc_id)
+        tmp_path = file_path.with_suffix(".txt.part")
+        index = TextIndexBuilder(self.token_model)
+        try:
+            async with aiofiles.open(tmp_path, mode="wb") as f:
+                async for page in pages:
+                    index.start_page()
+                    async for part in page:
+                        await f.write(index.add(part))
+            if not index.has_text:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Загруженный документ пуст.",
+                )
+            metadata = index.build(doc_id, content_hash, content_type)
+            metadata.expires_at = expires_at
+            await asyncio.to_thread(self._write_metadata, metadata)
+            await asyncio.to_thread(os.replace, tmp_path, file_path)
+            logger.success(
+                f"Текст для документа {doc_id} сохранен в {file_path}: "
+                f"{metadata.page_count} стр., {metadata.char_count} символов, "
+                f"~{metadata.token_count} токенов"
+            )
+            return metadata
         except IOError as e:
             logger.error(f"Ошибка сохранения файла для {doc_id}: {e}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Не удалось сохранить обработанный документ.",
             )
+        finally:
+            await asyncio.to_thread(tmp_path.unlink, missing_ok=True)
 
     async def _read_text_from_file(self, doc_id: str) -> Optional[str]:
-        file_path = self._storage_path / f"{doc_id}.txt"
+        file_path = self._text_path(doc_id)
         if not file_path.exists():
             return None
         try:
-            async with aiofiles.open(file_path, mode="r", encoding="utf-8") as f:
+            async with aiofiles.open(
+                file_path, mode="r", encoding="utf-8", newline=""
+            ) as f:
                 return await f.read()
         except IOError as e:
             logger.error(f"Ошибка чтения файла для {doc_id}: {e}")
             return None
 
-    async def _extract_text_from_pdf(self, file: UploadFile) -> str:
-        content = await file.read()
-        return await asyncio.to_thread(self._extract_text_from_pdf_sync, content)
+    def _text_path(self, doc_id: str) -> Path:
+        return self._storage_path / f"{doc_id}.txt"
 
-    @staticmethod
-    def _extract_text_from_pdf_sync(content: bytes) -> str:
+    def _metadata_path(self, doc_id: str) -> Path:
+        return self._storage_path / f"{doc_id}.meta.json"
+
+    def _write_metadata(self, metadata: DocumentMetadata) -> None:
+        file_path = self._metadata_path(metadata.document_id)
+        tmp_path = file_path.with_suffix(".tmp")
+        tmp_path.write_text(metadata.model_dump_json(), encoding="utf-8")
+        os.replace(tmp_path, file_path)
+
+    def _delete_files(
+        self, doc_id: str, metadata: Optional[DocumentMetadata]
+    ) -> Optional[int]:
+        document_paths = [self._text_path(doc_id), self._metadata_path(doc_id)]
+        marker_paths: List[Path] = []
+        if metadata is not None:
+            hash_path = self._hash_index_path / metadata.content_hash
+            try:
+                if hash_path.read_text(encoding="utf-8").strip() == doc_id:
+                    marker_paths.append(hash_path)
+            except FileNotFoundError:
+                pass
+        if self._tag_index_path.exists():
+            marker_paths.extend(
+                tag_path / doc_id for tag_path in self._tag_index_path.iterdir()
+            )
+
+        found = False
+        reclaimed = 0
+        for path in document_paths + marker_paths:
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            found = found or path in document_paths
+            reclaimed += size
+        return reclaimed if found else None
+
+    def _find_expired(self, now: datetime) -> List[str]:
+        expired: List[str] = []
+        for meta_path in self._storage_path.glob("*.meta.json"):
+            doc_id = meta_path.name[: -len(".meta.json")]
+            metadata = self._read_metadata(doc_id)
+            if (
+                metadata is not None
+                and metadata.expires_at is not None
+                and metadata.expires_at <= now
+            ):
+                expired.append(doc_id)
+        return sorted(expired)
+
+    def _read_metadata(self, doc_id: str) -> Optional[DocumentMetadata]:
         try:
-            with fitz.open(stream=content, filetype="pdf") as doc:
-                return "".join(page.get_text() for page in doc)
+            return DocumentMetadata.model_validate_json(
+                self._metadata_path(doc_id).read_text(encoding="utf-8")
+            )
+        except FileNotFoundError:
+            return None
+        except (IOError, ValueError) as e:
+            logger.error(f"Ошибка чтения метаданных документа {doc_id}: {e}")
+            return None
+
+    async def _extract_text_from_pdf(
+        self, path: Path
+    ) -> AsyncIterator[AsyncIterator[str]]:
+        """
+        Возвращает тексты страниц PDF по порядку. Небольшие документы
+        обрабатываются в потоке, большие — диапазонами страниц в пуле
+        процессов; одновременно в работе не больше двух диапазонов на воркер.
+        """
+        try:
+            page_count = await extraction_executor.run(
+                pdf_extraction.count_pages, str(path)
+            )
+            if page_count <= self.pages_per_task:
+                pages = await extraction_executor.run(
+                    pdf_extraction.extract_page_range, str(path), 0, page_count
+                )
+                for page in pages:
+                    yield self._single_part(page)
+                return
+
+            async for page in self._extract_pdf_pages_in_processes(path, page_count):
+                yield self._single_part(page)
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Ошибка извлечения текста из PDF: {e}")
             raise HTTPException(
@@ -101,11 +649,69 @@ class DocumentService:
                 detail="Не удалось обработать PDF файл.",
             )
 
+    async def _extract_pdf_pages_in_processes(
+        self, path: Path, page_count: int
+    ) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        ranges = iter(
+            (start, min(start + self.pages_per_task, page_count))
+            for start in range(0, page_count, self.pages_per_task)
+        )
+        in_flight: Deque[asyncio.Future] = deque()
+
+        def submit_next() -> None:
+            page_range = next(ranges, None)
+            if page_range is not None:
+                in_flight.append(
+                    loop.run_in_executor(
+                        executor,
+                        pdf_extraction.extract_page_range,
+                        str(path),
+                        *page_range,
+                    )
+                )
+
+        for _ in range(self.extraction_workers * 2):
+            submit_next()
+        try:
+            while in_flight:
+                pages = await in_flight.popleft()
+                submit_next()
+                for page in pages:
+                    yield page
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.extraction_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    @staticmethod
+    async def _single_part(text: str) -> AsyncIterator[str]:
+        yield text
+
     @staticmethod
-    async def _extract_text_from_txt(file: UploadFile) -> str:
-        content = await file.read()
+    async def _single_page(
+        parts: AsyncIterator[str],
+    ) -> AsyncIterator[AsyncIterator[str]]:
+        yield parts
+
+    async def _extract_text_from_txt(self, path: Path) -> AsyncIterator[str]:
+        """
+        Декодирует TXT-файл из UTF-8 по частям.
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")()
         try:
-            return content.decode("utf-8")
+            async with aiofiles.open(path, mode="rb") as f:
+                while chunk := await f.read(self.upload_chunk_size):
+                    yield decoder.decode(chunk)
+            yield decoder.decode(b"", final=True)
         except UnicodeDecodeError as e:
             logger.error(f"Ошибка декодирования TXT файла: {e}")
             raise HTTPException(
@@ -114,4 +720,10 @@ class DocumentService:
             )
 
 
-document_service = DocumentService()
+document_service = DocumentService(
+    upload_chunk_size=settings.UPLOAD_CHUNK_SIZE,
+    extraction_workers=settings.PDF_EXTRACTION_WORKERS,
+    pages_per_task=settings.PDF_PAGES_PER_TASK,
+    token_model=settings.LLM_MODEL,
+    default_ttl_seconds=settings.DOCUMENT_TTL_SECONDS,
+)
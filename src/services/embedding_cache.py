@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+
+from src.core.executors import ExecutorLane, indexing_executor, retrieval_executor
+
+
+class EmbeddingStore:
+    """
+    Персистентное хранилище эмбеддингов в SQLite с вытеснением по давности
+    использования.
+
+    Время последнего обращения обновляется не чаще раза в `touch_interval`
+    секунд для записи, поэтому повторное чтение горячих записей не
+    превращается в транзакцию записи.
+    """
+
+    def __init__(self, db_path: Path, max_entries: int, touch_interval: float = 600.0):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_access "
+            "ON embeddings (last_access)"
+        )
+        self._size = self._connection.execute(
+            "SELECT COUNT(*) FROM embeddings"
+        ).fetchone()[0]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        if not keys:
+            return found
+
+        now = time.time()
+        stale: List[str] = []
+        with self._lock:
+            for offset in range(0, len(keys), 500):
+                part = keys[offset : offset + 500]
+                placeholders = ",".join("?" * len(part))
+                rows = self._connection.execute(
+                    "SELECT key, vector, last_access FROM embeddings "
+                    f"WHERE key IN ({placeholders})",
+                    part,
+                ).fetchall()
+                for key, blob, last_access in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+                    if now - last_access >= self.touch_interval:
+                        stale.append(key)
+
+            if stale:
+                self._connection.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in stale],
+                )
+                self._connection.commit()
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+
+        now = time.time()
+        with self._lock:
+            cursor = self._connection.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_access) "
+                "VALUES (?, ?, ?)",
+                [
+                    (key, array("f", vector).tobytes(), now)
+                    for key, vector in items.items()
+                ],
+            )
+            self._size += cursor.rowcount
+            if self._size > self.max_entries:
+                self._connection.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    "SELECT key FROM embeddings ORDER BY last_access LIMIT ?)",
+                    (self._size - self.max_entries,),
+                )
+                self._size = self.max_entries
+            self._connection.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Эмбеддинги с кэшем, адресуемым по содержимому.
+
+    Ключ кэша — хэш имени модели и текста фрагмента, поэтому повторно
+    загруженные документы и совпадающие фрагменты не отправляются провайдеру.
+    Обращения к SQLite при индексации выполняются в пуле индексации, а при
+    эмбеддинге вопроса — в пуле поиска.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model_name: str,
+        db_path: Path,
+        max_entries: int = 500_000,
+    ):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.store = EmbeddingStore(db_path, max_entries)
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, texts: Sequence[str]) -> Tuple[Dict[int, List[float]], List[int]]:
+        """
+        Ищет эмбеддинги текстов в кэше, не обращаясь к провайдеру. Возвращает
+        найденные векторы по номерам текстов и номера текстов, которых в кэше
+        нет.
+        """
+        keys = [self._key(text) for text in texts]
+        cached = self.store.get_many(keys)
+        self._count(keys, cached)
+        found = {i: cached[key] for i, key in enumerate(keys) if key in cached}
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+        return found, missing
+
+    async def alookup(
+        self, texts: Sequence[str], lane: ExecutorLane = indexing_executor
+    ) -> Tuple[Dict[int, List[float]], List[int]]:
+        return await lane.run(self.lookup, texts)
+
+    def embed_missing(self, texts: Sequence[str]) -> List[List[float]]:
+        """
+        Вычисляет эмбеддинги текстов, которых нет в кэше, и сохраняет их.
+        Совпадающие тексты отправляются провайдеру один раз.
+        """
+        unique = list(dict.fromkeys(texts))
+        computed = self._computed(unique, self.underlying.embed_documents(unique))
+        self.store.put_many(computed)
+        return [computed[self._key(text)] for text in texts]
+
+    async def aembed_missing(
+        self, texts: Sequence[str], lane: ExecutorLane = indexing_executor
+    ) -> List[List[float]]:
+        unique = list(dict.fromkeys(texts))
+        vectors = await self.underlying.aembed_documents(unique)
+        computed = self._computed(unique, vectors)
+        await lane.run(self.store.put_many, computed)
+        return [computed[self._key(text)] for text in texts]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        found, missing = self.lookup(texts)
+        if missing:
+            vectors = self.embed_missing([texts[i] for i in missing])
+            found.update(zip(missing, vectors))
+        return [found[i] for i in range(len(texts))]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self._aembed(texts, indexing_executor)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self._aembed([text], retrieval_executor))[0]
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.store)}
+
+    def close(self) -> None:
+        self.store.close()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    async def _aembed(
+        self, texts: Sequence[str], lane: ExecutorLane
+    ) -> List[List[float]]:
+        found, missing = await self.alookup(texts, lane)
+        if missing:
+            vectors = await self.aembed_missing([texts[i] for i in missing], lane)
+            found.update(zip(missing, vectors))
+        return [found[i] for i in range(len(texts))]
+
+    def _computed(
+        self, texts: Sequence[str], vectors: List[List[float]]
+    ) -> Dict[str, List[float]]:
+        return {self._key(text): vector for text, vector in zip(texts, vectors)}
+
+    def _count(self, keys: Sequence[str], cached: Dict[str, List[float]]) -> None:
+        """
+        Учитывает попадания и промахи. Повтор уже пропущенного ключа в том же
+        вызове считается попаданием: провайдеру он отправляется один раз.
+        """
+        missing = set()
+        for key in keys:
+            if key in cached or key in missing:
+                self.hits += 1
+            else:
+                self.misses += 1
+                missing.add(key)
+        if missing:
+            logger.debug(
+                f"Кэш эмбеддингов: {len(missing)} новых фрагментов для модели "
+                f"{self.model_name}"
+            )
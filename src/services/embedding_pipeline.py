@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+
+from src.core.executors import indexing_executor
+from src.core.tokens import count_tokens
+from src.services.embedding_cache import CachedEmbeddings
+
+
+class TokenBucket:
+    """
+    Ограничитель скорости по алгоритму token bucket.
+
+    Корзина пополняется со скоростью `rate` токенов в секунду и вмещает не
+    более `capacity` токенов. Запрос, превышающий емкость, ждет полной корзины.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self, amount: float) -> None:
+        amount = min(amount, self.capacity)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated_at) * self.rate
+                )
+                self._updated_at = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) / self.rate)
+
+
+@dataclass
+class EmbeddingStats:
+    """Итоги работы конвейера эмбеддингов для одного документа."""
+
+    chunks: int = 0
+    cached: int = 0
+    batches: int = 0
+    tokens: int = 0
+    retries: int = 0
+
+
+class EmbeddingPipeline:
+    """
+    Конвейер вычисления эмбеддингов для индексации.
+
+    Фрагменты группируются в батчи по количеству токенов, батчи обрабатываются
+    параллельно с ограничением скорости, ошибки провайдера повторяются с
+    экспоненциальной задержкой и случайным разбросом. Если эмбеддинги
+    кэшируются, фрагменты батча сначала ищутся в кэше, и ограничитель
+    скорости и счетчик токенов учитывают только отправленные провайдеру.
+    Каждый готовый батч сразу записывается в коллекцию Chroma.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        max_batch_tokens: int = 8000,
+        max_batch_size: int = 256,
+        concurrency: int = 4,
+        tokens_per_minute: int = 1_000_000,
+        max_retries: int = 5,
+        retry_base_delay: float = 0.5,
+    ):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        rate = tokens_per_minute / 60
+        self.rate_limiter = TokenBucket(rate=rate, capacity=max(rate, max_batch_tokens))
+
+    def make_batches(self, texts: Sequence[str]) -> List[Tuple[List[int], int]]:
+        """
+        Группирует индексы фрагментов в батчи, не превышающие лимиты по
+        количеству токенов и фрагментов. Возвращает пары (индексы, токены).
+        """
+        batches: List[Tuple[List[int], int]] = []
+        current: List[int] = []
+        current_tokens = 0
+        for index, text in enumerate(texts):
+            tokens = count_tokens(text, self.model_name)
+            if current and (
+                current_tokens + tokens > self.max_batch_tokens
+                or len(current) >= self.max_batch_size
+            ):
+                batches.append((current, current_tokens))
+                current, current_tokens = [], 0
+            current.append(index)
+            current_tokens += tokens
+        if current:
+            batches.append((current, current_tokens))
+        return batches
+
+    async def run(
+        self,
+        collection: Any,
+        ids: Sequence[str],
+        texts: Sequence[str],
+        metadatas: Sequence[Dict[str, Any]],
+    ) -> EmbeddingStats:
+        """
+        Вычисляет эмбеддинги фрагментов и записывает их в коллекцию Chroma.
+        """
+        stats = EmbeddingStats(chunks=len(texts))
+        batches = self.make_batches(texts)
+        stats.batches = len(batches)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def process(batch: List[int], batch_tokens: int) -> None:
+            batch_texts = [texts[i] for i in batch]
+            vectors, missing = await self._lookup(batch_texts)
+            stats.cached += len(vectors)
+            if missing:
+                missing_texts = [batch_texts[i] for i in missing]
+                if len(missing) < len(batch):
+                    batch_tokens = sum(
+                        count_tokens(text, self.model_name) for text in missing_texts
+                    )
+                async with semaphore:
+                    await self.rate_limiter.acquire(batch_tokens)
+                    computed = await self._embed_with_retry(missing_texts, stats)
+                vectors.update(zip(missing, computed))
+                stats.tokens += batch_tokens
+            await indexing_executor.run(
+                collection.add,
+                ids=[ids[i] for i in batch],
+                embeddings=[vectors[i] for i in range(len(batch))],
+                documents=batch_texts,
+                metadatas=[metadatas[i] for i in batch],
+            )
+
+        tasks = [
+            asyncio.create_task(process(batch, batch_tokens))
+            for batch, batch_tokens in batches
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        return stats
+
+    async def _lookup(
+        self, texts: List[str]
+    ) -> Tuple[Dict[int, List[float]], List[int]]:
+        """
+        Возвращает найденные в кэше эмбеддинги по номерам фрагментов и номера
+        фрагментов, которые нужно отправить провайдеру.
+        """
+        if isinstance(self.embeddings, CachedEmbeddings):
+            return await self.embeddings.alookup(texts)
+        return {}, list(range(len(texts)))
+
+    async def _embed_with_retry(
+        self, texts: List[str], stats: EmbeddingStats
+    ) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                if isinstance(self.embeddings, CachedEmbeddings):
+                    return await self.embeddings.aembed_missing(texts)
+                return await self.embeddings.aembed_documents(texts)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = random.uniform(0, self.retry_base_delay * 2**attempt)
+                stats.retries += 1
+                logger.warning(
+                    f"Ошибка вычисления эмбеддингов (попытка {attempt + 1}), "
+                    f"повтор через {delay:.2f} с: {e}"
+                )
+                await asyncio.sleep(delay)
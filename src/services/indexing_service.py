@@ -0,0 +1,448 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Tuple
+
+import chromadb
+from fastapi import HTTPException, status
+from langchain_core.embeddings import Embeddings
+from loguru import logger
+
+from src.core.cache import LRUCache
+from src.core.config import Settings
+from src.core.executors import indexing_executor
+from src.core.metrics import EMBEDDING_TOKENS, INDEXED_CHUNKS, STAGE_DURATION
+from src.models.documents import DocumentMetadata, IndexingStatus
+from src.services.chunking import ChunkSpans, SpanSplitter, split_parent_child
+from src.services.collection_registry import CollectionRegistry, IndexGeneration
+from src.services.embedding_pipeline import EmbeddingPipeline
+from src.services.lexical_index import BM25Index, LexicalIndexStore
+from src.services.parent_store import ParentStore
+
+if TYPE_CHECKING:
+    from src.services.document_service import DocumentService
+
+# Версия алгоритма деления на фрагменты. Меняется вместе с изменениями
+# SpanSplitter или метаданных фрагментов, чтобы индексы были перестроены.
+CHUNKER_VERSION = 1
+
+# Версия формата файлов BM25-индекса. Меняется вместе с форматом
+# LexicalIndexStore, чтобы индексы были перестроены.
+LEXICAL_INDEX_VERSION = 2
+
+
+def index_config(settings: Settings) -> Dict[str, str]:
+    """Настройки, от которых зависит содержимое индекса документа."""
+    return {
+        "chunker_version": str(CHUNKER_VERSION),
+        "lexical_index_version": str(LEXICAL_INDEX_VERSION),
+        "parent_chunks": f"{settings.PARENT_CHUNK_SIZE}/{settings.PARENT_CHUNK_OVERLAP}",
+        "child_chunks": f"{settings.CHILD_CHUNK_SIZE}/{settings.CHILD_CHUNK_OVERLAP}",
+        "embedding_model": settings.EMBEDDING_MODEL,
+    }
+
+
+def index_version(settings: Settings) -> str:
+    """
+    Отпечаток настроек индекса. Входит в имя коллекции и ключи файлов
+    поколения, поэтому индексы с разными настройками не пересекаются.
+    """
+    config = json.dumps(index_config(settings), sort_keys=True)
+    return hashlib.sha256(config.encode("utf-8")).hexdigest()[:12]
+
+
+def build_splitters(settings: Settings) -> Tuple[SpanSplitter, SpanSplitter]:
+    """Делители родительских и дочерних фрагментов по настройкам."""
+    return (
+        SpanSplitter(settings.PARENT_CHUNK_SIZE, settings.PARENT_CHUNK_OVERLAP),
+        SpanSplitter(settings.CHILD_CHUNK_SIZE, settings.CHILD_CHUNK_OVERLAP),
+    )
+
+
+def child_metadatas(
+    spans: ChunkSpans, document_metadata: Optional[DocumentMetadata] = None
+) -> List[Dict[str, int]]:
+    """
+    Метаданные дочерних фрагментов: позиция в документе, номер и начало
+    родителя и, если известны границы страниц, номер страницы.
+    """
+    metadatas = []
+    for start, end, parent_id in zip(
+        spans.child_starts, spans.child_ends, spans.child_parents
+    ):
+        metadata = {
+            "parent_id": parent_id,
+            "parent_start": spans.parent_starts[parent_id],
+            "start": start,
+            "end": end,
+        }
+        if document_metadata is not None:
+            metadata["page"] = document_metadata.page_at(start)
+        metadatas.append(metadata)
+    return metadatas
+
+
+class IndexingService:
+    """
+    Фоновая индексация документов в векторной базе.
+
+    Задачи индексации выполняются пулом asyncio-воркеров. Для каждого документа
+    одновременно существует не более одной задачи: повторные запросы ожидают
+    уже запущенную. Состояния и ошибки хранятся для последних
+    `INDEXING_STATUS_HISTORY_SIZE` документов; для вытесненных состояние
+    восстанавливается по реестру коллекций.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        document_service: DocumentService,
+        embeddings: Embeddings,
+        chroma_client: chromadb.ClientAPI,
+        collection_registry: Optional[CollectionRegistry] = None,
+        parent_store: Optional[ParentStore] = None,
+        embedding_pipeline: Optional[EmbeddingPipeline] = None,
+        lexical_store: Optional[LexicalIndexStore] = None,
+    ):
+        self.settings = settings
+        self.document_service = document_service
+        self.embeddings = embeddings
+        self.chroma_client = chroma_client
+        self.index_config = index_config(settings)
+        self.index_version = index_version(settings)
+        self.parent_splitter, self.child_splitter = build_splitters(settings)
+        self.collection_registry = collection_registry or CollectionRegistry(
+            chroma_client=chroma_client,
+            embeddings=embeddings,
+            max_open_handles=settings.CHROMA_HANDLE_CACHE_SIZE,
+            index_version=self.index_version,
+        )
+        self.parent_store = parent_store or ParentStore(
+            Path(settings.PARENT_STORE_PATH),
+            cache_size=settings.PARENT_STORE_CACHE_SIZE,
+        )
+        self.lexical_store = lexical_store or LexicalIndexStore(
+            Path(settings.CHROMA_PATH) / "lexical",
+            cache_size=settings.LEXICAL_INDEX_CACHE_SIZE,
+        )
+        self.embedding_pipeline = embedding_pipeline or EmbeddingPipeline(
+            embeddings=embeddings,
+            model_name=settings.EMBEDDING_MODEL,
+            max_batch_tokens=settings.EMBEDDING_BATCH_MAX_TOKENS,
+            max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+            concurrency=settings.EMBEDDING_CONCURRENCY,
+            tokens_per_minute=settings.EMBEDDING_TOKENS_PER_MINUTE,
+            max_retries=settings.EMBEDDING_MAX_RETRIES,
+        )
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue[str]] = None
+        self._workers: List[asyncio.Task] = []
+        self._jobs: Dict[str, asyncio.Future] = {}
+        self._statuses: LRUCache[str, IndexingStatus] = LRUCache(
+            settings.INDEXING_STATUS_HISTORY_SIZE
+        )
+        self._errors: LRUCache[str, str] = LRUCache(
+            settings.INDEXING_STATUS_HISTORY_SIZE
+        )
+        self._writers = 0
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+        self._drained = asyncio.Event()
+        self._drained.set()
+
+    def enqueue(self, document_id: str) -> asyncio.Future:
+        """
+        Ставит документ в очередь на индексацию и возвращает future задачи.
+        Если задача для документа уже выполняется, возвращает ее future.
+        """
+        self._ensure_workers()
+
+        job = self._jobs.get(document_id)
+        if job is not None:
+            return job
+
+        job = self._loop.create_future()
+        self._jobs[document_id] = job
+        self._statuses.set(document_id, IndexingStatus.PENDING)
+        self._errors.pop(document_id)
+        self._queue.put_nowait(document_id)
+        logger.info(f"Документ {document_id} поставлен в очередь на индексацию")
+        return job
+
+    def is_indexing(self, document_id: str) -> bool:
+        """Проверяет, стоит ли документ в очереди или индексируется сейчас."""
+        return document_id in self._jobs
+
+    async def wait_until_indexed(self, document_id: str) -> None:
+        """
+        Дожидается готовности индекса документа, при необходимости запуская
+        индексацию.
+        """
+        if await self.is_ready(document_id):
+            return
+
+        await asyncio.shield(self.enqueue(document_id))
+
+        if self._statuses.get(document_id) == IndexingStatus.FAILED:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Не удалось проиндексировать документ.",
+            )
+
+    async def is_ready(self, document_id: str) -> bool:
+        """
+        Проверяет по реестру в памяти, что индекс документа готов и не
+        перестраивается. Не обращается к тексту документа.
+        """
+        return document_id not in self._jobs and await self._is_indexed(document_id)
+
+    async def get_status(self, document_id: str) -> Optional[IndexingStatus]:
+        """
+        Возвращает состояние индексации документа или None, если документ
+        не найден.
+        """
+        known_status = self._statuses.get(document_id)
+        if known_status is not None:
+            return known_status
+        if await self._is_indexed(document_id):
+            return IndexingStatus.READY
+        if await self.document_service.document_exists(document_id):
+            return IndexingStatus.PENDING
+        return None
+
+    def get_error(self, document_id: str) -> Optional[str]:
+        return self._errors.get(document_id)
+
+    async def aclose(self) -> None:
+        """
+        Останавливает воркеры. Незавершенные задачи будут запущены заново
+        при следующем обращении к документу.
+        """
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+        for job in self._jobs.values():
+            if not job.done():
+                job.cancel()
+
+        self._workers = []
+        self._jobs = {}
+        self._queue = None
+        self._loop = None
+
+    def _ensure_workers(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._jobs = {}
+        self._workers = [
+            loop.create_task(self._worker())
+            for _ in range(self.settings.INDEXING_WORKERS)
+        ]
+
+    async def _worker(self) -> None:
+        while True:
+            document_id = await self._queue.get()
+            try:
+                await self._run_job(document_id)
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, document_id: str) -> None:
+        self._statuses.set(document_id, IndexingStatus.INDEXING)
+        try:
+            await self._index_document(document_id)
+            self._statuses.set(document_id, IndexingStatus.READY)
+        except Exception as e:
+            logger.error(f"Ошибка индексации документа {document_id}: {e}")
+            self._statuses.set(document_id, IndexingStatus.FAILED)
+            self._errors.set(document_id, str(e))
+        finally:
+            job = self._jobs.pop(document_id, None)
+            if job is not None and not job.done():
+                job.set_result(None)
+
+    async def _is_indexed(self, document_id: str) -> bool:
+        if self._statuses.get(document_id) == IndexingStatus.READY:
+            return True
+        return await self.collection_registry.is_indexed(document_id)
+
+    async def rebuild(self, document_id: str) -> Optional[IndexGeneration]:
+        """
+        Строит индекс документа с текущими настройками рядом с действующим и
+        переключает запросы на него. Пока идет сборка, запросы читают старое
+        поколение. Возвращает вытесненное поколение, которое вызывающий код
+        удаляет, когда начатые запросы к нему завершатся, или None, если
+        индекс уже актуален.
+        """
+        current = await self.collection_registry.get_generation(document_id)
+        if current is not None and current.version == self.index_version:
+            return None
+        generation = IndexGeneration(document_id, self.index_version)
+        await self._build_generation(generation)
+        if not await self.document_service.document_exists(document_id):
+            await self.remove_generation(generation)
+            return None
+        return self.collection_registry.activate(generation)
+
+    async def remove_document(self, document_id: str) -> bool:
+        """
+        Удаляет индекс документа. Если документ сейчас индексируется,
+        дожидается окончания задачи, чтобы не оставить построенный после
+        удаления индекс. Возвращает True, если индекс был.
+        """
+        job = self._jobs.get(document_id)
+        if job is not None:
+            await asyncio.shield(job)
+        self._statuses.pop(document_id)
+        self._errors.pop(document_id)
+
+        generation = await self.collection_registry.get_generation(document_id)
+        if generation is None:
+            return False
+        self.collection_registry.discard(document_id)
+        await self.remove_generation(generation)
+        return True
+
+    async def remove_generation(self, generation: IndexGeneration) -> None:
+        """Удаляет коллекцию, родительские фрагменты и BM25-индекс поколения."""
+        async with self._writing():
+            try:
+                await indexing_executor.run(
+                    self.chroma_client.delete_collection, generation.collection_name
+                )
+            except ValueError:
+                pass
+            await self.parent_store.delete(generation.storage_key)
+            await self.lexical_store.delete(generation.storage_key)
+        logger.info(f"Удалено поколение индекса {generation.collection_name}")
+
+    @asynccontextmanager
+    async def paused(self) -> AsyncIterator[None]:
+        """
+        Приостанавливает запись в Chroma и хранилища индекса: начатые сборки
+        и удаления поколений завершаются, новые ждут выхода из блока.
+        """
+        self._resumed.clear()
+        try:
+            await self._drained.wait()
+            yield
+        finally:
+            self._resumed.set()
+
+    @asynccontextmanager
+    async def _writing(self) -> AsyncIterator[None]:
+        while not self._resumed.is_set():
+            await self._resumed.wait()
+        self._writers += 1
+        self._drained.clear()
+        try:
+            yield
+        finally:
+            self._writers -= 1
+            if self._writers == 0:
+                self._drained.set()
+
+    def split_document(self, text: str) -> ChunkSpans:
+        """
+        Делит текст на родительские фрагменты для контекста LLM и дочерние для
+        поиска. Возвращает только смещения; тексты фрагментов вырезаются при
+        передаче в хранилища и на вычисление эмбеддингов.
+        """
+        return split_parent_child(text, self.parent_splitter, self.child_splitter)
+
+    async def _index_document(self, document_id: str) -> None:
+        if await self._is_indexed(document_id):
+            logger.info(f"База для документа {document_id} уже существует")
+            return
+
+        generation = IndexGeneration(document_id, self.index_version)
+        await self._build_generation(generation)
+        self.collection_registry.activate(generation)
+
+    async def _build_generation(self, generation: IndexGeneration) -> None:
+        async with self._writing():
+            await self._write_generation(generation)
+
+    async def _write_generation(self, generation: IndexGeneration) -> None:
+        document_id = generation.document_id
+        document_text = await self.document_service.get_document_content(document_id)
+        if document_text is None:
+            raise ValueError("Документ не найден.")
+
+        document_metadata = await self.document_service.get_document_metadata(
+            document_id
+        )
+
+        logger.info(f"Запуск индексации документа {document_id}...")
+        with STAGE_DURATION.time(stage="chunking"):
+            spans = self.split_document(document_text)
+            metadatas = child_metadatas(spans, document_metadata)
+
+        await self.parent_store.save(
+            generation.storage_key, spans.parent_texts(document_text)
+        )
+        child_texts = spans.child_texts(document_text)
+        ids = [f"{document_id}_{i}" for i in range(len(child_texts))]
+        lexical_index = await indexing_executor.run(BM25Index.build, ids, child_texts)
+        await self.lexical_store.save(generation.storage_key, lexical_index)
+        collection = await indexing_executor.run(
+            self._create_building_collection, generation
+        )
+        with STAGE_DURATION.time(stage="embedding"):
+            stats = await self.embedding_pipeline.run(
+                collection,
+                ids=ids,
+                texts=child_texts,
+                metadatas=metadatas,
+            )
+        INDEXED_CHUNKS.inc(stats.chunks)
+        EMBEDDING_TOKENS.inc(stats.tokens)
+        await indexing_executor.run(
+            collection.modify, metadata=self._collection_metadata(generation, "ready")
+        )
+
+        logger.success(
+            f"Новая база для документа {document_id} успешно создана: "
+            f"{stats.chunks} фрагментов ({stats.cached} из кэша), "
+            f"{stats.batches} батчей, {stats.tokens} токенов."
+        )
+
+    def _collection_metadata(
+        self, generation: IndexGeneration, status_name: str
+    ) -> Dict[str, str]:
+        """
+        Метаданные коллекции: состояние сборки, документ и настройки, с
+        которыми построен индекс.
+        """
+        return {
+            "status": status_name,
+            "document_id": generation.document_id,
+            "index_version": self.index_version,
+            **self.index_config,
+        }
+
+    def _create_building_collection(
+        self, generation: IndexGeneration
+    ) -> chromadb.Collection:
+        """
+        Создает пустую коллекцию с пометкой о незавершенной сборке. Остатки
+        прерванной сборки удаляются.
+        """
+        try:
+            self.chroma_client.delete_collection(generation.collection_name)
+        except ValueError:
+            pass
+        return self.chroma_client.create_collection(
+            generation.collection_name,
+            metadata=self._collection_metadata(generation, "building"),
+        )
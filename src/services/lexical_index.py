@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+from loguru import logger
+
+from src.core.cache import LRUCache
+from src.core.executors import indexing_executor, retrieval_executor
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Лексический индекс фрагментов одного документа по формуле Okapi BM25.
+
+    Индекс хранит только постинги, длины фрагментов и их идентификаторы в
+    коллекции Chroma: тексты и метаданные найденных фрагментов читаются из
+    коллекции. Находит точные совпадения (номера договоров, имена), которые
+    плотный поиск пропускает.
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        doc_lengths: List[int],
+        postings: Dict[str, List[Tuple[int, int]]],
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.ids = ids
+        self.doc_lengths = doc_lengths
+        self.postings = postings
+        self.k1 = k1
+        self.b = b
+        avg_length = sum(doc_lengths) / len(doc_lengths) if doc_lengths else 0.0
+        self._length_norms = [
+            k1 * (1 - b + b * length / (avg_length or 1)) for length in doc_lengths
+        ]
+
+    @classmethod
+    def build(
+        cls,
+        ids: Sequence[str],
+        texts: Sequence[str],
+        k1: float = 1.5,
+        b: float = 0.75,
+    ) -> BM25Index:
+        postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        doc_lengths: List[int] = []
+        for index, text in enumerate(texts):
+            terms = tokenize(text)
+            doc_lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                postings[term].append((index, frequency))
+        return cls(list(ids), doc_lengths, dict(postings), k1, b)
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """
+        Возвращает идентификаторы до `k` фрагментов с наибольшей оценкой BM25
+        вместе с оценками.
+        """
+        total = len(self.doc_lengths)
+        if total == 0:
+            return []
+
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            term_postings = self.postings.get(term)
+            if not term_postings:
+                continue
+            df = len(term_postings)
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for index, frequency in term_postings:
+                scores[index] += (
+                    idf
+                    * frequency
+                    * (self.k1 + 1)
+                    / (frequency + self._length_norms[index])
+                )
+
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(self.ids[index], score) for index, score in best]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "k1": self.k1,
+            "b": self.b,
+            "ids": self.ids,
+            "doc_lengths": self.doc_lengths,
+            "postings": self.postings,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> BM25Index:
+        return cls(
+            ids=data["ids"],
+            doc_lengths=data["doc_lengths"],
+            postings={
+                term: [tuple(posting) for posting in term_postings]
+                for term, term_postings in data["postings"].items()
+            },
+            k1=data["k1"],
+            b=data["b"],
+        )
+
+
+def fetch_chunks(
+    collection: Any, scored_ids: List[Tuple[str, float]]
+) -> List[Tuple[Document, float]]:
+    """
+    Читает тексты и метаданные фрагментов из коллекции Chroma одним запросом
+    и возвращает их в порядке `scored_ids`.
+    """
+    if not scored_ids:
+        return []
+    rows = collection.get(
+        ids=[chunk_id for chunk_id, _ in scored_ids],
+        include=["documents", "metadatas"],
+    )
+    chunks = {
+        chunk_id: Document(page_content=text, metadata=metadata or {})
+        for chunk_id, text, metadata in zip(
+            rows["ids"], rows["documents"], rows["metadatas"]
+        )
+    }
+    return [
+        (chunks[chunk_id], score)
+        for chunk_id, score in scored_ids
+        if chunk_id in chunks
+    ]
+
+
+class LexicalIndexStore:
+    """
+    Хранилище BM25-индексов документов рядом с данными Chroma.
+
+    Индекс каждого документа сохраняется в отдельном JSON-файле; загруженные
+    индексы держатся в LRU-кэше. Загрузка, поиск и чтение найденных
+    фрагментов из Chroma выполняются в пуле потоков поиска, запись — в пуле
+    индексации.
+    """
+
+    def __init__(self, storage_path: Path, cache_size: int = 64):
+        self._storage_path = storage_path
+        self._cache: LRUCache[str, BM25Index] = LRUCache(cache_size)
+
+    async def save(self, document_id: str, index: BM25Index) -> None:
+        await indexing_executor.run(self._write, document_id, index)
+        self._cache.set(document_id, index)
+
+    async def get(self, document_id: str) -> Optional[BM25Index]:
+        index = self._cache.get(document_id)
+        if index is None:
+            index = await retrieval_executor.run(self._read, document_id)
+            if index is not None:
+                self._cache.set(document_id, index)
+        return index
+
+    async def search(
+        self, document_id: str, query: str, k: int, collection: Any
+    ) -> List[Document]:
+        """
+        Ищет фрагменты документа по BM25. Тексты и метаданные найденных
+        фрагментов читаются из `collection` — коллекции Chroma того же
+        поколения или обертки `Chroma` над ней. Для документов,
+        проиндексированных до появления лексического поиска, возвращает
+        пустой список.
+        """
+        return [
+            document
+            for document, _ in await self.search_with_scores(
+                document_id, query, k, collection
+            )
+        ]
+
+    async def search_with_scores(
+        self, document_id: str, query: str, k: int, collection: Any
+    ) -> List[Tuple[Document, float]]:
+        index = await self.get(document_id)
+        if index is None:
+            return []
+        return await retrieval_executor.run(
+            lambda: fetch_chunks(collection, index.search(query, k))
+        )
+
+    async def keys(self) -> List[str]:
+        """Возвращает ключи всех сохраненных BM25-индексов."""
+        return await indexing_executor.run(self._keys)
+
+    async def delete(self, document_id: str) -> None:
+        self._cache.pop(document_id)
+        await indexing_executor.run(self._path(document_id).unlink, missing_ok=True)
+
+    def _path(self, document_id: str) -> Path:
+        return self._storage_path / f"{document_id}.bm25.json"
+
+    def _keys(self) -> List[str]:
+        suffix = ".bm25.json"
+        return [
+            path.name[: -len(suffix)] for path in self._storage_path.glob(f"*{suffix}")
+        ]
+
+    def _write(self, document_id: str, index: BM25Index) -> None:
+        self._storage_path.mkdir(parents=True, exist_ok=True)
+        file_path = self._path(document_id)
+        tmp_path = file_path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps(index.to_dict(), ensure_ascii=False), encoding="utf-8"
+        )
+        os.replace(tmp_path, file_path)
+
+    def _read(self, document_id: str) -> Optional[BM25Index]:
+        try:
+            data = json.loads(self._path(document_id).read_text(encoding="utf-8"))
+            if "ids" not in data:
+                # Индекс старого формата с текстами фрагментов; заменяется
+                # переиндексацией.
+                return None
+            return BM25Index.from_dict(data)
+        except FileNotFoundError:
+            return None
+        except (IOError, ValueError, KeyError) as e:
+            logger.error(f"Ошибка чтения лексического индекса {document_id}: {e}")
+            return None
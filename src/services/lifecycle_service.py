@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import shutil
+import sqlite3
+import uuid
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, Sequence
+
+from loguru import logger
+
+from src.core.metrics import DOCUMENTS_DELETED, STORAGE_RECLAIMED_BYTES
+from src.models.documents import GarbageCollectionReport
+from src.services.answer_cache import SemanticAnswerCache
+from src.services.document_service import DocumentService
+from src.services.indexing_service import IndexingService
+from src.services.summary_cache import SummaryCache
+
+# Строки удаленных коллекций, которые Chroma 0.5 оставляет в SQLite, если
+# сегменты коллекции не были открыты в процессе, удалившем ее, а также
+# журнал записей (embeddings_queue), который Chroma не очищает.
+ORPHAN_ROWS_SQL = (
+    "DELETE FROM embedding_fulltext_search WHERE rowid IN (SELECT id FROM "
+    "embeddings WHERE segment_id NOT IN (SELECT id FROM segments))",
+    "DELETE FROM embedding_metadata WHERE id IN (SELECT id FROM embeddings "
+    "WHERE segment_id NOT IN (SELECT id FROM segments))",
+    "DELETE FROM embeddings WHERE segment_id NOT IN (SELECT id FROM segments)",
+    "DELETE FROM max_seq_id WHERE segment_id NOT IN (SELECT id FROM segments)",
+    "DELETE FROM embeddings_queue WHERE substr(topic, -36) NOT IN "
+    "(SELECT id FROM collections)",
+)
+
+
+def compact_chroma(chroma_path: Path) -> int:
+    """
+    Сжимает базу Chroma: удаляет строки и папки HNSW-сегментов удаленных
+    коллекций и выполняет VACUUM. Возвращает количество удаленных папок.
+
+    Папки сегментов перечисляются до чтения таблицы сегментов: запись о
+    сегменте создается раньше его папки, поэтому папка коллекции, созданной
+    во время сжатия, не будет принята за остаток удаленной.
+
+    Вызывающий код должен остановить запись в базу на время сжатия (см.
+    `IndexingService.paused`). Чтение может продолжаться: удаляются только
+    строки и папки сегментов, которых уже нет в таблице сегментов, а VACUUM
+    ждет освобождения базы читателями.
+    """
+    db_path = chroma_path / "chroma.sqlite3"
+    if not db_path.exists():
+        return 0
+    segment_dirs = [
+        path for path in chroma_path.iterdir() if path.is_dir() and _is_uuid(path.name)
+    ]
+    with closing(sqlite3.connect(db_path, timeout=60)) as conn:
+        live_segments = {row[0] for row in conn.execute("SELECT id FROM segments")}
+        with conn:
+            for statement in ORPHAN_ROWS_SQL:
+                conn.execute(statement)
+        conn.execute("VACUUM")
+
+    removed = 0
+    for segment_dir in segment_dirs:
+        if segment_dir.name not in live_segments:
+            shutil.rmtree(segment_dir, ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def disk_usage(paths: Sequence[Path]) -> int:
+    """Суммарный размер файлов в папках; вложенные папки считаются один раз."""
+    roots = sorted({path.resolve() for path in paths if path.exists()})
+    roots = [
+        root
+        for root in roots
+        if not any(other != root and other in root.parents for other in roots)
+    ]
+    total = 0
+    for root in roots:
+        for directory, _, files in os.walk(root):
+            for name in files:
+                try:
+                    total += os.stat(os.path.join(directory, name)).st_size
+                except FileNotFoundError:
+                    pass
+    return total
+
+
+def _is_uuid(name: str) -> bool:
+    try:
+        uuid.UUID(name)
+    except ValueError:
+        return False
+    return True
+
+
+class DocumentLifecycleService:
+    """
+    Удаление документов вместе со всеми производными данными и фоновая
+    сборка мусора.
+
+    Проход сборщика удаляет документы с истекшим сроком хранения, индексы
+    (в том числе недостроенные) документов, текст которых уже удален, и
+    файлы родительских фрагментов, BM25-индексов и summary без документа.
+    Раз в `compact_every` проходов база Chroma сжимается (см.
+    `compact_chroma`); на это время запись индексов приостанавливается.
+    Освобожденное место считается по размеру папок `storage_paths` до и
+    после прохода.
+    """
+
+    def __init__(
+        self,
+        document_service: DocumentService,
+        indexing_service: IndexingService,
+        summary_cache: Optional[SummaryCache] = None,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+        chroma_path: Optional[Path] = None,
+        storage_paths: Sequence[Path] = (),
+        interval: float = 3600.0,
+        compact_every: int = 24,
+    ):
+        self.document_service = document_service
+        self.indexing_service = indexing_service
+        self.summary_cache = summary_cache
+        self.answer_cache = answer_cache
+        self.chroma_path = chroma_path
+        self.storage_paths = list(storage_paths)
+        self.interval = interval
+        self.compact_every = compact_every
+        self.last_report: Optional[GarbageCollectionReport] = None
+        self._runs = 0
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def delete_document(self, document_id: str, reason: str = "request") -> bool:
+        """
+        Удаляет документ, его индекс, родительские фрагменты, BM25-индекс,
+        summary и кэшированные ответы. Текст удаляется первым, чтобы запросы
+        не запустили повторную индексацию. Возвращает False, если документа
+        не было.
+        """
+        reclaimed = await self.document_service.delete_document(document_id)
+        had_index = await self.indexing_service.remove_document(document_id)
+        if self.summary_cache is not None:
+            await self.summary_cache.delete(document_id)
+        if self.answer_cache is not None:
+            self.answer_cache.discard(document_id)
+
+        if reclaimed is None and not had_index:
+            return False
+        DOCUMENTS_DELETED.inc(reason=reason)
+        logger.info(f"Документ {document_id} удален ({reason})")
+        return True
+
+    async def collect_garbage(
+        self, compact: Optional[bool] = None
+    ) -> GarbageCollectionReport:
+        """
+        Выполняет проход сборщика мусора. `compact` принудительно включает
+        или выключает сжатие базы Chroma; по умолчанию оно выполняется раз в
+        `compact_every` проходов.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            report = GarbageCollectionReport(started_at=datetime.now(timezone.utc))
+            size_before = await asyncio.to_thread(disk_usage, self.storage_paths)
+
+            expired = await self.document_service.expired_documents(report.started_at)
+            for document_id in expired:
+                if await self.delete_document(document_id, reason="expired"):
+                    report.expired_documents.append(document_id)
+
+            registry = self.indexing_service.collection_registry
+            for document_id in await registry.documents():
+                if not await self.document_service.document_exists(document_id):
+                    await self.indexing_service.remove_document(document_id)
+                    report.orphan_indexes += 1
+            report.orphan_indexes += await self._remove_orphan_builds()
+            report.orphan_files = await self._remove_orphan_files()
+
+            self._runs += 1
+            if compact is None:
+                compact = self._runs % self.compact_every == 0
+            if compact and self.chroma_path is not None:
+                try:
+                    async with self.indexing_service.paused():
+                        report.orphan_segments = await asyncio.to_thread(
+                            compact_chroma, self.chroma_path
+                        )
+                    report.compacted = True
+                except sqlite3.Error as e:
+                    logger.warning(f"Не удалось сжать базу Chroma: {e}")
+
+            size_after = await asyncio.to_thread(disk_usage, self.storage_paths)
+            report.reclaimed_bytes = max(0, size_before - size_after)
+            report.finished_at = datetime.now(timezone.utc)
+            STORAGE_RECLAIMED_BYTES.inc(report.reclaimed_bytes)
+            self.last_report = report
+            logger.info(
+                f"Сборка мусора: удалено документов {len(report.expired_documents)}, "
+                f"индексов без документа {report.orphan_indexes}, файлов "
+                f"{report.orphan_files}, сегментов {report.orphan_segments}; "
+                f"освобождено {report.reclaimed_bytes} байт"
+            )
+            return report.model_copy(deep=True)
+
+    def start(self) -> None:
+        """
+        Запускает периодическую сборку мусора, если она еще не запущена.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.collect_garbage()
+            except Exception as e:
+                logger.error(f"Ошибка сборки мусора: {e}")
+
+    async def _remove_orphan_builds(self) -> int:
+        """
+        Удаляет недостроенные коллекции документов, которых уже нет: они
+        остаются после сбоя или удаления документа во время индексации и не
+        попадают в реестр.
+        """
+        registry = self.indexing_service.collection_registry
+        removed = 0
+        for generation in await registry.building_generations():
+            document_id = generation.document_id
+            if self.indexing_service.is_indexing(document_id):
+                continue
+            if await self.document_service.document_exists(document_id):
+                continue
+            await self.indexing_service.remove_generation(generation)
+            removed += 1
+        return removed
+
+    async def _remove_orphan_files(self) -> int:
+        """
+        Удаляет родительские фрагменты, BM25-индексы и summary документов,
+        у которых нет ни текста, ни действующего индекса. Ключ файлов
+        поколения индекса начинается с ID документа.
+        """
+        removed = 0
+        for store in (
+            self.indexing_service.parent_store,
+            self.indexing_service.lexical_store,
+        ):
+            for key in await store.keys():
+                if await self._is_orphan(key.split(".", 1)[0]):
+                    await store.delete(key)
+                    removed += 1
+        if self.summary_cache is not None:
+            for document_id in await self.summary_cache.document_ids():
+                if await self._is_orphan(document_id):
+                    await self.summary_cache.delete(document_id)
+                    removed += 1
+        return removed
+
+    async def _is_orphan(self, document_id: str) -> bool:
+        return not await self.document_service.document_exists(
+            document_id
+        ) and not await self.indexing_service.collection_registry.is_indexed(
+            document_id
+        )
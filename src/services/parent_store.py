@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+from src.core.cache import LRUCache
+from src.core.executors import indexing_executor, retrieval_executor
+
+# Таблица смещений файла родителей: начало тела файла и границы фрагментов
+# в байтах относительно него.
+OffsetTable = Tuple[int, List[int]]
+
+
+class ParentStore:
+    """
+    Хранилище родительских фрагментов документов.
+
+    Родительские фрагменты каждого документа сохраняются один раз в отдельном
+    файле рядом с текстом документа. Дочерние фрагменты в Chroma хранят
+    только `parent_id`, по которому родитель восстанавливается при ответе.
+
+    Первая строка файла — JSON-массив смещений фрагментов в байтах, за ней
+    идут тексты фрагментов подряд. Поэтому при ответе читаются только нужные
+    родители, а не весь файл. Таблицы смещений держатся в LRU-кэше.
+    """
+
+    def __init__(self, storage_path: Path, cache_size: int = 256):
+        self._storage_path = storage_path
+        self._cache: LRUCache[str, OffsetTable] = LRUCache(cache_size)
+
+    async def save(self, document_id: str, parents: List[str]) -> None:
+        """
+        Сохраняет родительские фрагменты документа. Индекс в списке является
+        идентификатором родителя.
+        """
+        table = await indexing_executor.run(self._write, document_id, parents)
+        self._cache.set(document_id, table)
+
+    async def get_many(
+        self, document_id: str, parent_ids: Iterable[int]
+    ) -> Dict[int, str]:
+        """
+        Возвращает тексты родителей по их идентификаторам, читая из файла
+        только запрошенные фрагменты.
+        """
+        table, parents = await retrieval_executor.run(
+            self._read_many,
+            document_id,
+            sorted(set(parent_ids)),
+            self._cache.get(document_id),
+        )
+        if table is not None:
+            self._cache.set(document_id, table)
+        return parents
+
+    async def keys(self) -> List[str]:
+        """Возвращает ключи всех сохраненных наборов родительских фрагментов."""
+        return await indexing_executor.run(self._keys)
+
+    async def delete(self, document_id: str) -> None:
+        self._cache.pop(document_id)
+        await indexing_executor.run(self._delete, document_id)
+
+    def _path(self, document_id: str) -> Path:
+        return self._storage_path / f"{document_id}.parents"
+
+    def _legacy_path(self, document_id: str) -> Path:
+        return self._storage_path / f"{document_id}.parents.json"
+
+    def _keys(self) -> List[str]:
+        keys = set()
+        for suffix in (".parents", ".parents.json"):
+            keys.update(
+                path.name[: -len(suffix)]
+                for path in self._storage_path.glob(f"*{suffix}")
+            )
+        return sorted(keys)
+
+    def _delete(self, document_id: str) -> None:
+        self._path(document_id).unlink(missing_ok=True)
+        self._legacy_path(document_id).unlink(missing_ok=True)
+
+    def _write(self, document_id: str, parents: List[str]) -> OffsetTable:
+        encoded = [parent.encode("utf-8") for parent in parents]
+        offsets = [0]
+        for parent in encoded:
+            offsets.append(offsets[-1] + len(parent))
+        header = json.dumps(offsets).encode("utf-8") + b"\n"
+
+        self._storage_path.mkdir(parents=True, exist_ok=True)
+        file_path = self._path(document_id)
+        tmp_path = file_path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            f.writelines(encoded)
+        os.replace(tmp_path, file_path)
+        return len(header), offsets
+
+    def _read_many(
+        self,
+        document_id: str,
+        parent_ids: List[int],
+        table: Optional[OffsetTable],
+    ) -> Tuple[Optional[OffsetTable], Dict[int, str]]:
+        """
+        Читает запрошенных родителей. Возвращает таблицу смещений файла (или
+        None, если файла нет) и найденные тексты.
+        """
+        try:
+            with open(self._path(document_id), "rb") as f:
+                if table is None:
+                    header = f.readline()
+                    table = len(header), json.loads(header)
+                body_start, offsets = table
+                parents: Dict[int, str] = {}
+                for parent_id in parent_ids:
+                    if 0 <= parent_id < len(offsets) - 1:
+                        f.seek(body_start + offsets[parent_id])
+                        size = offsets[parent_id + 1] - offsets[parent_id]
+                        parents[parent_id] = f.read(size).decode("utf-8")
+                return table, parents
+        except FileNotFoundError:
+            return None, self._read_legacy(document_id, parent_ids)
+        except (IOError, ValueError) as e:
+            logger.error(f"Ошибка чтения родительских фрагментов {document_id}: {e}")
+            return None, {}
+
+    def _read_legacy(self, document_id: str, parent_ids: List[int]) -> Dict[int, str]:
+        """
+        Читает родителей из JSON-файла старого формата, который заменяется
+        при переиндексации.
+        """
+        try:
+            parents = json.loads(
+                self._legacy_path(document_id).read_text(encoding="utf-8")
+            )
+        except FileNotFoundError:
+            return {}
+        except (IOError, ValueError) as e:
+            logger.error(f"Ошибка чтения родительских фрагментов {document_id}: {e}")
+            return {}
+        return {
+            parent_id: parents[parent_id]
+            for parent_id in parent_ids
+            if 0 <= parent_id < len(parents)
+        }
@@ -0,0 +1,26 @@
+"""
+Функции извлечения текста из PDF, выполняемые в процессах-воркерах.
+
+Модуль намеренно не импортирует ничего, кроме PyMuPDF, чтобы запуск
+процесса-воркера оставался дешевым.
+"""
+
+from __future__ import annotations
+
+from typing import List
+
+import fitz
+
+
+def count_pages(path: str) -> int:
+    with fitz.open(path) as doc:
+        return doc.page_count
+
+
+def extract_page_range(path: str, start: int, end: int) -> List[str]:
+    """
+    Возвращает тексты страниц с `start` по `end` (не включая) по одной
+    строке на страницу.
+    """
+    with fitz.open(path) as doc:
+        return [doc[page_number].get_text() for page_number in range(start, end)]
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional, Set
+
+from loguru import logger
+
+from src.models.documents import ReindexProgress, ReindexStatus
+from src.services.collection_registry import IndexGeneration
+from src.services.indexing_service import IndexingService
+
+
+class ReindexScheduler:
+    """
+    Фоновая переиндексация документов, индекс которых построен с другими
+    настройками деления на фрагменты или другой моделью эмбеддингов.
+
+    Устаревшие индексы перестраиваются не больше чем по `concurrency`
+    одновременно. Пока идет сборка, запросы обслуживает старое поколение;
+    после переключения оно удаляется через `swap_grace` секунд, чтобы
+    начатые к нему запросы успели завершиться.
+    """
+
+    def __init__(
+        self,
+        indexing_service: IndexingService,
+        concurrency: int = 1,
+        swap_grace: float = 30.0,
+    ):
+        self.indexing_service = indexing_service
+        self.concurrency = concurrency
+        self.swap_grace = swap_grace
+        self._progress = ReindexProgress(index_version=indexing_service.index_version)
+        self._task: Optional[asyncio.Task] = None
+        self._removals: Set[asyncio.Task] = set()
+
+    def start(self) -> None:
+        """
+        Запускает переиндексацию в фоне, если она еще не выполняется.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def run(self) -> ReindexProgress:
+        """
+        Удаляет поколения, оставшиеся от прерванных переключений, и
+        перестраивает все устаревшие индексы.
+        """
+        registry = self.indexing_service.collection_registry
+        stale = await registry.stale_documents()
+        leftovers, registry.leftovers = registry.leftovers, []
+        for generation in leftovers:
+            await self._remove(generation)
+
+        self._progress = ReindexProgress(
+            status=ReindexStatus.RUNNING,
+            index_version=self.indexing_service.index_version,
+            total=len(stale),
+            started_at=datetime.now(timezone.utc),
+        )
+        if stale:
+            logger.info(f"Переиндексация: устаревших индексов {len(stale)}")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def rebuild(document_id: str) -> None:
+            async with semaphore:
+                self._progress.in_progress.append(document_id)
+                try:
+                    previous = await self.indexing_service.rebuild(document_id)
+                except Exception as e:
+                    logger.error(f"Ошибка переиндексации документа {document_id}: {e}")
+                    self._progress.failed += 1
+                    self._progress.errors[document_id] = str(e)
+                else:
+                    self._progress.completed += 1
+                    if previous is not None:
+                        self._schedule_removal(previous)
+                finally:
+                    self._progress.in_progress.remove(document_id)
+
+        await asyncio.gather(*(rebuild(document_id) for document_id in stale))
+
+        self._progress.status = ReindexStatus.DONE
+        self._progress.finished_at = datetime.now(timezone.utc)
+        if stale:
+            logger.info(
+                f"Переиндексация завершена: успешно {self._progress.completed}, "
+                f"с ошибкой {self._progress.failed}"
+            )
+        return self.progress()
+
+    def progress(self) -> ReindexProgress:
+        return self._progress.model_copy(deep=True)
+
+    async def aclose(self) -> None:
+        """
+        Останавливает переиндексацию и отложенное удаление старых поколений.
+        Неудаленные поколения попадут в `leftovers` реестра при следующем
+        запуске.
+        """
+        tasks = [task for task in (self._task, *self._removals) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    def _schedule_removal(self, generation: IndexGeneration) -> None:
+        task = asyncio.create_task(self._remove_later(generation))
+        self._removals.add(task)
+        task.add_done_callback(self._removals.discard)
+
+    async def _remove_later(self, generation: IndexGeneration) -> None:
+        await asyncio.sleep(self.swap_grace)
+        await self._remove(generation)
+
+    async def _remove(self, generation: IndexGeneration) -> None:
+        try:
+            await self.indexing_service.remove_generation(generation)
+        except Exception as e:
+            logger.error(
+                f"Не удалось удалить поколение индекса {generation.collection_name}: {e}"
+            )
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+from loguru import logger
+
+try:
+    from sentence_transformers import CrossEncoder
+except ImportError:  # pragma: no cover - зависимость необязательна
+    CrossEncoder = None
+
+
+def document_key(document: Document) -> Hashable:
+    return (
+        document.metadata.get("document_id"),
+        document.metadata.get("start"),
+        document.page_content,
+    )
+
+
+def reciprocal_rank_fusion(
+    result_lists: Sequence[Sequence[Document]], k: int = 60
+) -> List[Document]:
+    """
+    Объединяет ранжированные списки фрагментов методом reciprocal rank fusion.
+    Фрагмент получает сумму `1 / (k + rank)` по всем спискам, в которых он
+    встречается. При равенстве оценок сохраняется порядок первого появления.
+    """
+    scores: Dict[Hashable, float] = {}
+    documents: Dict[Hashable, Document] = {}
+    for results in result_lists:
+        for rank, document in enumerate(results, start=1):
+            key = document_key(document)
+            documents.setdefault(key, document)
+            scores[key] = scores.get(key, 0.0) + 1 / (k + rank)
+    ranked = sorted(scores, key=lambda key: -scores[key])
+    return [documents[key] for key in ranked]
+
+
+class CrossEncoderReranker:
+    """
+    Локальное переранжирование фрагментов моделью cross-encoder на CPU.
+    """
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.model = CrossEncoder(model_name, device="cpu")
+
+    def rerank(self, query: str, documents: Sequence[Document]) -> List[Document]:
+        if not documents:
+            return []
+        scores = self.model.predict(
+            [(query, document.page_content) for document in documents]
+        )
+        ranked: List[Tuple[float, int]] = sorted(
+            ((float(score), index) for index, score in enumerate(scores)),
+            key=lambda item: (-item[0], item[1]),
+        )
+        return [documents[index] for _, index in ranked]
+
+
+def build_reranker(model_name: Optional[str]) -> Optional[CrossEncoderReranker]:
+    """
+    Создает reranker, если модель задана и установлен `sentence-transformers`.
+    """
+    if not model_name:
+        return None
+    if CrossEncoder is None:
+        logger.warning(
+            "Переранжирование отключено: пакет sentence-transformers не установлен."
+        )
+        return None
+    logger.info(f"Загрузка модели переранжирования {model_name}")
+    return CrossEncoderReranker(model_name)
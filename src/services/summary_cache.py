@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from loguru import logger
+
+
+class SummaryCache:
+    """
+    Персистентный кэш кратких содержаний документов.
+
+    Каждое summary хранится в отдельном JSON-файле, имя которого содержит ID
+    документа и отпечаток параметров генерации (шаблоны промптов и модель).
+    При смене промпта или модели отпечаток меняется, и старые записи
+    перестают использоваться.
+    """
+
+    def __init__(self, storage_path: Path):
+        self._storage_path = storage_path
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, document_id: str, fingerprint: str) -> Optional[str]:
+        summary = await asyncio.to_thread(self._read, document_id, fingerprint)
+        if summary is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return summary
+
+    async def set(self, document_id: str, fingerprint: str, summary: str) -> None:
+        await asyncio.to_thread(self._write, document_id, fingerprint, summary)
+
+    async def delete(self, document_id: str) -> None:
+        """
+        Удаляет все сохраненные summary документа.
+        """
+        await asyncio.to_thread(self._delete, document_id)
+
+    async def document_ids(self) -> Set[str]:
+        """Возвращает ID документов, для которых сохранено хотя бы одно summary."""
+        return await asyncio.to_thread(self._document_ids)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _path(self, document_id: str, fingerprint: str) -> Path:
+        return self._storage_path / f"{document_id}.{fingerprint}.json"
+
+    def _read(self, document_id: str, fingerprint: str) -> Optional[str]:
+        try:
+            data = json.loads(
+                self._path(document_id, fingerprint).read_text(encoding="utf-8")
+            )
+            return data["summary"]
+        except FileNotFoundError:
+            return None
+        except (IOError, ValueError, KeyError) as e:
+            logger.error(f"Ошибка чтения кэша summary для {document_id}: {e}")
+            return None
+
+    def _write(self, document_id: str, fingerprint: str, summary: str) -> None:
+        self._storage_path.mkdir(parents=True, exist_ok=True)
+        file_path = self._path(document_id, fingerprint)
+        tmp_path = file_path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps({"summary": summary}, ensure_ascii=False), encoding="utf-8"
+        )
+        os.replace(tmp_path, file_path)
+
+    def _document_ids(self) -> Set[str]:
+        return {
+            file_path.name.split(".", 1)[0]
+            for file_path in self._storage_path.glob("*.json")
+        }
+
+    def _delete(self, document_id: str) -> None:
+        for file_path in self._storage_path.glob(f"{document_id}.*.json"):
+            file_path.unlink(missing_ok=True)
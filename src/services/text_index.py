@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from typing import List
+
+from src.core.tokens import count_tokens
+from src.models.documents import DocumentMetadata
+
+
+class TextIndexBuilder:
+    """
+    Строит индекс смещений текста документа по мере его записи.
+
+    Текст подается частями через `add`, начало каждой страницы отмечается
+    вызовом `start_page`. Количество токенов — сумма по частям, то есть оценка.
+    """
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.char_count = 0
+        self.byte_count = 0
+        self.token_count = 0
+        self.page_starts: List[int] = []
+        self.has_text = False
+
+    def start_page(self) -> None:
+        self.page_starts.append(self.char_count)
+
+    def add(self, text: str) -> bytes:
+        """
+        Учитывает часть текста в индексе и возвращает ее в кодировке UTF-8.
+        """
+        encoded = text.encode("utf-8")
+        self.char_count += len(text)
+        self.byte_count += len(encoded)
+        self.token_count += count_tokens(text, self.model_name)
+        if not self.has_text and text and not text.isspace():
+            self.has_text = True
+        return encoded
+
+    def build(
+        self, document_id: str, content_hash: str, content_type: str
+    ) -> DocumentMetadata:
+        page_starts = self.page_starts or [0]
+        return DocumentMetadata(
+            document_id=document_id,
+            content_hash=content_hash,
+            content_type=content_type,
+            page_count=len(page_starts),
+            char_count=self.char_count,
+            byte_count=self.byte_count,
+            token_count=self.token_count,
+            page_starts=page_starts,
+        )
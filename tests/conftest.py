@@ -1,6 +1,11 @@
+import io
+from typing import Callable
+
 import pytest
 from unittest.mock import MagicMock, AsyncMock
+from fastapi import UploadFile
 from httpx import AsyncClient, ASGITransport
+from starlette.datastructures import Headers
 from src.core.config import Settings
 from src.services.document_service import DocumentService
 from langchain_openai import ChatOpenAI
@@ -22,9 +27,29 @@ def mock_document_service() -> MagicMock:
     """
     mock = MagicMock(spec=DocumentService)
     mock.get_document_content = AsyncMock(return_value="Какой-то текст документа.")
+    mock.document_exists = AsyncMock(return_value=True)
+    mock.get_document_metadata = AsyncMock(return_value=None)
     return mock
 
 
+@pytest.fixture
+def make_upload() -> Callable[..., UploadFile]:
+    """
+    Фабрика загружаемых файлов для тестов сервисов документов.
+    """
+
+    def make(
+        content: bytes, filename: str = "notes.txt", content_type: str = "text/plain"
+    ) -> UploadFile:
+        return UploadFile(
+            file=io.BytesIO(content),
+            filename=filename,
+            headers=Headers({"content-type": content_type}),
+        )
+
+    return make
+
+
 @pytest.fixture
 def mock_llm() -> MagicMock:
     """
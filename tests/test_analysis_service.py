@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 from unittest.mock import MagicMock, AsyncMock
 from fastapi import HTTPException
@@ -9,10 +11,13 @@ from src.core.config import Settings
 @pytest.fixture
 def analysis_service(
         mock_document_service: MagicMock,
-        mock_llm: MagicMock
+        mock_llm: MagicMock,
+        tmp_path,
 ) -> DocumentAnalysisService:
     """Фикстура, создающая экземпляр DocumentAnalysisService с моками."""
-    settings = Settings(OPENAI_API_KEY="test_key")
+    settings = Settings(
+        OPENAI_API_KEY="test_key", SUMMARY_CACHE_PATH=str(tmp_path / "summaries")
+    )
     return DocumentAnalysisService(
         app_settings=settings,
         document_service=mock_document_service,
@@ -57,3 +62,133 @@ async def test_summarize_document_not_found(
 
     assert exc_info.value.status_code == 404
     assert "Документ не найден" in exc_info.value.detail
+
+
+@pytest.fixture
+def hierarchical_analysis_service(
+        mock_document_service: MagicMock,
+        mock_llm: MagicMock,
+        tmp_path,
+) -> DocumentAnalysisService:
+    """Фикстура с маленькими лимитами токенов для проверки иерархической суммаризации."""
+    settings = Settings(
+        OPENAI_API_KEY="test_key",
+        SUMMARY_CACHE_PATH=str(tmp_path / "summaries"),
+        SUMMARY_SINGLE_PASS_MAX_TOKENS=100,
+        SUMMARY_CHUNK_TOKENS=50,
+        SUMMARY_CHUNK_OVERLAP_TOKENS=0,
+        SUMMARY_CONCURRENCY=2,
+    )
+    return DocumentAnalysisService(
+        app_settings=settings,
+        document_service=mock_document_service,
+        llm=mock_llm,
+    )
+
+
+@pytest.mark.asyncio
+async def test_summarize_large_document_map_reduce(
+        hierarchical_analysis_service: DocumentAnalysisService,
+        mock_document_service: MagicMock,
+        mock_llm: MagicMock,
+        mocker,
+):
+    """Тест, что большой документ суммируется по частям с последующим объединением."""
+    mocker.patch(
+        "src.services.analysis_service.count_tokens",
+        side_effect=lambda text, _: len(text.split()),
+    )
+    doc_content = "\n\n".join(f"Раздел {i} " + "слово " * 40 for i in range(6))
+    mock_document_service.get_document_content = AsyncMock(return_value=doc_content)
+    mock_llm.ainvoke = AsyncMock(side_effect=lambda prompt, *_, **__: (
+        "итог" if "Partial summaries" in str(prompt) else "часть " * 30
+    ))
+
+    summary = await hierarchical_analysis_service.summarize_document("doc_large")
+
+    prompts = [str(call.args[0]) for call in mock_llm.ainvoke.call_args_list]
+    map_prompts = [p for p in prompts if "Partial summaries" not in p]
+    reduce_prompts = [p for p in prompts if "Partial summaries" in p]
+    assert summary == "итог"
+    assert len(map_prompts) == 6
+    assert all(doc_content not in p for p in map_prompts)
+    assert len(reduce_prompts) >= 2
+
+
+@pytest.mark.asyncio
+async def test_summarize_small_document_single_call(
+        hierarchical_analysis_service: DocumentAnalysisService,
+        mock_document_service: MagicMock,
+        mock_llm: MagicMock,
+):
+    """Тест, что документ меньше порога суммируется одним запросом."""
+    mock_document_service.get_document_content = AsyncMock(return_value="Короткий текст.")
+    mock_llm.ainvoke = AsyncMock(return_value="Краткое содержание.")
+
+    summary = await hierarchical_analysis_service.summarize_document("doc_small")
+
+    assert summary == "Краткое содержание."
+    mock_llm.ainvoke.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_summary_is_cached(
+        analysis_service: DocumentAnalysisService,
+        mock_document_service: MagicMock,
+        mock_llm: MagicMock,
+):
+    """Тест, что повторный запрос summary не вызывает LLM и не читает документ."""
+    mock_llm.ainvoke = AsyncMock(return_value="Краткое содержание.")
+
+    first = await analysis_service.summarize_document("doc_cached")
+    second = await analysis_service.summarize_document("doc_cached")
+
+    assert first == second == "Краткое содержание."
+    mock_llm.ainvoke.assert_called_once()
+    mock_document_service.get_document_content.assert_called_once_with("doc_cached")
+    assert analysis_service.summary_cache.stats() == {"hits": 1, "misses": 1}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_summary_requests_share_generation(
+        analysis_service: DocumentAnalysisService,
+        mock_llm: MagicMock,
+):
+    """Тест, что одновременные запросы одного summary приводят к одному вызову LLM."""
+
+    async def slow_summary(*_, **__):
+        await asyncio.sleep(0.05)
+        return "Краткое содержание."
+
+    mock_llm.ainvoke = AsyncMock(side_effect=slow_summary)
+
+    summaries = await asyncio.gather(
+        *(analysis_service.summarize_document("doc_burst") for _ in range(5))
+    )
+
+    assert summaries == ["Краткое содержание."] * 5
+    mock_llm.ainvoke.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_summary_cache_invalidated_by_model_change(
+        mock_document_service: MagicMock,
+        mock_llm: MagicMock,
+        tmp_path,
+):
+    """Тест, что смена модели приводит к повторной генерации summary."""
+    mock_llm.ainvoke = AsyncMock(return_value="Краткое содержание.")
+    for model in ("gpt-4o", "gpt-4o", "gpt-4o-mini"):
+        settings = Settings(
+            OPENAI_API_KEY="test_key",
+            LLM_MODEL=model,
+            SUMMARY_CACHE_PATH=str(tmp_path / "summaries"),
+        )
+        service = DocumentAnalysisService(
+            app_settings=settings,
+            document_service=mock_document_service,
+            llm=mock_llm,
+        )
+        await service.summarize_document("doc_model")
+
+    assert mock_llm.ainvoke.call_count == 2
@@ -0,0 +1,37 @@
+from src.models.chat import ChatResponse
+from src.services.answer_cache import SemanticAnswerCache
+
+
+def make_response(answer: str) -> ChatResponse:
+    return ChatResponse(answer=answer, sources=[], document_id="doc_1")
+
+
+def test_similar_question_hits_cache():
+    """Тест, что вопрос с близким эмбеддингом получает сохраненный ответ."""
+    cache = SemanticAnswerCache(similarity_threshold=0.9)
+    cache.add("doc_1", "какой срок?", [1.0, 0.0, 0.0], make_response("до 1 мая"))
+
+    assert cache.get("doc_1", [0.99, 0.1, 0.0]).answer == "до 1 мая"
+    assert cache.get("doc_1", [0.0, 1.0, 0.0]) is None
+    assert cache.get("doc_2", [1.0, 0.0, 0.0]) is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "documents": 1}
+
+
+def test_entries_evicted_by_size_and_ttl():
+    """Тест вытеснения старых ответов по размеру и времени жизни."""
+    now = [0.0]
+    cache = SemanticAnswerCache(
+        similarity_threshold=0.9,
+        max_entries_per_document=2,
+        ttl=10,
+        timer=lambda: now[0],
+    )
+    cache.add("doc_1", "a", [1.0, 0.0, 0.0], make_response("a"))
+    cache.add("doc_1", "b", [0.0, 1.0, 0.0], make_response("b"))
+    cache.add("doc_1", "c", [0.0, 0.0, 1.0], make_response("c"))
+
+    assert cache.get("doc_1", [1.0, 0.0, 0.0]) is None
+    assert cache.get("doc_1", [0.0, 1.0, 0.0]).answer == "b"
+
+    now[0] = 10
+    assert cache.get("doc_1", [0.0, 0.0, 1.0]) is None
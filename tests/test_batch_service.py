@@ -0,0 +1,141 @@
+import asyncio
+import io
+import zipfile
+
+import pytest
+from fastapi import HTTPException
+
+from src.models.documents import BatchStatus, UploadResponse
+from src.services.batch_service import BatchUploadService
+from src.services.document_service import DocumentService
+
+
+def make_zip(files: dict) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def document_service(tmp_path) -> DocumentService:
+    return DocumentService(storage_path=tmp_path / "documents")
+
+
+@pytest.fixture
+def batch_service(document_service: DocumentService) -> BatchUploadService:
+    return BatchUploadService(document_service=document_service, concurrency=2)
+
+
+async def wait_for_batches(service: BatchUploadService) -> None:
+    await asyncio.gather(*service._tasks)
+
+
+@pytest.mark.asyncio
+async def test_batch_of_files_and_archive(
+    batch_service: BatchUploadService, document_service: DocumentService, make_upload
+):
+    """Тест, что файлы и содержимое zip-архива обрабатываются как отдельные документы."""
+    archive = make_zip(
+        {
+            "contracts/a.txt": "Договор A",
+            "contracts/b.TXT": "Договор B",
+            "contracts/image.png": b"\x89PNG",
+            "__MACOSX/contracts/._a.txt": b"",
+        }
+    )
+    files = [
+        make_upload("Отчет".encode(), "report.txt", "text/plain"),
+        make_upload(archive, "contracts.zip", "application/zip"),
+    ]
+
+    accepted = await batch_service.submit(files, ["batch"])
+    await wait_for_batches(batch_service)
+    batch = await batch_service.get_batch(accepted.batch_id)
+
+    assert accepted.total == 4
+    assert batch.status == BatchStatus.DONE
+    assert (batch.completed, batch.failed) == (3, 1)
+    items = {item.filename: item for item in batch.items}
+    assert items["contracts/image.png"].status == BatchStatus.FAILED
+    assert "Неподдерживаемый тип файла" in items["contracts/image.png"].error
+    content = await document_service.get_document_content(
+        items["contracts/a.txt"].document_id
+    )
+    assert content == "Договор A"
+    assert len(await document_service.find_by_tag("batch")) == 3
+    assert list((document_service._storage_path / "incoming").iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_batch_processing_is_bounded(
+    batch_service: BatchUploadService,
+    document_service: DocumentService,
+    mocker,
+    make_upload,
+):
+    """Тест, что одновременно обрабатывается не больше заданного числа файлов."""
+    active = 0
+    peak = 0
+
+    async def store_upload(upload, tags, ttl_seconds=None):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return UploadResponse(
+            document_id=f"doc_{upload.filename}",
+            filename=upload.filename,
+            content_type=upload.content_type,
+        )
+
+    mocker.patch.object(document_service, "store_upload", side_effect=store_upload)
+    files = [
+        make_upload(f"текст {index}".encode(), f"{index}.txt", "text/plain")
+        for index in range(6)
+    ]
+
+    accepted = await batch_service.submit(files)
+    await wait_for_batches(batch_service)
+
+    assert peak == 2
+    batch = await batch_service.get_batch(accepted.batch_id)
+    assert batch.completed == 6
+
+
+@pytest.mark.asyncio
+async def test_broken_archive_rejected(
+    batch_service: BatchUploadService, document_service: DocumentService, make_upload
+):
+    """Тест, что поврежденный архив отклоняет пакет и не оставляет временных файлов."""
+    files = [
+        make_upload(b"text", "ok.txt", "text/plain"),
+        make_upload(b"not a zip", "broken.zip", "application/zip"),
+    ]
+
+    with pytest.raises(HTTPException) as exc_info:
+        await batch_service.submit(files)
+
+    assert exc_info.value.status_code == 400
+    assert list((document_service._storage_path / "incoming").iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_archive_size_limit(document_service: DocumentService, make_upload):
+    """Тест, что объем распакованного архива ограничен."""
+    service = BatchUploadService(document_service, max_archive_bytes=10)
+    archive = make_zip({"big.txt": "x" * 100})
+
+    with pytest.raises(HTTPException) as exc_info:
+        await service.submit([make_upload(archive, "big.zip", "application/zip")])
+
+    assert exc_info.value.status_code == 400
+    assert list((document_service._storage_path / "incoming").iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_unknown_batch(batch_service: BatchUploadService):
+    """Тест, что неизвестный пакет не найден."""
+    assert await batch_service.get_batch("batch_missing") is None
@@ -0,0 +1,29 @@
+from src.core.cache import LRUCache, TTLCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    """Тест вытеснения самого давно использованного элемента."""
+    cache: LRUCache[str, int] = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert len(cache) == 2
+
+
+def test_ttl_cache_expires_entries():
+    """Тест, что записи TTL-кэша устаревают по истечении времени жизни."""
+    now = [0.0]
+    cache: TTLCache[str, bool] = TTLCache(maxsize=2, ttl=10, timer=lambda: now[0])
+    cache.set("a", False)
+
+    now[0] = 5
+    assert cache.get("a") is False
+    assert "a" in cache
+
+    now[0] = 10
+    assert cache.get("a") is None
+    assert len(cache) == 0
@@ -0,0 +1,130 @@
+import pytest
+from httpx import AsyncClient
+from unittest.mock import AsyncMock, MagicMock
+from fastapi import HTTPException, status
+
+from src.main import app
+from src.api.v1.chat import get_chat_service
+
+
+@pytest.fixture
+def mock_chat_service() -> MagicMock:
+    return MagicMock()
+
+
+@pytest.fixture
+def mocked_chat_service_api(mock_chat_service: MagicMock):
+    app.dependency_overrides[get_chat_service] = lambda: mock_chat_service
+    yield
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.usefixtures("mocked_chat_service_api")
+@pytest.mark.asyncio
+async def test_stream_chat_sends_sse_events(
+    client: AsyncClient,
+    mock_chat_service: MagicMock,
+):
+    """Тест, что потоковый чат отдает события в формате Server-Sent Events."""
+
+    async def events(**_):
+        yield "sources", {"sources": [{"content": "фрагмент"}]}
+        yield "token", {"text": "Отв"}
+        yield "token", {"text": "ет"}
+        yield "done", {"answer": "Ответ", "sources": [], "documentId": "doc_1"}
+
+    mock_chat_service.stream_query = events
+    payload = {"documentId": "doc_1", "question": "Вопрос?"}
+
+    response = await client.post("/api/v1/chat/stream", json=payload)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.startswith(
+        'event: sources\ndata: {"sources": [{"content": "фрагмент"}]}\n\n'
+    )
+    assert 'event: token\ndata: {"text": "Отв"}\n\n' in response.text
+    assert response.text.endswith(
+        'event: done\ndata: {"answer": "Ответ", "sources": [], "documentId": "doc_1"}\n\n'
+    )
+
+
+@pytest.mark.usefixtures("mocked_chat_service_api")
+@pytest.mark.asyncio
+async def test_stream_chat_rejects_harmful_question(
+    client: AsyncClient,
+    mock_chat_service: MagicMock,
+):
+    """Тест, что ошибка проверки вопроса возвращается обычным HTTP-ответом."""
+
+    async def events(**_):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Недопустимый запрос."
+        )
+        yield
+
+    mock_chat_service.stream_query = events
+    payload = {"documentId": "doc_1", "question": "a harmful question"}
+
+    response = await client.post("/api/v1/chat/stream", json=payload)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Недопустимый запрос."
+
+
+@pytest.mark.usefixtures("mocked_chat_service_api")
+@pytest.mark.asyncio
+async def test_chat_returns_answer(
+    client: AsyncClient,
+    mock_chat_service: MagicMock,
+):
+    """Тест обычного (непотокового) чата."""
+    mock_chat_service.query_document = AsyncMock(
+        return_value={"answer": "Ответ", "sources": [], "documentId": "doc_1"}
+    )
+    payload = {"documentId": "doc_1", "question": "Вопрос?"}
+
+    response = await client.post("/api/v1/chat", json=payload)
+
+    assert response.status_code == 200
+    assert response.json()["answer"] == "Ответ"
+
+
+@pytest.mark.usefixtures("mocked_chat_service_api")
+@pytest.mark.asyncio
+async def test_corpus_chat_returns_answer(
+    client: AsyncClient,
+    mock_chat_service: MagicMock,
+):
+    """Тест вопроса к нескольким документам."""
+    mock_chat_service.query_documents = AsyncMock(
+        return_value={
+            "answer": "Ответ",
+            "sources": [{"content": "фрагмент", "documentId": "doc_2"}],
+            "documentIds": ["doc_1", "doc_2"],
+        }
+    )
+    payload = {"documentIds": ["doc_1", "doc_2"], "question": "Вопрос?"}
+
+    response = await client.post("/api/v1/chat/corpus", json=payload)
+
+    assert response.status_code == 200
+    assert response.json()["sources"][0]["documentId"] == "doc_2"
+    mock_chat_service.query_documents.assert_called_once_with(
+        question="Вопрос?", document_ids=["doc_1", "doc_2"], tag=None
+    )
+
+
+@pytest.mark.usefixtures("mocked_chat_service_api")
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "scope",
+    [{}, {"documentIds": ["doc_1"], "tag": "contracts"}, {"documentIds": []}],
+)
+async def test_corpus_chat_requires_single_scope(client: AsyncClient, scope: dict):
+    """Тест, что нужно указать либо список документов, либо тег."""
+    response = await client.post(
+        "/api/v1/chat/corpus", json={"question": "Вопрос?", **scope}
+    )
+
+    assert response.status_code == 422
@@ -1,10 +1,17 @@
+import asyncio
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock
 
 from fastapi import HTTPException
 from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
 
+from src.core.metrics import LLM_TOKENS, STAGE_DURATION
 from src.services.chat_service import ChatService
+from src.services.collection_registry import IndexGeneration
 
 
 @pytest.fixture
@@ -15,6 +22,17 @@ def mock_retriever() -> AsyncMock:
     return mock
 
 
+def make_vector_store(mock_retriever: AsyncMock) -> MagicMock:
+    """
+    Mock обертки Chroma: поиск по тексту вопроса через ретривер и поиск по
+    готовому эмбеддингу вопроса возвращают одни и те же документы.
+    """
+    return MagicMock(
+        as_retriever=MagicMock(return_value=mock_retriever),
+        asimilarity_search_by_vector=mock_retriever.ainvoke,
+    )
+
+
 @pytest.fixture
 def chat_service(
     test_settings,
@@ -28,14 +46,16 @@ def chat_service(
     от внешних зависимостей и файловой системы.
     """
     mocker.patch(
-        "src.services.chat_service.ChatService._get_or_create_vector_store",
-        return_value=MagicMock(as_retriever=MagicMock(return_value=mock_retriever)),
+        "src.services.chat_service.ChatService._open_index",
+        return_value=(IndexGeneration("doc_id"), make_vector_store(mock_retriever)),
     )
 
     service = ChatService(
         settings=test_settings,
         document_service=mock_document_service,
         llm=mock_llm,
+        embeddings=DeterministicFakeEmbedding(size=16),
+        chroma_client=MagicMock(),
     )
     return service
 
@@ -100,3 +120,648 @@ async def test_query_document_success(chat_service: ChatService, mock_llm, mocke
     assert len(response.sources) == 1
     assert response.sources[0].content == "релевантный контекст"
     mock_llm.ainvoke.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_query_document_resolves_parents(
+    chat_service: ChatService, mock_retriever, mocker
+):
+    """Тест, что источники и контекст строятся из родителей, загруженных одним запросом."""
+    mocker.patch.object(
+        chat_service, "_is_content_harmful", new_callable=AsyncMock, return_value=False
+    )
+    mock_retriever.ainvoke.return_value = [
+        Document(page_content="дочерний 1", metadata={"parent_id": 0}),
+        Document(page_content="дочерний 2", metadata={"parent_id": 0}),
+        Document(page_content="дочерний 3", metadata={"parent_id": 1}),
+    ]
+    mock_get_many = mocker.patch.object(
+        chat_service.parent_store,
+        "get_many",
+        new_callable=AsyncMock,
+        return_value={0: "родитель 0", 1: "родитель 1"},
+    )
+
+    response = await chat_service.query_document("doc_id", "вопрос")
+
+    mock_get_many.assert_called_once_with("doc_id", {0, 1})
+    assert [source.content for source in response.sources] == [
+        "родитель 0",
+        "родитель 0",
+        "родитель 1",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_query_sends_sources_then_tokens(
+    chat_service: ChatService, mocker
+):
+    """Тест, что потоковый ответ начинается с источников и продолжается токенами."""
+    mocker.patch.object(
+        chat_service, "_is_content_harmful", new_callable=AsyncMock, return_value=False
+    )
+    chat_service.llm = GenericFakeChatModel(
+        messages=iter([AIMessage(content="потоковый ответ от LLM")])
+    )
+
+    events = [event async for event in chat_service.stream_query("doc_id", "вопрос")]
+
+    names = [name for name, _ in events]
+    assert names[0] == "sources"
+    assert events[0][1] == {
+        "sources": [{"content": "релевантный контекст", "page": None}]
+    }
+    assert names[-1] == "done"
+    assert "flagged" not in names
+    assert names.count("token") > 1
+    assert "".join(data["text"] for name, data in events if name == "token") == (
+        "потоковый ответ от LLM"
+    )
+    assert events[-1][1]["answer"] == "потоковый ответ от LLM"
+    assert events[-1][1]["documentId"] == "doc_id"
+
+
+@pytest.mark.asyncio
+async def test_stream_query_filters_harmful_answer(chat_service: ChatService, mocker):
+    """
+    Тест, что отклоненный модерацией ответ отзывается событием `flagged`, а
+    итоговое событие содержит отфильтрованный ответ.
+    """
+    mocker.patch.object(
+        chat_service, "_is_content_harmful", new_callable=AsyncMock
+    ).side_effect = [False, True]
+    chat_service.llm = GenericFakeChatModel(
+        messages=iter([AIMessage(content="a harmful answer")])
+    )
+
+    events = [event async for event in chat_service.stream_query("doc_id", "вопрос")]
+
+    names = [name for name, _ in events]
+    assert names.index("flagged") == len(names) - 2
+    assert events[-2][1]["answer"] == events[-1][1]["answer"]
+    assert "отфильтрован как потенциально небезопасный" in events[-1][1]["answer"]
+
+
+@pytest.mark.asyncio
+async def test_question_moderation_runs_concurrently_with_retrieval(
+    chat_service: ChatService, mock_retriever, mocker
+):
+    """Тест, что поиск по документу начинается до завершения модерации вопроса."""
+    retrieval_started = asyncio.Event()
+
+    async def retrieve(*_, **__):
+        retrieval_started.set()
+        return [Document(page_content="релевантный контекст")]
+
+    async def moderate(text: str) -> bool:
+        if text == "вопрос":
+            await asyncio.wait_for(retrieval_started.wait(), timeout=1)
+        return False
+
+    mock_retriever.ainvoke.side_effect = retrieve
+    mocker.patch.object(chat_service, "_is_content_harmful", side_effect=moderate)
+
+    response = await chat_service.query_document("doc_id", "вопрос")
+
+    assert response.answer == "безопасный ответ от LLM"
+
+
+@pytest.mark.asyncio
+async def test_harmful_question_cancels_retrieval(
+    chat_service: ChatService, mock_retriever, mocker
+):
+    """Тест, что поиск отменяется, если вопрос отклонен модерацией."""
+    retrieval_cancelled = asyncio.Event()
+
+    async def retrieve(*_, **__):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            retrieval_cancelled.set()
+            raise
+
+    async def moderate(_: str) -> bool:
+        await asyncio.sleep(0.01)
+        return True
+
+    mock_retriever.ainvoke.side_effect = retrieve
+    mocker.patch.object(chat_service, "_is_content_harmful", side_effect=moderate)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await chat_service.query_document("doc_id", "a harmful question")
+
+    assert exc_info.value.status_code == 400
+    assert retrieval_cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_moderation_verdicts_are_cached(chat_service: ChatService):
+    """Тест, что повторная проверка того же текста не обращается к Moderation API."""
+    create = AsyncMock(return_value=MagicMock(results=[MagicMock(flagged=False)]))
+    chat_service.moderation_client = MagicMock()
+    chat_service.moderation_client.moderations.create = create
+
+    assert await chat_service._is_content_harmful("вопрос") is False
+    assert await chat_service._is_content_harmful("вопрос") is False
+
+    create.assert_called_once_with(input="вопрос")
+    assert chat_service.moderation_stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+@pytest.mark.asyncio
+async def test_moderation_errors_are_not_cached(chat_service: ChatService):
+    """Тест, что ошибка Moderation API блокирует текст, но не попадает в кэш."""
+    create = AsyncMock(
+        side_effect=[
+            RuntimeError("недоступно"),
+            MagicMock(results=[MagicMock(flagged=False)]),
+        ]
+    )
+    chat_service.moderation_client = MagicMock()
+    chat_service.moderation_client.moderations.create = create
+
+    assert await chat_service._is_content_harmful("вопрос") is True
+    assert await chat_service._is_content_harmful("вопрос") is False
+    assert create.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_question_embedded_once_for_cache_and_search(
+    chat_service: ChatService, mocker
+):
+    """
+    Тест, что эмбеддинг вопроса, вычисленный для кэша ответов, используется
+    в плотном поиске, и вопрос не эмбеддится повторно.
+    """
+    mocker.patch.object(
+        chat_service, "_is_content_harmful", new_callable=AsyncMock, return_value=False
+    )
+    question_vector = [0.5] * 16
+    embed = mocker.patch.object(
+        type(chat_service.embeddings),
+        "aembed_query",
+        new_callable=AsyncMock,
+        return_value=question_vector,
+    )
+    retriever = AsyncMock()
+    vector_store = MagicMock(
+        as_retriever=MagicMock(return_value=retriever),
+        asimilarity_search_by_vector=AsyncMock(
+            return_value=[Document(page_content="релевантный контекст")]
+        ),
+    )
+    mocker.patch.object(
+        chat_service,
+        "_open_index",
+        new_callable=AsyncMock,
+        return_value=(IndexGeneration("doc_id"), vector_store),
+    )
+
+    response = await chat_service.query_document("doc_id", "какой срок?")
+
+    assert response.sources[0].content == "релевантный контекст"
+    embed.assert_awaited_once_with("какой срок?")
+    vector_store.asimilarity_search_by_vector.assert_awaited_once_with(
+        question_vector, k=chat_service.settings.RETRIEVAL_CANDIDATES
+    )
+    retriever.ainvoke.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_repeated_question_served_from_answer_cache(
+    chat_service: ChatService, mock_llm, mock_retriever, mocker
+):
+    """Тест, что повторный вопрос к документу не вызывает поиск и LLM."""
+    mocker.patch.object(
+        chat_service, "_is_content_harmful", new_callable=AsyncMock, return_value=False
+    )
+
+    first = await chat_service.query_document("doc_id", "какой срок?")
+    second = await chat_service.query_document("doc_id", "какой срок?")
+
+    assert second.answer == first.answer
+    assert second.sources == first.sources
+    assert first.prompt_tokens > 0
+    assert second.prompt_tokens == 0
+    mock_llm.ainvoke.assert_called_once()
+    mock_retriever.ainvoke.assert_called_once()
+    assert chat_service.answer_cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_bypass_cache_generates_new_answer(
+    chat_service: ChatService, mock_llm, mocker
+):
+    """Тест, что флаг bypass_cache заставляет заново сгенерировать ответ."""
+    mocker.patch.object(
+        chat_service, "_is_content_harmful", new_callable=AsyncMock, return_value=False
+    )
+
+    await chat_service.query_document("doc_id", "какой срок?")
+    await chat_service.query_document("doc_id", "какой срок?", bypass_cache=True)
+
+    assert mock_llm.ainvoke.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_filtered_answer_is_not_cached(
+    chat_service: ChatService, mock_llm, mocker
+):
+    """Тест, что отфильтрованный модерацией ответ не попадает в кэш."""
+    mocker.patch.object(
+        chat_service, "_is_content_harmful", new_callable=AsyncMock
+    ).side_effect = [False, True, False, False]
+
+    await chat_service.query_document("doc_id", "вопрос")
+    response = await chat_service.query_document("doc_id", "вопрос")
+
+    assert response.answer == "безопасный ответ от LLM"
+    assert mock_llm.ainvoke.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_query_replays_cached_answer(chat_service: ChatService, mocker):
+    """Тест, что потоковый запрос отдает ответ из кэша одним событием token."""
+    mocker.patch.object(
+        chat_service, "_is_content_harmful", new_callable=AsyncMock, return_value=False
+    )
+    await chat_service.query_document("doc_id", "вопрос")
+
+    events = [event async for event in chat_service.stream_query("doc_id", "вопрос")]
+
+    assert [name for name, _ in events] == ["sources", "token", "done"]
+    assert events[1][1] == {"text": "безопасный ответ от LLM"}
+
+
+@pytest.mark.asyncio
+async def test_sources_include_page_numbers(
+    chat_service: ChatService, mock_retriever, mocker
+):
+    """Тест, что источники содержат номера страниц из метаданных фрагментов."""
+    mocker.patch.object(
+        chat_service, "_is_content_harmful", new_callable=AsyncMock, return_value=False
+    )
+    mock_retriever.ainvoke.return_value = [
+        Document(page_content="фрагмент", metadata={"page": 3}),
+    ]
+
+    response = await chat_service.query_document("doc_id", "вопрос")
+
+    assert response.sources[0].page == 3
+
+
+@pytest.fixture
+def mock_indexing_service() -> MagicMock:
+    """Мок IndexingService с готовым индексом документа."""
+    mock = MagicMock()
+    mock.is_ready = AsyncMock(return_value=True)
+    mock.wait_until_indexed = AsyncMock()
+    mock.collection_registry.get_generation = AsyncMock(
+        return_value=IndexGeneration("doc_id", "v1")
+    )
+    mock.collection_registry.get_store = AsyncMock(return_value=MagicMock())
+    return mock
+
+
+@pytest.fixture
+def indexed_chat_service(
+    test_settings, mock_document_service, mock_llm, mock_indexing_service
+) -> ChatService:
+    """ChatService с настоящей проверкой готовности индекса."""
+    return ChatService(
+        settings=test_settings,
+        document_service=mock_document_service,
+        llm=mock_llm,
+        embeddings=DeterministicFakeEmbedding(size=16),
+        chroma_client=MagicMock(),
+        indexing_service=mock_indexing_service,
+    )
+
+
+@pytest.mark.asyncio
+async def test_indexed_document_needs_no_text_io(
+    indexed_chat_service: ChatService,
+    mock_document_service,
+    mock_indexing_service,
+):
+    """Тест, что для проиндексированного документа текст и файлы не читаются."""
+    await indexed_chat_service._open_index("doc_id")
+
+    mock_document_service.get_document_content.assert_not_called()
+    mock_document_service.document_exists.assert_not_called()
+    mock_indexing_service.wait_until_indexed.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_unindexed_document_checked_before_indexing(
+    indexed_chat_service: ChatService,
+    mock_document_service,
+    mock_indexing_service,
+):
+    """Тест, что перед индексацией проверяется только наличие документа."""
+    mock_indexing_service.is_ready.return_value = False
+
+    await indexed_chat_service._open_index("doc_id")
+
+    mock_document_service.document_exists.assert_called_once_with("doc_id")
+    mock_document_service.get_document_content.assert_not_called()
+    mock_indexing_service.wait_until_indexed.assert_called_once_with("doc_id")
+
+
+@pytest.mark.asyncio
+async def test_missing_document_returns_404(
+    indexed_chat_service: ChatService,
+    mock_document_service,
+    mock_indexing_service,
+):
+    """Тест, что запрос к несуществующему документу возвращает 404."""
+    mock_indexing_service.is_ready.return_value = False
+    mock_document_service.document_exists.return_value = False
+
+    with pytest.raises(HTTPException) as exc_info:
+        await indexed_chat_service._open_index("doc_id")
+
+    assert exc_info.value.status_code == 404
+    mock_indexing_service.wait_until_indexed.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_query_reads_single_index_generation(
+    chat_service: ChatService, mock_retriever, mocker
+):
+    """
+    Тест, что BM25 и родительские фрагменты читаются из того же поколения
+    индекса, что и плотный поиск.
+    """
+    generation = IndexGeneration("doc_id", "v2")
+    mocker.patch.object(
+        chat_service,
+        "_open_index",
+        new_callable=AsyncMock,
+        return_value=(
+            generation,
+            make_vector_store(mock_retriever),
+        ),
+    )
+    mock_retriever.ainvoke.return_value = [
+        Document(page_content="фрагмент", metadata={"parent_id": 0}),
+    ]
+    search = mocker.patch.object(
+        chat_service.lexical_store, "search", new_callable=AsyncMock, return_value=[]
+    )
+    get_many = mocker.patch.object(
+        chat_service.parent_store,
+        "get_many",
+        new_callable=AsyncMock,
+        return_value={0: "родитель"},
+    )
+
+    await chat_service._retrieve("doc_id", "вопрос")
+
+    assert search.call_args.args[0] == "doc_id.v2"
+    assert get_many.call_args.args[0] == "doc_id.v2"
+
+
+@pytest.mark.asyncio
+async def test_lexical_hits_are_fused_with_dense_results(
+    chat_service: ChatService, mock_retriever, mocker
+):
+    """Тест, что фрагменты, найденные BM25, попадают в источники вместе с плотным поиском."""
+    mocker.patch.object(
+        chat_service, "_is_content_harmful", new_callable=AsyncMock, return_value=False
+    )
+    mock_retriever.ainvoke.return_value = [
+        Document(page_content="общий фрагмент", metadata={"start": 0}),
+        Document(page_content="плотный фрагмент", metadata={"start": 100}),
+    ]
+    mocker.patch.object(
+        chat_service.lexical_store,
+        "search",
+        new_callable=AsyncMock,
+        return_value=[
+            Document(page_content="Договор № 4471", metadata={"start": 500}),
+            Document(page_content="общий фрагмент", metadata={"start": 0}),
+        ],
+    )
+
+    response = await chat_service.query_document("doc_id", "договор 4471")
+
+    assert [source.content for source in response.sources] == [
+        "общий фрагмент",
+        "Договор № 4471",
+        "плотный фрагмент",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_context_is_deterministic_and_reported(
+    chat_service: ChatService, mock_retriever, mock_llm, mocker
+):
+    """Тест, что контекст собирается в порядке релевантности и размер промпта возвращается."""
+    mocker.patch.object(
+        chat_service, "_is_content_harmful", new_callable=AsyncMock, return_value=False
+    )
+    mock_retriever.ainvoke.return_value = [
+        Document(page_content="второй", metadata={"parent_id": 1, "start": 10}),
+        Document(page_content="первый", metadata={"parent_id": 0, "start": 0}),
+        Document(page_content="второй снова", metadata={"parent_id": 1, "start": 20}),
+    ]
+    mocker.patch.object(
+        chat_service.parent_store,
+        "get_many",
+        new_callable=AsyncMock,
+        return_value={0: "родитель 0", 1: "родитель 1"},
+    )
+
+    response = await chat_service.query_document("doc_id", "вопрос", bypass_cache=True)
+
+    prompt = mock_llm.ainvoke.call_args.args[0].to_string()
+    assert "родитель 1\n\n---\n\nродитель 0" in prompt
+    assert prompt.count("родитель 1") == 1
+    assert response.prompt_tokens > 0
+
+
+@pytest.fixture
+def corpus_stores(chat_service: ChatService, mocker) -> dict:
+    """Векторные хранилища двух документов с результатами плотного поиска."""
+    stores = {
+        "doc_a": [
+            (Document(page_content="фрагмент A", metadata={"parent_id": 0}), 0.9),
+        ],
+        "doc_b": [
+            (Document(page_content="фрагмент B", metadata={"parent_id": 0}), 0.1),
+        ],
+    }
+
+    async def open_index(document_id: str):
+        store = MagicMock()
+        store.similarity_search_by_vector_with_relevance_scores.return_value = stores[
+            document_id
+        ]
+        return IndexGeneration(document_id), store
+
+    mocker.patch.object(chat_service, "_open_index", side_effect=open_index)
+    mocker.patch.object(
+        chat_service, "_is_content_harmful", new_callable=AsyncMock, return_value=False
+    )
+
+    async def get_many(document_id, parent_ids):
+        return {0: f"родитель {document_id}"}
+
+    mocker.patch.object(chat_service.parent_store, "get_many", side_effect=get_many)
+    return stores
+
+
+@pytest.mark.asyncio
+async def test_corpus_query_ranks_documents_together(
+    chat_service: ChatService, corpus_stores, mock_llm
+):
+    """Тест, что фрагменты разных документов ранжируются вместе и LLM вызывается один раз."""
+    response = await chat_service.query_documents(
+        "вопрос", document_ids=["doc_a", "doc_b"]
+    )
+
+    assert [(s.document_id, s.content) for s in response.sources] == [
+        ("doc_b", "родитель doc_b"),
+        ("doc_a", "родитель doc_a"),
+    ]
+    assert response.document_ids == ["doc_a", "doc_b"]
+    prompt = mock_llm.ainvoke.call_args.args[0].to_string()
+    assert "родитель doc_b" in prompt and "родитель doc_a" in prompt
+    mock_llm.ainvoke.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_corpus_query_by_tag(
+    chat_service: ChatService, corpus_stores, mock_document_service
+):
+    """Тест, что документы для вопроса выбираются по тегу."""
+    mock_document_service.find_by_tag = AsyncMock(return_value=["doc_a"])
+
+    response = await chat_service.query_documents("вопрос", tag="contracts")
+
+    mock_document_service.find_by_tag.assert_called_once_with("contracts")
+    assert response.document_ids == ["doc_a"]
+    assert {source.document_id for source in response.sources} == {"doc_a"}
+
+
+@pytest.mark.asyncio
+async def test_corpus_query_unknown_tag_returns_404(
+    chat_service: ChatService, mock_document_service
+):
+    """Тест, что вопрос по тегу без документов возвращает 404."""
+    mock_document_service.find_by_tag = AsyncMock(return_value=[])
+
+    with pytest.raises(HTTPException) as exc_info:
+        await chat_service.query_documents("вопрос", tag="missing")
+
+    assert exc_info.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_corpus_query_limits_document_count(chat_service: ChatService):
+    """Тест, что число документов в одном запросе ограничено."""
+    document_ids = [
+        f"doc_{index}"
+        for index in range(chat_service.settings.CORPUS_MAX_DOCUMENTS + 1)
+    ]
+
+    with pytest.raises(HTTPException) as exc_info:
+        await chat_service.query_documents("вопрос", document_ids=document_ids)
+
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_corpus_search_concurrency_is_bounded(chat_service: ChatService, mocker):
+    """Тест, что одновременно опрашивается не больше заданного числа коллекций."""
+    chat_service.settings = chat_service.settings.model_copy(
+        update={"CORPUS_SEARCH_CONCURRENCY": 2}
+    )
+    mocker.patch.object(
+        chat_service, "_is_content_harmful", new_callable=AsyncMock, return_value=False
+    )
+    active = 0
+    peak = 0
+
+    async def search_candidates(*_):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return [], []
+
+    mocker.patch.object(
+        chat_service, "_search_candidates", side_effect=search_candidates
+    )
+
+    response = await chat_service.query_documents(
+        "вопрос", document_ids=[f"doc_{index}" for index in range(6)]
+    )
+
+    assert peak == 2
+    assert response.sources == []
+
+
+@pytest.mark.asyncio
+async def test_corpus_bm25_fused_by_rank_not_raw_score(
+    chat_service: ChatService, mocker
+):
+    """
+    Тест, что кандидаты BM25 разных документов объединяются по рангу внутри
+    документа, а не по несравнимым сырым оценкам.
+    """
+
+    def lexical(document_id: str, *scores: float):
+        return [
+            (
+                Document(
+                    page_content=f"{document_id} {rank}",
+                    metadata={"document_id": document_id},
+                ),
+                score,
+            )
+            for rank, score in enumerate(scores)
+        ]
+
+    candidates = {
+        "doc_a": ([], lexical("doc_a", 50.0, 40.0)),
+        "doc_b": ([], lexical("doc_b", 1.0)),
+    }
+    mocker.patch.object(
+        chat_service,
+        "_search_candidates",
+        side_effect=lambda document_id, *_: candidates[document_id],
+    )
+    mocker.patch.object(
+        chat_service, "_resolve_corpus_parent_contents", new_callable=AsyncMock
+    )
+
+    result = await chat_service._search_documents(["doc_a", "doc_b"], "вопрос")
+
+    assert [doc.page_content for doc in result.source_documents] == [
+        "doc_a 0",
+        "doc_b 0",
+        "doc_a 1",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_query_records_stage_metrics(chat_service: ChatService, mocker):
+    """Тест, что запрос к документу записывает длительность стадий и токены."""
+    mocker.patch.object(
+        chat_service, "_is_content_harmful", new_callable=AsyncMock, return_value=False
+    )
+    stages = ("retrieval", "prompt_build", "llm_total")
+    before = {stage: STAGE_DURATION.count(stage=stage) for stage in stages}
+    prompt_tokens = LLM_TOKENS.value(operation="chat", kind="prompt")
+
+    response = await chat_service.query_document("doc_id", "вопрос", bypass_cache=True)
+
+    for stage in stages:
+        assert STAGE_DURATION.count(stage=stage) == before[stage] + 1
+    assert (
+        LLM_TOKENS.value(operation="chat", kind="prompt")
+        == prompt_tokens + response.prompt_tokens
+    )
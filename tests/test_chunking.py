@@ -0,0 +1,115 @@
+import random
+
+import pytest
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from src.services.chunking import SpanSplitter, split_parent_child
+
+WORDS = [
+    "договор",
+    "поставка",
+    "оплата",
+    "срок",
+    "ответственность",
+    "Contract",
+    "delivery",
+    "€",
+    "😀",
+    "1.2.3",
+]
+
+
+def random_text(rng: random.Random, size: int) -> str:
+    """
+    Текст со словами разной длины, абзацами, переносами и пробельными сериями.
+    Длинные слова случайные, чтобы в тексте не было повторяющихся участков.
+    """
+    parts = []
+    length = 0
+    while length < size:
+        roll = rng.random()
+        if roll < 0.03:
+            part = "\n\n"
+        elif roll < 0.08:
+            part = "\n"
+        elif roll < 0.1:
+            part = " " * rng.randint(2, 5)
+        elif roll < 0.11:
+            part = "".join(
+                rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(50, 600))
+            )
+        else:
+            part = rng.choice(WORDS) + f"{rng.randrange(10_000)} "
+        parts.append(part)
+        length += len(part)
+    return "".join(parts)
+
+
+def langchain_chunks(text: str, chunk_size: int, chunk_overlap: int):
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, add_start_index=True
+    )
+    return [
+        (doc.metadata["start_index"], doc.page_content)
+        for doc in splitter.create_documents([text])
+    ]
+
+
+@pytest.mark.parametrize(
+    ("chunk_size", "chunk_overlap"), [(2000, 200), (400, 100), (60, 20), (25, 0)]
+)
+def test_span_splitter_matches_langchain(chunk_size, chunk_overlap):
+    """Тест, что границы фрагментов совпадают с RecursiveCharacterTextSplitter."""
+    rng = random.Random(chunk_size)
+    splitter = SpanSplitter(chunk_size, chunk_overlap)
+
+    for _ in range(20):
+        text = random_text(rng, rng.randint(0, 8000))
+        starts, ends = splitter.split(text)
+
+        assert [(s, text[s:e]) for s, e in zip(starts, ends)] == langchain_chunks(
+            text, chunk_size, chunk_overlap
+        )
+
+
+def test_parent_child_spans_match_two_pass_split():
+    """Тест, что дочерние фрагменты совпадают с делением текста каждого родителя."""
+    rng = random.Random(7)
+    text = random_text(rng, 30_000)
+
+    spans = split_parent_child(text, SpanSplitter(2000, 200), SpanSplitter(400, 100))
+
+    expected_children = []
+    parents = langchain_chunks(text, 2000, 200)
+    for parent_id, (parent_start, parent_text) in enumerate(parents):
+        for start, child_text in langchain_chunks(parent_text, 400, 100):
+            expected_children.append((parent_id, parent_start + start, child_text))
+    assert list(zip(spans.parent_starts, spans.parent_texts(text))) == parents
+    assert (
+        list(zip(spans.child_parents, spans.child_starts, spans.child_texts(text)))
+        == expected_children
+    )
+
+
+def test_span_splitter_without_whitespace_fallback():
+    """Тест деления длинного слова без разделителей и ошибки при большом перекрытии."""
+    text = "a" * 250
+    starts, ends = SpanSplitter(100, 10).split(text)
+
+    assert [(s, e) for s, e in zip(starts, ends)] == [(0, 100), (90, 190), (180, 250)]
+    with pytest.raises(ValueError):
+        SpanSplitter(10, 20)
+
+
+def test_span_offsets_exact_in_repeated_text():
+    """
+    Тест, что в повторяющемся тексте фрагменты совпадают с langchain, а
+    смещения указывают на их настоящие позиции, а не на первое вхождение.
+    """
+    text = "ab " * 60
+    starts, ends = SpanSplitter(20, 5).split(text)
+
+    chunks = [text[s:e] for s, e in zip(starts, ends)]
+    assert chunks == [chunk for _, chunk in langchain_chunks(text, 20, 5)]
+    assert list(starts) == [0, 18, 33, 48, 63, 78, 93, 108, 123, 138, 153, 168]
+    assert ends[-1] == len(text.rstrip())
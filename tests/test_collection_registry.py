@@ -0,0 +1,174 @@
+import threading
+
+import pytest
+from unittest.mock import MagicMock
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.services.collection_registry import (
+    CollectionRegistry,
+    IndexGeneration,
+    RetrievalChroma,
+)
+
+
+@pytest.fixture
+def chroma_client() -> MagicMock:
+    """Mock клиента Chroma с одной существующей коллекцией."""
+    mock = MagicMock()
+    existing = MagicMock()
+    existing.name = "doc_doc_indexed"
+    existing.metadata = None
+    mock.list_collections.return_value = [existing]
+    return mock
+
+
+@pytest.fixture
+def registry(chroma_client: MagicMock) -> CollectionRegistry:
+    return CollectionRegistry(
+        chroma_client=chroma_client,
+        embeddings=DeterministicFakeEmbedding(size=8),
+        max_open_handles=2,
+        index_version="v2",
+    )
+
+
+@pytest.mark.asyncio
+async def test_registry_lists_collections_once(
+    registry: CollectionRegistry, chroma_client: MagicMock
+):
+    """Тест, что список коллекций читается один раз, а дальше проверки идут по памяти."""
+    assert await registry.is_indexed("doc_indexed")
+    assert not await registry.is_indexed("doc_new")
+
+    registry.activate(IndexGeneration("doc_new", "v2"))
+
+    assert await registry.is_indexed("doc_new")
+    chroma_client.list_collections.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_registry_reuses_store_handles(
+    registry: CollectionRegistry, chroma_client: MagicMock
+):
+    """Тест, что обертки Chroma переиспользуются и вытесняются по LRU."""
+    first = await registry.get_store(IndexGeneration("doc_a"))
+    assert await registry.get_store(IndexGeneration("doc_a")) is first
+
+    await registry.get_store(IndexGeneration("doc_b"))
+    await registry.get_store(IndexGeneration("doc_c"))
+
+    assert await registry.get_store(IndexGeneration("doc_a")) is not first
+    assert chroma_client.get_or_create_collection.call_count == 4
+
+
+@pytest.mark.asyncio
+async def test_retriever_searches_in_retrieval_lane(
+    registry: CollectionRegistry, mocker
+):
+    """Тест, что асинхронный поиск ретривера выполняется в пуле потоков поиска."""
+    mocker.patch.object(
+        RetrievalChroma,
+        "similarity_search",
+        side_effect=lambda *_, **__: [threading.current_thread().name],
+    )
+    store = await registry.get_store(IndexGeneration("doc_a"))
+
+    (thread_name,) = await store.as_retriever().ainvoke("вопрос")
+
+    assert isinstance(store, RetrievalChroma)
+    assert thread_name.startswith("retrieval-lane")
+
+
+@pytest.mark.asyncio
+async def test_search_by_vector_in_retrieval_lane(registry: CollectionRegistry, mocker):
+    """Тест, что асинхронный поиск по эмбеддингу выполняется в пуле потоков поиска."""
+    mocker.patch.object(
+        RetrievalChroma,
+        "similarity_search_by_vector",
+        side_effect=lambda *_, **__: [threading.current_thread().name],
+    )
+    store = await registry.get_store(IndexGeneration("doc_a"))
+
+    (thread_name,) = await store.asimilarity_search_by_vector([0.0] * 8, k=3)
+
+    assert thread_name.startswith("retrieval-lane")
+
+
+@pytest.mark.asyncio
+async def test_registry_discard(registry: CollectionRegistry):
+    """Тест удаления документа из реестра."""
+    registry.activate(IndexGeneration("doc_a", "v2"))
+    registry.discard("doc_a")
+
+    assert not await registry.is_indexed("doc_a")
+
+
+@pytest.mark.asyncio
+async def test_registry_tracks_generations(
+    registry: CollectionRegistry, chroma_client: MagicMock
+):
+    """
+    Тест выбора действующего поколения: прерванные сборки пропускаются,
+    поколение текущей версии вытесняет старое, устаревшие документы видны.
+    """
+    collections = []
+    for name, metadata in [
+        ("doc_doc_a", None),
+        ("doc_doc_a__v2", {"status": "ready", "document_id": "doc_a"}),
+        ("doc_doc_b__v1", {"status": "ready", "document_id": "doc_b"}),
+        ("doc_doc_c__v2", {"status": "building", "document_id": "doc_c"}),
+    ]:
+        collection = MagicMock(metadata=metadata)
+        collection.name = name
+        collections.append(collection)
+    chroma_client.list_collections.return_value = collections
+
+    await registry.warm()
+
+    assert await registry.get_generation("doc_a") == IndexGeneration("doc_a", "v2")
+    assert not await registry.is_indexed("doc_c")
+    assert registry.leftovers == [IndexGeneration("doc_a")]
+    assert await registry.stale_documents() == ["doc_b"]
+
+    previous = registry.activate(IndexGeneration("doc_b", "v2"))
+
+    assert previous == IndexGeneration("doc_b", "v1")
+    assert previous.collection_name == "doc_doc_b__v1"
+    assert previous.storage_key == "doc_b.v1"
+    assert await registry.stale_documents() == []
+
+
+@pytest.mark.asyncio
+async def test_registry_lists_building_generations(
+    registry: CollectionRegistry, chroma_client: MagicMock
+):
+    """Тест, что недостроенные коллекции не входят в реестр, но перечисляются."""
+    building = MagicMock()
+    building.name = "doc_doc_new__v2"
+    building.metadata = {"status": "building", "document_id": "doc_new"}
+    chroma_client.list_collections.return_value.append(building)
+
+    assert not await registry.is_indexed("doc_new")
+    assert await registry.building_generations() == [IndexGeneration("doc_new", "v2")]
+
+
+@pytest.mark.asyncio
+async def test_list_collections_runs_in_lanes(
+    registry: CollectionRegistry, chroma_client: MagicMock
+):
+    """
+    Тест, что прогрев реестра читает список коллекций в пуле поиска, а
+    перечисление недостроенных коллекций для сборки мусора — в пуле индексации.
+    """
+    threads = []
+    collections = chroma_client.list_collections.return_value
+    chroma_client.list_collections.side_effect = lambda: (
+        threads.append(threading.current_thread().name) or collections
+    )
+
+    await registry.warm()
+    await registry.building_generations()
+
+    assert threads[0].startswith("retrieval-lane")
+    assert threads[1].startswith("indexing-lane")
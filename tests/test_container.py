@@ -0,0 +1,113 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from src.core.config import Settings
+from src.services.container import ServiceContainer
+
+
+@pytest.fixture
+def container(tmp_path, mock_document_service: MagicMock) -> ServiceContainer:
+    """Фикстура, создающая контейнер с хранилищем Chroma во временной папке."""
+    settings = Settings(
+        OPENAI_API_KEY="test_key",
+        CHROMA_PATH=str(tmp_path / "chroma"),
+        EMBEDDING_CACHE_PATH=str(tmp_path / "embeddings.sqlite3"),
+        SUMMARY_CACHE_PATH=str(tmp_path / "summaries"),
+    )
+    return ServiceContainer(
+        app_settings=settings, document_service=mock_document_service
+    )
+
+
+@pytest.mark.asyncio
+async def test_container_reuses_clients(container: ServiceContainer):
+    """Тест, что клиенты создаются один раз и разделяются сервисами."""
+    chat_service = container.chat_service
+
+    assert container.chat_service is chat_service
+    assert chat_service.llm is container.llm
+    assert chat_service.embeddings is container.embeddings
+    assert chat_service.chroma_client is container.chroma_client
+    assert chat_service.moderation_client is container.moderation_client
+    assert container.analysis_service.llm is container.llm
+    assert container.llm.http_async_client is container.http_async_client
+
+    await container.aclose()
+
+
+@pytest.mark.asyncio
+async def test_container_close_releases_pools(container: ServiceContainer):
+    """Тест, что при остановке пулы соединений закрываются."""
+    container.start()
+    http_client = container.http_client
+    http_async_client = container.http_async_client
+
+    await container.aclose()
+
+    assert not container.is_started
+    assert http_client.is_closed
+    assert http_async_client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_container_pool_stats(container: ServiceContainer):
+    """Тест структуры статистики пулов соединений."""
+    assert container.pool_stats()["started"] is False
+
+    container.start()
+    stats = container.pool_stats()
+
+    assert stats["limits"]["max_connections"] == 100
+    assert stats["async"] == {"connections": 0, "active": 0, "idle": 0}
+    assert stats["sync"]["connections"] == 0
+
+    await container.aclose()
+
+
+@pytest.mark.asyncio
+async def test_container_cache_stats(container: ServiceContainer):
+    """Тест, что статистика кэша эмбеддингов доступна после запуска."""
+    container.start()
+
+    assert container.cache_stats()["embeddings"] == {
+        "hits": 0,
+        "misses": 0,
+        "entries": 0,
+    }
+
+    await container.aclose()
+
+
+@pytest.mark.asyncio
+async def test_container_client_factory_override(tmp_path, mock_document_service):
+    """Тест, что подмененные в наследнике клиенты передаются всем сервисам."""
+    llm = MagicMock()
+    embeddings = MagicMock()
+    moderation_client = MagicMock()
+    moderation_client.moderations.create = AsyncMock(
+        return_value=MagicMock(results=[MagicMock(flagged=True)])
+    )
+
+    class LocalContainer(ServiceContainer):
+        def _create_clients(self) -> None:
+            super()._create_clients()
+            self.llm = llm
+            self.embeddings = embeddings
+            self.moderation_client = moderation_client
+
+    settings = Settings(
+        OPENAI_API_KEY="test_key",
+        CHROMA_PATH=str(tmp_path / "chroma"),
+        EMBEDDING_CACHE_ENABLED=False,
+        SUMMARY_CACHE_PATH=str(tmp_path / "summaries"),
+    )
+    container = LocalContainer(settings, mock_document_service)
+    chat_service = container.chat_service
+
+    assert chat_service.llm is llm
+    assert container.analysis_service.llm is llm
+    assert container.indexing_service.embeddings is embeddings
+    assert await chat_service._is_content_harmful("Это запрещено") is True
+    moderation_client.moderations.create.assert_awaited_once_with(input="Это запрещено")
+
+    await container.aclose()
@@ -0,0 +1,54 @@
+from langchain_core.documents import Document
+
+from src.core.tokens import count_tokens
+from src.services.context_assembler import ContextAssembler
+
+
+def make_documents(*items):
+    return [
+        Document(
+            page_content="", metadata={"parent_id": parent_id, "parent_start": start}
+        )
+        for parent_id, start in items
+    ]
+
+
+def test_overlapping_neighbours_are_merged():
+    """Тест, что перекрывающиеся соседние родители склеиваются без повтора текста."""
+    text = "abcdefghijklmnopqrstuvwxyz"
+    assembler = ContextAssembler("gpt-4o", max_tokens=1000)
+
+    context = assembler.assemble(
+        make_documents((1, 8), (0, 0), (3, 20)),
+        [text[8:16], text[0:10], text[20:26]],
+    )
+
+    assert context.text == "abcdefghijklmnop\n\n---\n\nuvwxyz"
+    assert [passage.rank for passage in context.passages] == [0, 2]
+
+
+def test_context_trimmed_to_token_budget():
+    """Тест, что менее релевантные фрагменты отбрасываются при превышении бюджета."""
+    parents = [("слово " * 50).strip(), ("другое " * 50).strip(), "коротко"]
+    budget = count_tokens(parents[0], "gpt-4o") + 10
+    assembler = ContextAssembler("gpt-4o", max_tokens=budget)
+
+    context = assembler.assemble(
+        make_documents((0, None), (1, None), (2, None)), parents
+    )
+
+    assert context.text.startswith(parents[0])
+    assert parents[1] not in context.text
+    assert context.text.endswith("коротко")
+    assert context.dropped == 1
+    assert context.tokens <= budget
+
+
+def test_single_oversized_passage_is_truncated():
+    """Тест, что единственный слишком длинный фрагмент обрезается до бюджета."""
+    assembler = ContextAssembler("gpt-4o", max_tokens=20)
+
+    context = assembler.assemble(make_documents((0, None)), ["текст " * 500])
+
+    assert 0 < context.tokens <= 20
+    assert context.dropped == 0
@@ -0,0 +1,280 @@
+import asyncio
+import io
+from datetime import timedelta
+
+import fitz
+import pytest
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+
+from src.services.document_service import DocumentService
+
+
+@pytest.fixture
+def document_service(tmp_path) -> DocumentService:
+    """Фикстура, создающая DocumentService с хранилищем во временной папке."""
+    return DocumentService(storage_path=tmp_path / "documents")
+
+
+@pytest.mark.asyncio
+async def test_duplicate_upload_returns_existing_document(
+    document_service: DocumentService, mocker, make_upload
+):
+    """Тест, что повторная загрузка того же файла возвращает существующий документ."""
+    extract_spy = mocker.spy(DocumentService, "_extract_text_from_txt")
+
+    first = await document_service.process_document(make_upload("Текст".encode()))
+    second = await document_service.process_document(
+        make_upload("Текст".encode(), filename="copy.txt")
+    )
+
+    assert second.document_id == first.document_id
+    assert second.filename == "copy.txt"
+    assert second.deduplicated and not first.deduplicated
+    assert extract_spy.call_count == 1
+    assert await document_service.get_document_content(first.document_id) == "Текст"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicate_uploads_store_once(
+    document_service: DocumentService,
+    make_upload,
+):
+    """Тест, что одновременные загрузки одинакового файла создают один документ."""
+    responses = await asyncio.gather(
+        *(document_service.process_document(make_upload(b"same")) for _ in range(5))
+    )
+
+    assert len({response.document_id for response in responses}) == 1
+    assert sum(not response.deduplicated for response in responses) == 1
+
+
+@pytest.mark.asyncio
+async def test_different_content_creates_new_document(
+    document_service: DocumentService,
+    make_upload,
+):
+    """Тест, что файлы с разным содержимым не склеиваются."""
+    first = await document_service.process_document(make_upload(b"first"))
+    second = await document_service.process_document(make_upload(b"second"))
+
+    assert first.document_id != second.document_id
+
+
+@pytest.mark.asyncio
+async def test_stale_hash_entry_is_ignored(
+    document_service: DocumentService, make_upload
+):
+    """Тест, что ссылка на удаленный документ не используется для дедупликации."""
+    first = await document_service.process_document(make_upload(b"content"))
+    (document_service._storage_path / f"{first.document_id}.txt").unlink()
+
+    second = await document_service.process_document(make_upload(b"content"))
+
+    assert second.document_id != first.document_id
+    assert not second.deduplicated
+
+
+@pytest.mark.asyncio
+async def test_empty_document_rejected(document_service: DocumentService, make_upload):
+    """Тест, что пустой документ отклоняется и не блокирует повторные загрузки."""
+    with pytest.raises(HTTPException) as exc_info:
+        await document_service.process_document(make_upload(b"   "))
+
+    assert exc_info.value.status_code == 400
+    assert document_service._pending_uploads == {}
+
+
+@pytest.mark.asyncio
+async def test_documents_found_by_tag(document_service: DocumentService, make_upload):
+    """Тест, что документы находятся по тегам, в том числе добавленным при повторной загрузке."""
+    first = await document_service.process_document(
+        make_upload(b"first"), ["contracts", "2024"]
+    )
+    second = await document_service.process_document(
+        make_upload(b"second"), ["contracts"]
+    )
+    await document_service.process_document(make_upload(b"second"), ["2024"])
+
+    assert first.tags == ["contracts", "2024"]
+    assert await document_service.find_by_tag("contracts") == sorted(
+        [first.document_id, second.document_id]
+    )
+    assert await document_service.find_by_tag("2024") == sorted(
+        [first.document_id, second.document_id]
+    )
+    assert await document_service.find_by_tag("missing") == []
+
+
+@pytest.mark.asyncio
+async def test_tag_markers_of_deleted_documents_are_dropped(
+    document_service: DocumentService,
+    make_upload,
+):
+    """Тест, что удаленный документ не возвращается по тегу."""
+    response = await document_service.process_document(make_upload(b"x"), ["tmp"])
+    (document_service._storage_path / f"{response.document_id}.txt").unlink()
+
+    assert await document_service.find_by_tag("tmp") == []
+    assert not (
+        document_service._storage_path / "by_tag" / "tmp" / response.document_id
+    ).exists()
+
+
+def test_parse_tags():
+    """Тест разбора тегов из поля формы."""
+    assert DocumentService.parse_tags(" Contracts, 2024,contracts,, ") == [
+        "contracts",
+        "2024",
+    ]
+    assert DocumentService.parse_tags(None) == []
+    with pytest.raises(HTTPException) as exc_info:
+        DocumentService.parse_tags("../etc")
+    assert exc_info.value.status_code == 400
+
+
+def make_pdf(pages: list[str]) -> bytes:
+    document = fitz.open()
+    for text in pages:
+        document.new_page().insert_text((72, 72), text)
+    content = document.tobytes()
+    document.close()
+    return content
+
+
+@pytest.mark.asyncio
+async def test_large_pdf_extracted_in_page_ranges(tmp_path):
+    """Тест, что страницы PDF, извлеченные в пуле процессов, сохраняются по порядку."""
+    service = DocumentService(
+        storage_path=tmp_path / "documents", extraction_workers=2, pages_per_task=2
+    )
+    pages = [f"Page {number}" for number in range(7)]
+    upload = UploadFile(
+        file=io.BytesIO(make_pdf(pages)),
+        filename="report.pdf",
+        headers=Headers({"content-type": "application/pdf"}),
+    )
+
+    try:
+        response = await service.process_document(upload)
+    finally:
+        service.close()
+
+    text = await service.get_document_content(response.document_id)
+    assert [line for line in text.splitlines() if line] == pages
+    assert list((tmp_path / "documents" / "incoming").iterdir()) == []
+
+    metadata = await service.get_document_metadata(response.document_id)
+    assert metadata.page_count == 7
+    assert metadata.char_count == len(text)
+    third_page = text[metadata.page_starts[2] : metadata.page_starts[3]]
+    assert third_page.strip() == "Page 2"
+    assert metadata.page_at(text.index("Page 5")) == 6
+
+
+@pytest.mark.asyncio
+async def test_txt_decoded_across_chunk_boundaries(tmp_path, make_upload):
+    """Тест, что многобайтовые символы на границе частей декодируются корректно."""
+    service = DocumentService(storage_path=tmp_path / "documents", upload_chunk_size=3)
+
+    response = await service.process_document(make_upload("Привет, мир".encode()))
+
+    assert await service.get_document_content(response.document_id) == "Привет, мир"
+
+
+@pytest.mark.asyncio
+async def test_invalid_pdf_rejected(document_service: DocumentService):
+    """Тест, что поврежденный PDF отклоняется без сохранения документа."""
+    upload = UploadFile(
+        file=io.BytesIO(b"not a pdf"),
+        filename="broken.pdf",
+        headers=Headers({"content-type": "application/pdf"}),
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        await document_service.process_document(upload)
+
+    assert exc_info.value.status_code == 400
+    assert list(document_service._storage_path.glob("*.txt*")) == []
+
+
+@pytest.mark.asyncio
+async def test_metadata_saved_next_to_text(
+    document_service: DocumentService, make_upload
+):
+    """Тест, что метаданные сохраняются рядом с текстом и совпадают с ним."""
+    content = "Строка номер один.\nВторая строка.\n" * 200
+    response = await document_service.process_document(make_upload(content.encode()))
+
+    metadata = await document_service.get_document_metadata(response.document_id)
+    assert metadata.page_count == 1
+    assert metadata.char_count == len(content)
+    assert metadata.byte_count == len(content.encode())
+    assert metadata.token_count > 0
+    assert await document_service.get_document_content(response.document_id) == content
+
+
+@pytest.mark.asyncio
+async def test_legacy_documents_without_metadata(
+    document_service: DocumentService,
+):
+    """Тест, что документы старого формата без метаданных по-прежнему читаются."""
+    (document_service._storage_path / "doc_legacy.txt").write_text("старый формат")
+
+    assert await document_service.get_document_metadata("doc_legacy") is None
+    assert await document_service.get_document_content("doc_legacy") == "старый формат"
+
+
+@pytest.mark.asyncio
+async def test_ttl_recorded_and_extended_on_reupload(
+    document_service: DocumentService,
+    make_upload,
+):
+    """
+    Тест, что срок хранения записывается в метаданные, продлевается повторной
+    загрузкой и снимается загрузкой без срока.
+    """
+    first = await document_service.process_document(
+        make_upload(b"temporary"), ttl_seconds=60
+    )
+    second = await document_service.process_document(
+        make_upload(b"temporary"), ttl_seconds=3600
+    )
+    metadata = await document_service.get_document_metadata(first.document_id)
+
+    assert second.deduplicated
+    assert second.expires_at > first.expires_at
+    assert metadata.expires_at == second.expires_at
+    assert not await document_service.expired_documents(
+        second.expires_at - timedelta(1)
+    )
+    assert await document_service.expired_documents(second.expires_at) == [
+        first.document_id
+    ]
+
+    third = await document_service.process_document(make_upload(b"temporary"))
+    assert third.expires_at is None
+    assert await document_service.expired_documents(second.expires_at) == []
+
+
+@pytest.mark.asyncio
+async def test_delete_document_removes_files_and_markers(
+    document_service: DocumentService,
+    make_upload,
+):
+    """Тест, что удаление документа убирает текст, метаданные и маркеры."""
+    response = await document_service.process_document(
+        make_upload(b"to be deleted"), tags=["drafts"]
+    )
+
+    reclaimed = await document_service.delete_document(response.document_id)
+
+    assert reclaimed > 0
+    assert not await document_service.document_exists(response.document_id)
+    assert await document_service.get_document_metadata(response.document_id) is None
+    assert await document_service.find_by_tag("drafts") == []
+    assert await document_service.delete_document(response.document_id) is None
+
+    again = await document_service.process_document(make_upload(b"to be deleted"))
+    assert not again.deduplicated
+    assert again.document_id != response.document_id
@@ -4,8 +4,18 @@ from unittest.mock import AsyncMock, MagicMock
 from fastapi import HTTPException, status
 
 from src.main import app
-from src.api.v1.documents import get_document_service, get_analysis_service
-from src.models.documents import UploadResponse
+from src.api.v1.documents import (
+    get_analysis_service,
+    get_batch_upload_service,
+    get_document_service,
+    get_indexing_service,
+)
+from src.models.documents import (
+    BatchStatus,
+    BatchUploadResponse,
+    IndexingStatus,
+    UploadResponse,
+)
 
 
 @pytest.fixture
@@ -98,3 +108,109 @@ async def test_get_summary_not_found(
 
     assert response.status_code == 404
     assert "Документ не найден" in response.json()["detail"]
+
+
+@pytest.fixture
+def mock_indexing_service() -> MagicMock:
+    mock = MagicMock()
+    mock.get_status = AsyncMock()
+    mock.get_error = MagicMock(return_value=None)
+    return mock
+
+
+@pytest.fixture
+def mocked_indexing_service_api(mock_indexing_service: MagicMock):
+    app.dependency_overrides[get_indexing_service] = lambda: mock_indexing_service
+    yield
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.usefixtures("mocked_indexing_service_api")
+@pytest.mark.asyncio
+async def test_get_status_success(
+    client: AsyncClient,
+    mock_indexing_service: MagicMock,
+):
+    """Тест получения статуса индексации документа."""
+    mock_indexing_service.get_status.return_value = IndexingStatus.INDEXING
+
+    response = await client.get("/api/v1/documents/doc_test_123/status")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "documentId": "doc_test_123",
+        "status": "indexing",
+        "error": None,
+    }
+
+
+@pytest.mark.usefixtures("mocked_indexing_service_api")
+@pytest.mark.asyncio
+async def test_get_status_not_found(
+    client: AsyncClient,
+    mock_indexing_service: MagicMock,
+):
+    """Тест получения статуса для несуществующего документа."""
+    mock_indexing_service.get_status.return_value = None
+
+    response = await client.get("/api/v1/documents/doc_not_found/status")
+
+    assert response.status_code == 404
+
+
+@pytest.fixture
+def mock_batch_upload_service() -> MagicMock:
+    mock = MagicMock()
+    mock.submit = AsyncMock()
+    mock.get_batch = AsyncMock()
+    return mock
+
+
+@pytest.fixture
+def mocked_batch_upload_service_api(mock_batch_upload_service: MagicMock):
+    app.dependency_overrides[get_batch_upload_service] = (
+        lambda: mock_batch_upload_service
+    )
+    yield
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.usefixtures("mocked_batch_upload_service_api")
+@pytest.mark.asyncio
+async def test_upload_batch_accepted(
+    client: AsyncClient,
+    mock_batch_upload_service: MagicMock,
+):
+    """Тест, что пакет файлов принимается и возвращается ID пакета."""
+    mock_batch_upload_service.submit.return_value = BatchUploadResponse(
+        batch_id="batch_1", status=BatchStatus.PROCESSING, total=2
+    )
+    files = [
+        ("files", ("a.txt", b"first", "text/plain")),
+        ("files", ("b.txt", b"second", "text/plain")),
+    ]
+
+    response = await client.post(
+        "/api/v1/documents/batch", files=files, data={"tags": "Contracts"}
+    )
+
+    assert response.status_code == 202
+    assert response.json()["batchId"] == "batch_1"
+    uploaded, tags, ttl_seconds = mock_batch_upload_service.submit.call_args.args
+    assert [file.filename for file in uploaded] == ["a.txt", "b.txt"]
+    assert tags == ["contracts"]
+    assert ttl_seconds is None
+
+
+@pytest.mark.usefixtures("mocked_batch_upload_service_api")
+@pytest.mark.asyncio
+async def test_get_batch_not_found(
+    client: AsyncClient,
+    mock_batch_upload_service: MagicMock,
+):
+    """Тест получения состояния неизвестного пакета."""
+    mock_batch_upload_service.get_batch.return_value = None
+
+    response = await client.get("/api/v1/documents/batches/batch_missing")
+
+    assert response.status_code == 404
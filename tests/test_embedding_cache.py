@@ -0,0 +1,119 @@
+import threading
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.services.embedding_cache import CachedEmbeddings, EmbeddingStore
+
+
+@pytest.fixture
+def underlying() -> MagicMock:
+    """Mock провайдера эмбеддингов поверх детерминированных фейковых векторов."""
+    fake = DeterministicFakeEmbedding(size=4)
+    mock = MagicMock()
+    mock.embed_documents = MagicMock(side_effect=fake.embed_documents)
+    mock.aembed_documents = AsyncMock(side_effect=fake.embed_documents)
+    return mock
+
+
+@pytest.fixture
+def cached_embeddings(underlying: MagicMock, tmp_path) -> CachedEmbeddings:
+    embeddings = CachedEmbeddings(
+        underlying=underlying,
+        model_name="test-model",
+        db_path=tmp_path / "cache.sqlite3",
+        max_entries=3,
+    )
+    yield embeddings
+    embeddings.close()
+
+
+@pytest.mark.asyncio
+async def test_repeated_texts_are_not_reembedded(
+    cached_embeddings: CachedEmbeddings, underlying: MagicMock
+):
+    """Тест, что повторные и совпадающие фрагменты берутся из кэша."""
+    first = await cached_embeddings.aembed_documents(["альфа", "бета", "альфа"])
+    second = await cached_embeddings.aembed_documents(["бета", "альфа"])
+
+    underlying.aembed_documents.assert_called_once_with(["альфа", "бета"])
+    assert first[0] == first[2]
+    assert second[0] == pytest.approx(first[1])
+    assert second[1] == pytest.approx(first[0])
+    assert cached_embeddings.stats() == {"hits": 3, "misses": 2, "entries": 2}
+
+
+@pytest.mark.asyncio
+async def test_cache_lookups_run_in_lanes(cached_embeddings: CachedEmbeddings, mocker):
+    """
+    Тест, что обращения к SQLite при индексации идут в пуле индексации, а
+    при эмбеддинге вопроса — в пуле поиска.
+    """
+    threads = []
+    get_many = cached_embeddings.store.get_many
+
+    def record(keys):
+        threads.append(threading.current_thread().name)
+        return get_many(keys)
+
+    mocker.patch.object(cached_embeddings.store, "get_many", side_effect=record)
+
+    await cached_embeddings.aembed_documents(["альфа"])
+    await cached_embeddings.aembed_query("бета")
+
+    assert threads[0].startswith("indexing-lane")
+    assert threads[1].startswith("retrieval-lane")
+
+
+def test_cache_persists_between_instances(underlying: MagicMock, tmp_path):
+    """Тест, что кэш сохраняется на диске и переживает перезапуск."""
+    db_path = tmp_path / "cache.sqlite3"
+    first = CachedEmbeddings(underlying, "test-model", db_path)
+    vector = first.embed_query("гамма")
+    first.close()
+
+    second = CachedEmbeddings(underlying, "test-model", db_path)
+    assert second.embed_query("гамма") == pytest.approx(vector)
+    underlying.embed_documents.assert_called_once()
+    second.close()
+
+
+def test_cache_key_includes_model(underlying: MagicMock, tmp_path):
+    """Тест, что эмбеддинги разных моделей не смешиваются."""
+    db_path = tmp_path / "cache.sqlite3"
+    CachedEmbeddings(underlying, "model-a", db_path).embed_query("дельта")
+    CachedEmbeddings(underlying, "model-b", db_path).embed_query("дельта")
+
+    assert underlying.embed_documents.call_count == 2
+
+
+def test_cache_evicts_least_recently_used(
+    cached_embeddings: CachedEmbeddings, underlying: MagicMock
+):
+    """Тест, что размер кэша ограничен и вытесняются давно не используемые записи."""
+    cached_embeddings.embed_documents(["a", "b", "c"])
+    cached_embeddings.embed_documents(["d"])
+
+    assert cached_embeddings.stats()["entries"] == 3
+    cached_embeddings.embed_documents(["d"])
+    assert underlying.embed_documents.call_count == 2
+
+
+def test_recent_hits_do_not_write(tmp_path):
+    """
+    Тест, что чтение недавно использованных записей не обновляет время
+    обращения, а чтение давно не использованных обновляет его одним запросом.
+    """
+    store = EmbeddingStore(tmp_path / "cache.sqlite3", max_entries=10)
+    store.put_many({"a": [1.0], "b": [2.0]})
+    changes = store._connection.total_changes
+
+    assert store.get_many(["a", "b"]) == {"a": [1.0], "b": [2.0]}
+    assert store._connection.total_changes == changes
+
+    store.touch_interval = 0
+    store.get_many(["a", "b", "c"])
+    assert store._connection.total_changes == changes + 2
+    store.close()
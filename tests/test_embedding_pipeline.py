@@ -0,0 +1,171 @@
+import asyncio
+import time
+import uuid
+
+import chromadb
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.services.embedding_cache import CachedEmbeddings
+from src.services.embedding_pipeline import EmbeddingPipeline, TokenBucket
+
+
+class FlakyEmbeddings(DeterministicFakeEmbedding):
+    """Фейковые эмбеддинги, которые падают заданное число раз и считают вызовы."""
+
+    failures: int = 0
+    calls: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+
+    async def aembed_documents(self, texts):
+        self.calls += 1
+        if self.failures > 0:
+            self.failures -= 1
+            raise RuntimeError("rate limit exceeded")
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        return self.embed_documents(texts)
+
+
+@pytest.fixture
+def collection():
+    """Коллекция in-memory Chroma с уникальным именем."""
+    client = chromadb.EphemeralClient()
+    return client.create_collection(f"test_{uuid.uuid4().hex}")
+
+
+def make_pipeline(embeddings, **kwargs) -> EmbeddingPipeline:
+    params = dict(
+        model_name="text-embedding-ada-002",
+        max_batch_tokens=100,
+        max_batch_size=4,
+        concurrency=2,
+        tokens_per_minute=6_000_000,
+        retry_base_delay=0.001,
+    )
+    params.update(kwargs)
+    return EmbeddingPipeline(embeddings=embeddings, **params)
+
+
+def test_make_batches_respects_limits(mocker):
+    """Тест, что батчи не превышают лимиты по токенам и количеству фрагментов."""
+    mocker.patch(
+        "src.services.embedding_pipeline.count_tokens",
+        side_effect=lambda text, _: len(text),
+    )
+    pipeline = make_pipeline(DeterministicFakeEmbedding(size=4))
+    texts = ["a" * 60, "b" * 30, "c" * 30, "d" * 5, "e" * 5, "f" * 5, "g" * 5]
+
+    batches = pipeline.make_batches(texts)
+
+    assert [indices for indices, _ in batches] == [[0, 1], [2, 3, 4, 5], [6]]
+    assert [tokens for _, tokens in batches] == [90, 45, 5]
+
+
+@pytest.mark.asyncio
+async def test_run_writes_all_chunks_concurrently(collection):
+    """Тест, что все фрагменты записываются в коллекцию с ограничением параллелизма."""
+    embeddings = FlakyEmbeddings(size=4)
+    pipeline = make_pipeline(embeddings)
+    texts = [f"фрагмент {i}" for i in range(20)]
+
+    stats = await pipeline.run(
+        collection,
+        ids=[f"id_{i}" for i in range(20)],
+        texts=texts,
+        metadatas=[{"parent_id": i} for i in range(20)],
+    )
+
+    assert stats.chunks == 20
+    assert stats.batches == 5
+    assert collection.count() == 20
+    assert collection.get(ids=["id_7"])["documents"] == ["фрагмент 7"]
+    assert 1 < embeddings.max_in_flight <= 2
+
+
+@pytest.mark.asyncio
+async def test_run_retries_transient_errors(collection):
+    """Тест повторной попытки при временной ошибке провайдера."""
+    embeddings = FlakyEmbeddings(size=4, failures=2)
+    pipeline = make_pipeline(embeddings)
+
+    stats = await pipeline.run(
+        collection, ids=["id_0"], texts=["текст"], metadatas=[{"parent_id": 0}]
+    )
+
+    assert stats.retries == 2
+    assert embeddings.calls == 3
+    assert collection.count() == 1
+
+
+@pytest.mark.asyncio
+async def test_run_gives_up_after_max_retries(collection):
+    """Тест, что после исчерпания попыток ошибка пробрасывается."""
+    embeddings = FlakyEmbeddings(size=4, failures=10)
+    pipeline = make_pipeline(embeddings, max_retries=1)
+
+    with pytest.raises(RuntimeError):
+        await pipeline.run(
+            collection, ids=["id_0"], texts=["текст"], metadatas=[{"parent_id": 0}]
+        )
+
+
+@pytest.mark.asyncio
+async def test_cached_chunks_skip_rate_limiter(mocker, tmp_path):
+    """
+    Тест, что батч, целиком найденный в кэше, не расходует лимит скорости и не
+    учитывается в токенах, а в частично найденном учитываются только новые
+    фрагменты.
+    """
+    mocker.patch(
+        "src.services.embedding_pipeline.count_tokens",
+        side_effect=lambda text, _: len(text),
+    )
+    underlying = FlakyEmbeddings(size=4)
+    embeddings = CachedEmbeddings(underlying, "test-model", tmp_path / "cache.sqlite3")
+    pipeline = make_pipeline(embeddings)
+    acquire = mocker.spy(pipeline.rate_limiter, "acquire")
+    client = chromadb.EphemeralClient()
+    texts = ["альфа", "бета", "гамма"]
+
+    await pipeline.run(
+        client.create_collection(f"test_{uuid.uuid4().hex}"),
+        ids=["a", "b", "c"],
+        texts=texts,
+        metadatas=[{"parent_id": i} for i in range(3)],
+    )
+    acquire.reset_mock()
+    cached = await pipeline.run(
+        client.create_collection(f"test_{uuid.uuid4().hex}"),
+        ids=["a", "b", "c"],
+        texts=texts,
+        metadatas=[{"parent_id": i} for i in range(3)],
+    )
+    acquire.assert_not_called()
+    partial = await pipeline.run(
+        client.create_collection(f"test_{uuid.uuid4().hex}"),
+        ids=["a", "d"],
+        texts=["альфа", "дельта"],
+        metadatas=[{"parent_id": i} for i in range(2)],
+    )
+    embeddings.close()
+
+    assert (cached.cached, cached.tokens) == (3, 0)
+    assert (partial.cached, partial.tokens) == (1, len("дельта"))
+    acquire.assert_awaited_once_with(len("дельта"))
+    assert underlying.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate():
+    """Тест, что ограничитель ждет пополнения корзины."""
+    bucket = TokenBucket(rate=1000, capacity=100)
+
+    started = time.monotonic()
+    await bucket.acquire(100)
+    await bucket.acquire(50)
+
+    assert time.monotonic() - started >= 0.04
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.core.executors import ExecutorLane
+from src.core.metrics import EXECUTOR_ACTIVE, EXECUTOR_QUEUE_DEPTH, EXECUTOR_WAIT
+
+
+@pytest.fixture
+def lane():
+    """Пул на один поток с уникальным именем, чтобы метрики не пересекались."""
+    lane = ExecutorLane(f"test-{id(object())}", max_workers=1)
+    yield lane
+    lane.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_run_returns_result_in_lane_thread(lane: ExecutorLane):
+    """Тест, что функция выполняется в потоке пула и время ожидания учитывается."""
+    thread_name = await lane.run(lambda: threading.current_thread().name)
+
+    assert thread_name.startswith(f"{lane.name}-lane")
+    assert EXECUTOR_WAIT.count(lane=lane.name) == 1
+    assert EXECUTOR_QUEUE_DEPTH.value(lane=lane.name) == 0
+    assert EXECUTOR_ACTIVE.value(lane=lane.name) == 0
+
+
+@pytest.mark.asyncio
+async def test_busy_lane_does_not_block_other_lane(lane: ExecutorLane):
+    """
+    Тест, что занятый пул индексации не задерживает пул поиска, а ожидающие
+    задачи видны в глубине очереди.
+    """
+    other = ExecutorLane(f"{lane.name}-other", max_workers=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def block() -> None:
+        started.set()
+        release.wait(5)
+
+    busy = [asyncio.create_task(lane.run(block)) for _ in range(3)]
+    await asyncio.to_thread(started.wait, 5)
+    try:
+        assert await asyncio.wait_for(other.run(lambda: "ok"), timeout=1) == "ok"
+        assert EXECUTOR_ACTIVE.value(lane=lane.name) == 1
+        assert EXECUTOR_QUEUE_DEPTH.value(lane=lane.name) == 2
+    finally:
+        release.set()
+        await asyncio.gather(*busy)
+        other.shutdown()
+
+    assert EXECUTOR_QUEUE_DEPTH.value(lane=lane.name) == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_queued_call_is_dropped(lane: ExecutorLane):
+    """Тест, что отмененная до начала выполнения задача снимается с очереди."""
+    release = threading.Event()
+    calls = []
+    running = asyncio.create_task(lane.run(release.wait, 5))
+    queued = asyncio.create_task(lane.run(calls.append, "queued"))
+    await asyncio.sleep(0.05)
+
+    queued.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await queued
+    release.set()
+    await running
+
+    assert calls == []
+    assert EXECUTOR_QUEUE_DEPTH.value(lane=lane.name) == 0
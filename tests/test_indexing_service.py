@@ -0,0 +1,287 @@
+import asyncio
+import uuid
+
+import chromadb
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from fastapi import HTTPException
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.models.documents import DocumentMetadata, IndexingStatus
+from src.services.indexing_service import IndexingService
+from src.services.lexical_index import LexicalIndexStore
+from src.services.parent_store import ParentStore
+
+
+@pytest.fixture
+def indexing_service(
+    test_settings, mock_document_service: MagicMock, tmp_path
+) -> IndexingService:
+    """Фикстура, создающая IndexingService с in-memory Chroma и фейковыми эмбеддингами."""
+    return IndexingService(
+        settings=test_settings,
+        document_service=mock_document_service,
+        embeddings=DeterministicFakeEmbedding(size=8),
+        chroma_client=chromadb.EphemeralClient(),
+        parent_store=ParentStore(tmp_path / "parents"),
+        lexical_store=LexicalIndexStore(tmp_path / "lexical"),
+    )
+
+
+@pytest.mark.asyncio
+async def test_wait_until_indexed_builds_collection(
+    indexing_service: IndexingService, mock_document_service: MagicMock
+):
+    """Тест, что ожидание индекса запускает индексацию и создает коллекцию."""
+    doc_id = f"doc_{uuid.uuid4().hex}"
+    mock_document_service.get_document_content = AsyncMock(
+        return_value="Первый абзац.\n\nВторой абзац."
+    )
+
+    await indexing_service.wait_until_indexed(doc_id)
+
+    generation = await indexing_service.collection_registry.get_generation(doc_id)
+    collection = indexing_service.chroma_client.get_collection(
+        generation.collection_name
+    )
+    assert collection.count() > 0
+    assert await indexing_service.get_status(doc_id) == IndexingStatus.READY
+    await indexing_service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_children_reference_parents_by_id(
+    indexing_service: IndexingService, mock_document_service: MagicMock
+):
+    """Тест, что дочерние фрагменты хранят только ссылку на родителя и смещения."""
+    doc_id = f"doc_{uuid.uuid4().hex}"
+    document_text = "\n\n".join(f"Абзац номер {i}. " * 20 for i in range(30))
+    mock_document_service.get_document_content = AsyncMock(return_value=document_text)
+
+    await indexing_service.wait_until_indexed(doc_id)
+
+    generation = await indexing_service.collection_registry.get_generation(doc_id)
+    collection = indexing_service.chroma_client.get_collection(
+        generation.collection_name
+    )
+    children = collection.get(include=["documents", "metadatas"])
+    parent_ids = {metadata["parent_id"] for metadata in children["metadatas"]}
+    parents = await indexing_service.parent_store.get_many(
+        generation.storage_key, parent_ids
+    )
+
+    assert len(parents) == len(parent_ids) > 1
+    for content, metadata in zip(children["documents"], children["metadatas"]):
+        assert set(metadata) == {"parent_id", "parent_start", "start", "end"}
+        parent = parents[metadata["parent_id"]]
+        assert (
+            document_text[
+                metadata["parent_start"] : metadata["parent_start"] + len(parent)
+            ]
+            == parent
+        )
+        assert document_text[metadata["start"] : metadata["end"]] == content
+        assert content in parents[metadata["parent_id"]]
+    await indexing_service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_waiters_share_single_job(
+    indexing_service: IndexingService, mocker
+):
+    """Тест, что параллельные запросы к одному документу запускают одну индексацию."""
+    doc_id = f"doc_{uuid.uuid4().hex}"
+    started = asyncio.Event()
+
+    async def slow_index(_: str) -> None:
+        started.set()
+        await asyncio.sleep(0.05)
+
+    mock_index = mocker.patch.object(
+        indexing_service, "_index_document", side_effect=slow_index
+    )
+    mocker.patch.object(
+        indexing_service, "_is_indexed", new_callable=AsyncMock, return_value=False
+    )
+
+    indexing_service.enqueue(doc_id)
+    await started.wait()
+    assert await indexing_service.get_status(doc_id) == IndexingStatus.INDEXING
+
+    await asyncio.gather(
+        indexing_service.wait_until_indexed(doc_id),
+        indexing_service.wait_until_indexed(doc_id),
+    )
+
+    mock_index.assert_called_once_with(doc_id)
+    await indexing_service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_failed_indexing_reports_status(
+    indexing_service: IndexingService, mocker
+):
+    """Тест, что ошибка индексации отражается в статусе и возвращается ожидающим."""
+    doc_id = f"doc_{uuid.uuid4().hex}"
+    mocker.patch.object(
+        indexing_service,
+        "_index_document",
+        new_callable=AsyncMock,
+        side_effect=RuntimeError("embedding backend unavailable"),
+    )
+    mocker.patch.object(
+        indexing_service, "_is_indexed", new_callable=AsyncMock, return_value=False
+    )
+
+    with pytest.raises(HTTPException) as exc_info:
+        await indexing_service.wait_until_indexed(doc_id)
+
+    assert exc_info.value.status_code == 500
+    assert await indexing_service.get_status(doc_id) == IndexingStatus.FAILED
+    assert "embedding backend unavailable" in indexing_service.get_error(doc_id)
+    await indexing_service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_status_history_is_bounded(
+    test_settings, mock_document_service: MagicMock, tmp_path
+):
+    """
+    Тест, что в памяти хранятся состояния только последних документов, а
+    состояние вытесненного документа восстанавливается по реестру.
+    """
+    indexing_service = IndexingService(
+        settings=test_settings.model_copy(update={"INDEXING_STATUS_HISTORY_SIZE": 2}),
+        document_service=mock_document_service,
+        embeddings=DeterministicFakeEmbedding(size=8),
+        chroma_client=chromadb.EphemeralClient(),
+        parent_store=ParentStore(tmp_path / "parents"),
+        lexical_store=LexicalIndexStore(tmp_path / "lexical"),
+    )
+    doc_ids = [f"doc_{uuid.uuid4().hex}" for _ in range(3)]
+    for doc_id in doc_ids:
+        await indexing_service.wait_until_indexed(doc_id)
+
+    assert len(indexing_service._statuses) == 2
+    assert doc_ids[0] not in indexing_service._statuses
+    assert await indexing_service.get_status(doc_ids[0]) == IndexingStatus.READY
+
+    await indexing_service.remove_document(doc_ids[2])
+    assert doc_ids[2] not in indexing_service._statuses
+    await indexing_service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_get_status_unknown_document(
+    indexing_service: IndexingService, mock_document_service: MagicMock
+):
+    """Тест, что для несуществующего документа статус не возвращается."""
+    mock_document_service.document_exists = AsyncMock(return_value=False)
+
+    assert await indexing_service.get_status("doc_missing") is None
+
+
+@pytest.mark.asyncio
+async def test_children_carry_page_numbers(
+    indexing_service: IndexingService, mock_document_service: MagicMock
+):
+    """Тест, что фрагменты документа с метаданными получают номер страницы."""
+    doc_id = f"doc_{uuid.uuid4().hex}"
+    pages = [f"Страница {i}. " * 40 for i in range(3)]
+    document_text = "".join(pages)
+    page_starts = [sum(len(page) for page in pages[:i]) for i in range(3)]
+    mock_document_service.get_document_content = AsyncMock(return_value=document_text)
+    mock_document_service.get_document_metadata = AsyncMock(
+        return_value=DocumentMetadata(
+            document_id=doc_id,
+            content_hash="hash",
+            content_type="application/pdf",
+            page_count=3,
+            char_count=len(document_text),
+            byte_count=len(document_text.encode()),
+            token_count=0,
+            page_starts=page_starts,
+        )
+    )
+
+    await indexing_service.wait_until_indexed(doc_id)
+
+    generation = await indexing_service.collection_registry.get_generation(doc_id)
+    collection = indexing_service.chroma_client.get_collection(
+        generation.collection_name
+    )
+    metadatas = collection.get(include=["metadatas"])["metadatas"]
+    assert {metadata["page"] for metadata in metadatas} == {1, 2, 3}
+    for metadata in metadatas:
+        assert page_starts[metadata["page"] - 1] <= metadata["start"]
+    await indexing_service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_indexing_builds_lexical_index(
+    indexing_service: IndexingService, mock_document_service: MagicMock
+):
+    """Тест, что при индексации строится BM25-индекс, находящий точные термины."""
+    doc_id = f"doc_{uuid.uuid4().hex}"
+    paragraphs = [f"Абзац номер {i} без особых терминов. " * 10 for i in range(20)]
+    paragraphs[13] = "Договор № ДК-4471/2023 заключен с ООО Ромашка. " * 3
+    mock_document_service.get_document_content = AsyncMock(
+        return_value="\n\n".join(paragraphs)
+    )
+
+    await indexing_service.wait_until_indexed(doc_id)
+
+    generation = await indexing_service.collection_registry.get_generation(doc_id)
+    collection = indexing_service.chroma_client.get_collection(
+        generation.collection_name
+    )
+    hits = await indexing_service.lexical_store.search(
+        generation.storage_key, "ДК-4471", k=3, collection=collection
+    )
+    assert hits
+    assert "ДК-4471/2023" in hits[0].page_content
+    assert set(hits[0].metadata) >= {"parent_id", "start", "end"}
+    await indexing_service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_paused_waits_for_builds_and_holds_new_writes(
+    indexing_service: IndexingService, mock_document_service: MagicMock
+):
+    """
+    Тест, что пауза записи дожидается начатой индексации, а удаление
+    поколения во время паузы ждет ее окончания.
+    """
+    doc_id = f"doc_{uuid.uuid4().hex}"
+    release = asyncio.Event()
+
+    async def slow_content(_: str) -> str:
+        await release.wait()
+        return "Первый абзац.\n\nВторой абзац."
+
+    mock_document_service.get_document_content = AsyncMock(side_effect=slow_content)
+    job = indexing_service.enqueue(doc_id)
+    await asyncio.sleep(0.01)
+
+    async def pause() -> asyncio.Task:
+        async with indexing_service.paused():
+            assert job.done()
+            removal = asyncio.create_task(
+                indexing_service.remove_generation(
+                    await indexing_service.collection_registry.get_generation(doc_id)
+                )
+            )
+            await asyncio.sleep(0.01)
+            assert not removal.done()
+        return removal
+
+    pausing = asyncio.create_task(pause())
+    await asyncio.sleep(0.01)
+    assert not pausing.done()
+    release.set()
+
+    await (await pausing)
+    names = [c.name for c in indexing_service.chroma_client.list_collections()]
+    assert all(doc_id not in name for name in names)
+    await indexing_service.aclose()
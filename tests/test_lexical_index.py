@@ -0,0 +1,113 @@
+import json
+import uuid
+
+import chromadb
+import pytest
+
+from src.core.metrics import EXECUTOR_WAIT
+from src.services.lexical_index import BM25Index, LexicalIndexStore
+
+TEXTS = [
+    "Стороны договорились о сроках поставки.",
+    "Договор № 4471-Б подписан директором Ивановым.",
+    "Сроки поставки и оплаты указаны в приложении.",
+]
+IDS = [f"doc_1_{i}" for i in range(len(TEXTS))]
+
+
+@pytest.fixture
+def index() -> BM25Index:
+    return BM25Index.build(IDS, TEXTS)
+
+
+@pytest.fixture
+def collection():
+    """Коллекция in-memory Chroma с фрагментами, по которым построен индекс."""
+    collection = chromadb.EphemeralClient().create_collection(
+        f"test_{uuid.uuid4().hex}"
+    )
+    collection.add(
+        ids=IDS,
+        embeddings=[[float(i), 1.0] for i in range(len(TEXTS))],
+        documents=TEXTS,
+        metadatas=[{"start": i * 100} for i in range(len(TEXTS))],
+    )
+    return collection
+
+
+def test_bm25_ranks_exact_terms_first(index: BM25Index):
+    """Тест, что фрагмент с редким точным термином получает наибольшую оценку."""
+    results = index.search("сроки по договору 4471-Б", k=3)
+
+    assert results[0][0] == "doc_1_1"
+    assert [score for _, score in results] == sorted(
+        (score for _, score in results), reverse=True
+    )
+    assert len(results) == 2
+
+
+def test_bm25_ignores_unknown_terms(index: BM25Index):
+    """Тест, что запрос без известных терминов ничего не находит."""
+    assert index.search("несуществующее слово", k=5) == []
+
+
+@pytest.mark.asyncio
+async def test_lexical_store_round_trip(index: BM25Index, collection, tmp_path):
+    """
+    Тест сохранения индекса на диск и поиска после перезагрузки: на диске
+    нет текстов фрагментов, они читаются из коллекции.
+    """
+    await LexicalIndexStore(tmp_path).save("doc_1", index)
+    store = LexicalIndexStore(tmp_path)
+
+    hits = await store.search("doc_1", "сроки Ивановым", k=2, collection=collection)
+
+    assert hits[0].page_content == TEXTS[1]
+    assert hits[0].metadata == {"start": 100}
+    assert len(hits) == 2
+    assert await store.search("doc_missing", "договор", 1, collection) == []
+    stored = json.loads((tmp_path / "doc_1.bm25.json").read_text(encoding="utf-8"))
+    assert "Ивановым" not in json.dumps(stored, ensure_ascii=False)
+
+
+@pytest.mark.asyncio
+async def test_legacy_index_is_ignored(collection, tmp_path):
+    """Тест, что индекс старого формата с текстами не используется для поиска."""
+    (tmp_path / "doc_1.bm25.json").write_text(
+        json.dumps({"texts": TEXTS, "metadatas": [], "doc_lengths": [], "postings": {}})
+    )
+
+    assert (
+        await LexicalIndexStore(tmp_path).search("doc_1", "договор", 1, collection)
+        == []
+    )
+
+
+@pytest.mark.asyncio
+async def test_lexical_store_loads_and_searches_in_retrieval_lane(
+    index: BM25Index, collection, tmp_path
+):
+    """
+    Тест, что загрузка индекса, поиск и чтение фрагментов из коллекции
+    выполняются в пуле потоков поиска.
+    """
+    await LexicalIndexStore(tmp_path).save("doc_1", index)
+    store = LexicalIndexStore(tmp_path)
+    before = EXECUTOR_WAIT.count(lane="retrieval")
+
+    await store.search("doc_1", "договор", k=1, collection=collection)
+
+    assert EXECUTOR_WAIT.count(lane="retrieval") == before + 2
+
+
+@pytest.mark.asyncio
+async def test_lexical_store_files_managed_in_indexing_lane(index: BM25Index, tmp_path):
+    """Тест, что запись, перечисление и удаление индексов идут в пуле индексации."""
+    store = LexicalIndexStore(tmp_path)
+    before = EXECUTOR_WAIT.count(lane="indexing")
+
+    await store.save("doc_1", index)
+    assert await store.keys() == ["doc_1"]
+    await store.delete("doc_1")
+
+    assert EXECUTOR_WAIT.count(lane="indexing") == before + 3
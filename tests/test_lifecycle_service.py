@@ -0,0 +1,217 @@
+from datetime import datetime, timedelta, timezone
+
+import chromadb
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from httpx import AsyncClient
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.api.v1.admin import get_lifecycle_service as get_admin_lifecycle_service
+from src.api.v1.documents import get_lifecycle_service
+from src.main import app
+from src.models.documents import GarbageCollectionReport
+from src.services.collection_registry import IndexGeneration
+from src.services.document_service import DocumentService
+from src.services.indexing_service import IndexingService
+from src.services.lexical_index import LexicalIndexStore
+from src.services.lifecycle_service import DocumentLifecycleService, compact_chroma
+from src.services.parent_store import ParentStore
+from src.services.summary_cache import SummaryCache
+
+DOCUMENT_TEXT = "\n\n".join(f"Абзац номер {i}. " * 20 for i in range(5))
+
+
+@pytest.fixture
+async def lifecycle(test_settings, tmp_path):
+    """
+    Сервис жизненного цикла поверх настоящих хранилищ во временной папке.
+    """
+    document_service = DocumentService(storage_path=tmp_path / "documents")
+    indexing_service = IndexingService(
+        settings=test_settings,
+        document_service=document_service,
+        embeddings=DeterministicFakeEmbedding(size=8),
+        chroma_client=chromadb.PersistentClient(path=str(tmp_path / "chroma")),
+        parent_store=ParentStore(tmp_path / "parents"),
+        lexical_store=LexicalIndexStore(tmp_path / "lexical"),
+    )
+    service = DocumentLifecycleService(
+        document_service,
+        indexing_service,
+        summary_cache=SummaryCache(tmp_path / "summaries"),
+        answer_cache=MagicMock(),
+        chroma_path=tmp_path / "chroma",
+        storage_paths=[tmp_path],
+    )
+    yield service
+    await indexing_service.aclose()
+
+
+@pytest.fixture
+def upload_and_index(lifecycle: DocumentLifecycleService, make_upload):
+    """
+    Загружает и индексирует документ через сервис жизненного цикла,
+    сохраняя для него summary.
+    """
+
+    async def upload(text: str = DOCUMENT_TEXT, **kwargs) -> str:
+        response = await lifecycle.document_service.process_document(
+            make_upload(text.encode()), **kwargs
+        )
+        await lifecycle.indexing_service.wait_until_indexed(response.document_id)
+        await lifecycle.summary_cache.set(response.document_id, "fp", "summary")
+        return response.document_id
+
+    return upload
+
+
+@pytest.mark.asyncio
+async def test_delete_document_removes_derived_data(
+    lifecycle: DocumentLifecycleService, upload_and_index
+):
+    """
+    Тест, что удаление документа убирает текст, индекс, родительские
+    фрагменты, BM25-индекс, summary и кэшированные ответы.
+    """
+    doc_id = await upload_and_index()
+    indexing_service = lifecycle.indexing_service
+    generation = await indexing_service.collection_registry.get_generation(doc_id)
+
+    assert await lifecycle.delete_document(doc_id)
+
+    assert not await lifecycle.document_service.document_exists(doc_id)
+    assert not await indexing_service.collection_registry.is_indexed(doc_id)
+    names = {c.name for c in indexing_service.chroma_client.list_collections()}
+    assert generation.collection_name not in names
+    assert await indexing_service.parent_store.keys() == []
+    assert await indexing_service.lexical_store.keys() == []
+    assert await lifecycle.summary_cache.document_ids() == set()
+    lifecycle.answer_cache.discard.assert_called_once_with(doc_id)
+    assert not await lifecycle.delete_document(doc_id)
+
+
+@pytest.mark.asyncio
+async def test_collect_garbage_removes_expired_and_orphans(
+    lifecycle: DocumentLifecycleService, upload_and_index
+):
+    """
+    Тест, что сборщик удаляет документы с истекшим сроком, индексы без
+    документа и файлы без документа и индекса, не трогая остальные.
+    """
+    expired_id = await upload_and_index("временный", ttl_seconds=1)
+    kept_id = await upload_and_index()
+    orphan_id = await upload_and_index("потерянный")
+    await lifecycle.document_service.delete_document(orphan_id)
+    await lifecycle.indexing_service.parent_store.save("doc_gone.abc", ["родитель"])
+
+    lifecycle.document_service.expired_documents = AsyncMock(return_value=[expired_id])
+    report = await lifecycle.collect_garbage(compact=False)
+
+    assert report.expired_documents == [expired_id]
+    assert report.orphan_indexes == 1
+    assert report.orphan_files == 2
+    assert not report.compacted
+    assert report.reclaimed_bytes > 0
+    registry = lifecycle.indexing_service.collection_registry
+    assert await registry.documents() == [kept_id]
+    assert await lifecycle.summary_cache.document_ids() == {kept_id}
+    assert lifecycle.last_report == report
+
+
+@pytest.mark.asyncio
+async def test_collect_garbage_removes_abandoned_builds(
+    lifecycle: DocumentLifecycleService, upload_and_index
+):
+    """
+    Тест, что сборщик удаляет недостроенные коллекции удаленных документов и
+    не трогает недостроенные коллекции существующих.
+    """
+    kept_id = await upload_and_index()
+    indexing_service = lifecycle.indexing_service
+    abandoned = IndexGeneration("doc_gone", indexing_service.index_version)
+    in_progress = IndexGeneration(kept_id, "next")
+    for generation in (abandoned, in_progress):
+        indexing_service._create_building_collection(generation)
+
+    report = await lifecycle.collect_garbage(compact=False)
+
+    assert report.orphan_indexes == 1
+    names = {c.name for c in indexing_service.chroma_client.list_collections()}
+    assert abandoned.collection_name not in names
+    assert in_progress.collection_name in names
+
+
+@pytest.mark.asyncio
+async def test_expired_documents_found_by_ttl(
+    lifecycle: DocumentLifecycleService, upload_and_index
+):
+    """Тест, что документ с истекшим сроком находится по метаданным."""
+    doc_id = await upload_and_index("временный", ttl_seconds=60)
+    later = datetime.now(timezone.utc) + timedelta(minutes=2)
+
+    assert await lifecycle.document_service.expired_documents(later) == [doc_id]
+
+
+@pytest.mark.asyncio
+async def test_compact_chroma_removes_orphan_segments(
+    lifecycle: DocumentLifecycleService, tmp_path, upload_and_index
+):
+    """
+    Тест, что сжатие удаляет папки HNSW-сегментов удаленных коллекций,
+    оставляя сегменты действующих.
+    """
+    await upload_and_index()
+    chroma_path = tmp_path / "chroma"
+    live_dirs = {path.name for path in chroma_path.iterdir() if path.is_dir()}
+    orphan_dir = chroma_path / "00000000-0000-0000-0000-000000000000"
+    orphan_dir.mkdir()
+    (orphan_dir / "data_level0.bin").write_bytes(b"\0" * 1024)
+
+    assert compact_chroma(chroma_path) == 1
+    assert not orphan_dir.exists()
+    assert {path.name for path in chroma_path.iterdir() if path.is_dir()} == live_dirs
+
+
+@pytest.mark.asyncio
+async def test_delete_document_endpoint(client: AsyncClient):
+    """Тест, что DELETE возвращает 204 для документа и 404 для неизвестного."""
+    service = MagicMock()
+    service.delete_document = AsyncMock(side_effect=[True, False])
+    app.dependency_overrides[get_lifecycle_service] = lambda: service
+    try:
+        deleted = await client.delete("/api/v1/documents/doc_1")
+        missing = await client.delete("/api/v1/documents/doc_1")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert deleted.status_code == 204
+    assert missing.status_code == 404
+    service.delete_document.assert_awaited_with("doc_1")
+
+
+@pytest.mark.asyncio
+async def test_gc_endpoints(client: AsyncClient):
+    """Тест, что ручной запуск сборки мусора возвращает отчет в camelCase."""
+    report = GarbageCollectionReport(
+        started_at=datetime.now(timezone.utc),
+        expired_documents=["doc_a"],
+        orphan_files=2,
+        reclaimed_bytes=100,
+    )
+    service = MagicMock()
+    service.last_report = None
+    service.collect_garbage = AsyncMock(return_value=report)
+    app.dependency_overrides[get_admin_lifecycle_service] = lambda: service
+    try:
+        missing = await client.get("/api/v1/admin/gc")
+        response = await client.post("/api/v1/admin/gc", params={"compact": "true"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert missing.status_code == 404
+    assert response.status_code == 200
+    body = response.json()
+    assert body["expiredDocuments"] == ["doc_a"]
+    assert (body["orphanFiles"], body["reclaimedBytes"]) == (2, 100)
+    service.collect_garbage.assert_awaited_once_with(True)
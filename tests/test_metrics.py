@@ -0,0 +1,76 @@
+import pytest
+
+from src.core.metrics import Gauge, MetricsRegistry
+
+
+@pytest.fixture
+def registry() -> MetricsRegistry:
+    return MetricsRegistry()
+
+
+def test_counter_render(registry: MetricsRegistry):
+    """Тест вывода счетчика с метками в текстовом формате Prometheus."""
+    counter = registry.counter("requests_total", "Запросы.", ("kind",))
+    counter.inc(kind="a")
+    counter.inc(2, kind='b"c')
+
+    text = registry.render()
+
+    assert "# HELP requests_total Запросы.\n# TYPE requests_total counter\n" in text
+    assert 'requests_total{kind="a"} 1.0\n' in text
+    assert 'requests_total{kind="b\\"c"} 2.0\n' in text
+    with pytest.raises(ValueError):
+        counter.inc(-1, kind="a")
+
+
+def test_histogram_buckets_are_cumulative(registry: MetricsRegistry):
+    """Тест, что корзины гистограммы накопительные и включают границу."""
+    histogram = registry.histogram(
+        "duration_seconds", "Длительность.", ("stage",), buckets=(0.1, 1.0)
+    )
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value, stage="x")
+
+    text = registry.render()
+
+    assert 'duration_seconds_bucket{stage="x",le="0.1"} 2' in text
+    assert 'duration_seconds_bucket{stage="x",le="1.0"} 3' in text
+    assert 'duration_seconds_bucket{stage="x",le="+Inf"} 4' in text
+    assert 'duration_seconds_count{stage="x"} 4' in text
+    assert histogram.sum(stage="x") == pytest.approx(5.65)
+
+
+def test_histogram_time_records_failures(registry: MetricsRegistry):
+    """Тест, что длительность блока записывается и при ошибке."""
+    histogram = registry.histogram("stage_seconds", "Стадии.", ("stage",))
+
+    with pytest.raises(RuntimeError):
+        with histogram.time(stage="llm"):
+            raise RuntimeError
+
+    assert histogram.count(stage="llm") == 1
+
+
+def test_labels_are_validated(registry: MetricsRegistry):
+    """Тест, что метрика требует ровно объявленные метки."""
+    gauge = registry.gauge("size", "Размер.", ("cache",))
+
+    with pytest.raises(ValueError):
+        gauge.set(1)
+    with pytest.raises(ValueError):
+        registry.gauge("size", "Повтор.")
+
+
+def test_collectors_are_rendered(registry: MetricsRegistry):
+    """Тест, что метрики коллекторов строятся в момент чтения."""
+    values = {"entries": 1}
+
+    def collect():
+        gauge = Gauge("cache_entries", "Записи.")
+        gauge.set(values["entries"])
+        return [gauge]
+
+    registry.register_collector(collect)
+    values["entries"] = 7
+
+    assert "cache_entries 7.0\n" in registry.render()
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from src.core.metrics import EXECUTOR_WAIT
+
+from src.services.parent_store import ParentStore
+
+
+@pytest.fixture
+def parent_store(tmp_path) -> ParentStore:
+    return ParentStore(tmp_path / "parents")
+
+
+@pytest.mark.asyncio
+async def test_get_many_reads_only_requested_parents(parent_store: ParentStore, mocker):
+    """
+    Тест, что из файла читаются только запрошенные родители, а таблица
+    смещений разбирается один раз.
+    """
+    await parent_store.save("doc_a", ["первый", "второй", "третий € 😀"])
+    parent_store._cache.clear()
+    loads_spy = mocker.spy(json, "loads")
+
+    first = await parent_store.get_many("doc_a", [0, 2])
+    second = await parent_store.get_many("doc_a", [1, 5])
+
+    assert first == {0: "первый", 2: "третий € 😀"}
+    assert second == {1: "второй"}
+    assert loads_spy.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_legacy_json_parents_are_read(parent_store: ParentStore, tmp_path):
+    """Тест, что родители из JSON-файла старого формата по-прежнему читаются."""
+    (tmp_path / "parents").mkdir()
+    (tmp_path / "parents" / "doc_old.parents.json").write_text(
+        json.dumps(["первый", "второй"]), encoding="utf-8"
+    )
+
+    assert await parent_store.get_many("doc_old", [1]) == {1: "второй"}
+    assert await parent_store.keys() == ["doc_old"]
+
+
+@pytest.mark.asyncio
+async def test_missing_document_returns_empty(parent_store: ParentStore):
+    """Тест запроса родителей для документа без сохраненных фрагментов."""
+    assert await parent_store.get_many("doc_missing", [0]) == {}
+
+
+@pytest.mark.asyncio
+async def test_delete(parent_store: ParentStore):
+    """Тест удаления родительских фрагментов документа."""
+    await parent_store.save("doc_a", ["первый"])
+    await parent_store.delete("doc_a")
+
+    assert await parent_store.get_many("doc_a", [0]) == {}
+    assert await parent_store.keys() == []
+
+
+@pytest.mark.asyncio
+async def test_store_runs_in_lanes(parent_store: ParentStore):
+    """
+    Тест, что запись, перечисление и удаление файлов идут в пуле индексации,
+    а чтение родителей — в пуле поиска.
+    """
+    indexing = EXECUTOR_WAIT.count(lane="indexing")
+    retrieval = EXECUTOR_WAIT.count(lane="retrieval")
+
+    await parent_store.save("doc_a", ["первый"])
+    await parent_store.get_many("doc_a", [0])
+    await parent_store.keys()
+    await parent_store.delete("doc_a")
+
+    assert EXECUTOR_WAIT.count(lane="indexing") == indexing + 3
+    assert EXECUTOR_WAIT.count(lane="retrieval") == retrieval + 1
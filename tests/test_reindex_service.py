@@ -0,0 +1,145 @@
+import uuid
+
+import chromadb
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from httpx import AsyncClient
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.api.v1.admin import get_reindex_scheduler
+from src.main import app
+from src.models.documents import ReindexProgress, ReindexStatus
+from src.services.collection_registry import IndexGeneration
+from src.services.indexing_service import IndexingService
+from src.services.lexical_index import LexicalIndexStore
+from src.services.parent_store import ParentStore
+from src.services.reindex_service import ReindexScheduler
+
+DOCUMENT_TEXT = "\n\n".join(f"Абзац номер {i}. " * 20 for i in range(10))
+
+
+def make_indexing_service(
+    settings, document_service, chroma_client, tmp_path
+) -> IndexingService:
+    return IndexingService(
+        settings=settings,
+        document_service=document_service,
+        embeddings=DeterministicFakeEmbedding(size=8),
+        chroma_client=chroma_client,
+        parent_store=ParentStore(tmp_path / "parents"),
+        lexical_store=LexicalIndexStore(tmp_path / "lexical"),
+    )
+
+
+@pytest.fixture
+def stale_index(test_settings, mock_document_service: MagicMock, tmp_path):
+    """
+    Документ, проиндексированный со старыми настройками, и сервис индексации
+    с новым размером дочерних фрагментов поверх той же базы.
+    """
+    doc_id = f"doc_{uuid.uuid4().hex}"
+    mock_document_service.get_document_content = AsyncMock(return_value=DOCUMENT_TEXT)
+    chroma_client = chromadb.PersistentClient(path=str(tmp_path / "chroma"))
+    old_service = make_indexing_service(
+        test_settings, mock_document_service, chroma_client, tmp_path
+    )
+    new_service = make_indexing_service(
+        test_settings.model_copy(update={"CHILD_CHUNK_SIZE": 300}),
+        mock_document_service,
+        chroma_client,
+        tmp_path,
+    )
+    return doc_id, old_service, new_service
+
+
+@pytest.mark.asyncio
+async def test_settings_change_makes_index_stale(stale_index):
+    """Тест, что смена настроек деления меняет версию индекса и имя коллекции."""
+    doc_id, old_service, new_service = stale_index
+    await old_service.wait_until_indexed(doc_id)
+    old_generation = await old_service.collection_registry.get_generation(doc_id)
+
+    assert new_service.index_version != old_service.index_version
+    assert old_generation.version == old_service.index_version
+    assert await new_service.collection_registry.stale_documents() == [doc_id]
+    assert await new_service.is_ready(doc_id)
+
+    collection = new_service.chroma_client.get_collection(
+        old_generation.collection_name
+    )
+    assert collection.metadata["status"] == "ready"
+    assert collection.metadata["child_chunks"] == "400/100"
+    await old_service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_scheduler_rebuilds_and_swaps(stale_index):
+    """
+    Тест, что планировщик перестраивает устаревший индекс, переключает на
+    него запросы и удаляет старое поколение после паузы.
+    """
+    doc_id, old_service, new_service = stale_index
+    await old_service.wait_until_indexed(doc_id)
+    old_generation = await old_service.collection_registry.get_generation(doc_id)
+    scheduler = ReindexScheduler(new_service, concurrency=2, swap_grace=0)
+
+    progress = await scheduler.run()
+    await scheduler.aclose()
+
+    new_generation = await new_service.collection_registry.get_generation(doc_id)
+    assert progress.status == ReindexStatus.DONE
+    assert (progress.total, progress.completed, progress.failed) == (1, 1, 0)
+    assert new_generation == IndexGeneration(doc_id, new_service.index_version)
+    assert await new_service.collection_registry.stale_documents() == []
+    assert await new_service.parent_store.get_many(new_generation.storage_key, {0})
+    assert await new_service.lexical_store.get(new_generation.storage_key)
+
+    names = {c.name for c in new_service.chroma_client.list_collections()}
+    assert new_generation.collection_name in names
+    await scheduler._remove_later(old_generation)
+    names = {c.name for c in new_service.chroma_client.list_collections()}
+    assert old_generation.collection_name not in names
+    assert await new_service.lexical_store.get(old_generation.storage_key) is None
+    await old_service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_scheduler_reports_failures(stale_index, mock_document_service):
+    """Тест, что ошибка перестроения не переключает индекс и видна в прогрессе."""
+    doc_id, old_service, new_service = stale_index
+    await old_service.wait_until_indexed(doc_id)
+    mock_document_service.get_document_content = AsyncMock(return_value=None)
+    scheduler = ReindexScheduler(new_service, swap_grace=0)
+
+    progress = await scheduler.run()
+
+    assert (progress.completed, progress.failed) == (0, 1)
+    assert doc_id in progress.errors
+    assert await new_service.collection_registry.stale_documents() == [doc_id]
+    await old_service.aclose()
+
+
+@pytest.mark.asyncio
+async def test_reindex_progress_endpoint(client: AsyncClient):
+    """Тест, что ход переиндексации отдается с camelCase-полями."""
+    scheduler = MagicMock()
+    scheduler.progress.return_value = ReindexProgress(
+        status=ReindexStatus.RUNNING,
+        index_version="abc123",
+        total=3,
+        completed=1,
+        in_progress=["doc_a"],
+    )
+    app.dependency_overrides[get_reindex_scheduler] = lambda: scheduler
+    try:
+        response = await client.get("/api/v1/admin/reindex")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "running"
+    assert body["indexVersion"] == "abc123"
+    assert body["inProgress"] == ["doc_a"]
+    assert (body["total"], body["completed"], body["failed"]) == (3, 1, 0)
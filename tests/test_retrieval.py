@@ -0,0 +1,29 @@
+from langchain_core.documents import Document
+
+from src.services.retrieval import build_reranker, reciprocal_rank_fusion
+
+
+def doc(text: str, start: int) -> Document:
+    return Document(page_content=text, metadata={"start": start})
+
+
+def test_rrf_promotes_documents_found_by_both_retrievers():
+    """Тест, что фрагмент из обоих списков поднимается выше и не дублируется."""
+    dense = [doc("a", 0), doc("b", 10), doc("c", 20)]
+    lexical = [doc("c", 20), doc("d", 30)]
+
+    fused = reciprocal_rank_fusion([dense, lexical], k=60)
+
+    assert [document.page_content for document in fused] == ["c", "a", "b", "d"]
+
+
+def test_rrf_keeps_order_of_single_list():
+    """Тест, что при одном непустом списке порядок сохраняется."""
+    dense = [doc("a", 0), doc("b", 10)]
+
+    assert reciprocal_rank_fusion([dense, []]) == dense
+
+
+def test_reranker_disabled_without_model():
+    """Тест, что без заданной модели переранжирование не включается."""
+    assert build_reranker(None) is None
@@ -0,0 +1,45 @@
+from src.services.text_index import TextIndexBuilder
+
+
+def build_document(tmp_path, pages):
+    index = TextIndexBuilder("gpt-4o")
+    text_path = tmp_path / "doc.txt"
+    with open(text_path, "wb") as f:
+        for page in pages:
+            index.start_page()
+            for part in page:
+                f.write(index.add(part))
+    return text_path, index.build("doc_1", "hash", "application/pdf")
+
+
+def test_builder_counts_chars_and_bytes(tmp_path):
+    """Тест, что индекс считает символы и байты так же, как записанный файл."""
+    pages = [
+        ["Первая ", "страница\n"],
+        ["Second page, ", "€ и 😀 символы\n"],
+        ["Ω" * 30],
+    ]
+    text = "".join("".join(page) for page in pages)
+    text_path, metadata = build_document(tmp_path, pages)
+
+    assert metadata.char_count == len(text)
+    assert metadata.byte_count == len(text.encode("utf-8"))
+    assert text_path.read_bytes().decode("utf-8") == text
+    assert metadata.page_starts == [0, 16, 43]
+
+
+def test_page_at_returns_page_number(tmp_path):
+    """Тест определения номера страницы по смещению символа."""
+    pages = [["abc"], ["defg"], ["hi"]]
+    _, metadata = build_document(tmp_path, pages)
+
+    assert metadata.page_count == 3
+    assert metadata.page_starts == [0, 3, 7]
+    assert [metadata.page_at(offset) for offset in (0, 2, 3, 6, 7, 8)] == [
+        1,
+        1,
+        2,
+        2,
+        3,
+        3,
+    ]